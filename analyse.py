@@ -0,0 +1,166 @@
+"""
+Batch analysis of FEN/EPD positions on a pool of worker processes.
+
+Positions are read lazily, handed to the workers in chunks and written out
+as JSON lines while the rest are still being searched. At most a few
+chunks per worker are in flight or waiting to be written, so memory stays
+flat however long the input is.
+
+    python analyse.py positions.epd --depth 6 --workers 8 > results.jsonl
+    cat *.fen | python analyse.py --movetime 500 --ordered
+"""
+import argparse
+import fileinput
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import chess_eng
+from rights import move_to_uci
+
+CHUNKS_PER_WORKER = 2  # Chunks in flight per worker before input reading pauses
+
+# Each worker process reuses one board
+_board = None
+
+
+def parse_position(line):
+    """
+    (fen, id) of a FEN or EPD line. EPD lines carry no clocks, so they get
+    "0 1"; their id opcode, if any, is returned with the position.
+    """
+    fields = line.split()
+    if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+        return ' '.join(fields[:6]), None
+    position_id = None
+    for operation in ' '.join(fields[4:]).split(';'):
+        opcode, _, operand = operation.strip().partition(' ')
+        if opcode == 'id':
+            position_id = operand.strip().strip('"')
+    return ' '.join(fields[:4]) + ' 0 1', position_id
+
+
+def check_position(board):
+    """ValueError unless each side has one king and the side not to move is not in check."""
+    for king, side in ((6, 'white'), (-6, 'black')):
+        count = int((board.board == king).sum())
+        if count != 1:
+            raise ValueError(f"{side} has {count} kings")
+    if board.in_check(board.turn == -1):
+        raise ValueError(f"{'white' if board.turn == -1 else 'black'} is in check but not to move")
+
+
+def analyse(line, depth=None, movetime=None):
+    """Search one FEN/EPD line and return its result as a dict."""
+    global _board
+    if _board is None:
+        _board = chess_eng.Board()
+    fen, position_id = parse_position(line)
+    result = {'fen': fen}
+    if position_id is not None:
+        result['id'] = position_id
+    start = time.perf_counter()
+    try:
+        _board.from_fen(fen)
+        check_position(_board)
+        # Positions are unrelated, so nothing carries over between them
+        _board.new_game()
+        search = _board.search(depth, movetime)
+    except Exception as error:  # One bad line should not stop the batch
+        result['error'] = str(error)
+        return result
+    result.update(
+        bestmove=move_to_uci(search.best_move) if search.best_move else None,
+        score=search.score,
+        depth=search.depth,
+        nodes=search.nodes,
+        time=round(time.perf_counter() - start, 3),
+        pv=[move_to_uci(move) for move in search.pv],
+    )
+    return result
+
+
+def _analyse_chunk(lines, depth, movetime):
+    return [analyse(line, depth, movetime) for line in lines]
+
+
+def analyse_batch(fens, depth=None, movetime=None, workers=None, chunksize=4, ordered=False):
+    """
+    Yield a result dict (fen, bestmove, score, depth, nodes, time, pv) for
+    each FEN or EPD line of fens. Blank lines and lines starting with # are
+    skipped. Results come in completion order, or in input order with
+    ordered=True. workers defaults to the number of cores.
+    """
+    if depth is None and movetime is None:
+        raise ValueError("analyse_batch needs a depth or a movetime")
+    workers = workers or os.cpu_count() or 1
+    lines = (line.strip() for line in fens)
+    lines = (line for line in lines if line and not line.startswith('#'))
+    chunks = iter(lambda: list(islice(lines, chunksize)), [])
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from _analyse_chunk(chunk, depth, movetime)
+        return
+
+    limit = workers * CHUNKS_PER_WORKER
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        exhausted = False
+        while True:
+            # Read more input only while few enough chunks are unwritten
+            while not exhausted and len(pending) < limit:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    pending.append(pool.submit(_analyse_chunk, chunk, depth, movetime))
+            if not pending:
+                return
+            if ordered:
+                yield from pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield from future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse FEN/EPD positions and write JSON lines")
+    parser.add_argument('files', nargs='*', help="FEN or EPD files, one position per line (default stdin)")
+    budget = parser.add_mutually_exclusive_group(required=True)
+    budget.add_argument('--depth', type=int, help="search each position to this depth")
+    budget.add_argument('--movetime', type=int, help="milliseconds per position")
+    parser.add_argument('--workers', type=int, help="worker processes (default one per core)")
+    parser.add_argument('--chunksize', type=int, default=4, help="positions per task (default 4)")
+    parser.add_argument('--ordered', action='store_true', help="write results in input order")
+    parser.add_argument('--output', help="write to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    start = time.perf_counter()
+    count = errors = 0
+    try:
+        with fileinput.input(args.files) as lines:
+            for result in analyse_batch(lines, args.depth, args.movetime, args.workers,
+                                        args.chunksize, args.ordered):
+                output.write(json.dumps(result) + '\n')
+                output.flush()
+                count += 1
+                errors += 'error' in result
+    finally:
+        if args.output:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print(f"{count} positions ({errors} errors) in {elapsed:.1f}s, "
+          f"{count / max(elapsed, 1e-9):.1f} positions/s", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
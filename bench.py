@@ -0,0 +1,242 @@
+"""
+Benchmark suite: board copies, move generation, make/undo, evaluation,
+in_check and fixed-depth search over a fixed set of opening, middlegame
+and endgame positions, on every board backend.
+
+Each benchmark gets a warm-up run and then --repeat timed runs, of which
+the median is reported. Results can be written to JSON and compared with
+a stored baseline; a benchmark more than --threshold slower than the
+baseline counts as a regression and makes the exit status 1.
+
+    python bench.py --output baseline.json
+    python bench.py --baseline baseline.json --threshold 0.1
+    python bench.py --only search --search-depth python=3 native=7
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+
+import chess_eng
+from perft import BACKENDS
+
+CORPUS = [
+    # Openings
+    ("startpos", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"),
+    ("sicilian", "rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"),
+    ("queens-gambit", "rnbqkbnr/ppp1pppp/8/3p4/2PP4/8/PP2PPPP/RNBQKBNR b KQkq - 0 2"),
+    ("ruy-lopez", "r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3"),
+    # Middlegames
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1"),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8"),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10"),
+    # Endgames
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+    ("rook-ending", "8/5pk1/6p1/8/3R4/6P1/5PK1/2r5 w - - 0 1"),
+    ("minor-pieces", "8/4kp2/4p1p1/2n5/5B2/4P1P1/5PK1/8 w - - 0 1"),
+    ("pawn-race", "8/1p6/8/8/8/8/6P1/k6K w - - 0 1"),
+]
+
+# Search backends and the depth each searches to by default
+SEARCH_DEPTHS = {'python': 3, 'native': 7}
+REPEAT = 5
+THRESHOLD = 0.10  # Slowdown over the baseline that counts as a regression
+LOOPS = {'copy': 400, 'movegen': 100, 'make_undo': 40, 'evaluate': 400, 'in_check': 2000}
+
+
+def load_corpus(board_class):
+    boards = []
+    for _, fen in CORPUS:
+        board = board_class()
+        board.from_fen(fen)
+        boards.append(board)
+    return boards
+
+
+def bench_copy(boards, loops):
+    for _ in range(loops):
+        for board in boards:
+            board.copy()
+    return loops * len(boards)
+
+
+def bench_movegen(boards, loops):
+    for _ in range(loops):
+        for board in boards:
+            board.generate_legal_moves(encoded=True)
+    return loops * len(boards)
+
+
+def bench_make_undo(boards, loops):
+    moves = [board.generate_legal_moves(encoded=True) for board in boards]
+    count = 0
+    for _ in range(loops):
+        for board, legal in zip(boards, moves):
+            for move in legal:
+                board.make_move(move)
+                board.undo_move(move)
+            count += len(legal)
+    return count
+
+
+def bench_evaluate(boards, loops):
+    for _ in range(loops):
+        for board in boards:
+            board.evaluate_board()
+    return loops * len(boards)
+
+
+def bench_in_check(boards, loops):
+    for _ in range(loops):
+        for board in boards:
+            board.in_check(board.turn == 1)
+    return loops * len(boards)
+
+
+BENCHMARKS = {
+    'copy': bench_copy,
+    'movegen': bench_movegen,
+    'make_undo': bench_make_undo,
+    'evaluate': bench_evaluate,
+    'in_check': bench_in_check,
+}
+
+
+def timed(function, *args):
+    """(seconds, result) of one call, without the garbage collector running."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = function(*args)
+        return time.perf_counter() - start, result
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def run_benchmark(function, args, repeat):
+    """Median seconds of repeat runs after a warm-up, and what the runs returned."""
+    function(*args)
+    times, results = zip(*(timed(function, *args) for _ in range(repeat)))
+    return statistics.median(times), results
+
+
+def search_corpus(search_backend, depth):
+    """Total nodes of fixed-depth searches of the corpus, each from empty tables."""
+    chess_eng.USE_NATIVE_SEARCH = search_backend == 'native'
+    nodes = 0
+    for _, fen in CORPUS:
+        board = chess_eng.BitBoard()
+        board.from_fen(fen)
+        board.find_best_move(depth)
+        nodes += board.search_result.nodes
+    return nodes
+
+
+def run_suite(benchmarks, backends, search_depths, repeat, log=sys.stdout):
+    """Results keyed by 'benchmark/backend', printed as they come in."""
+    results = {}
+    print(f"{'Benchmark':<24} {'Median':>10} {'Per op':>12} {'Ops':>9}", file=log)
+    print("-" * 58, file=log)
+    for benchmark in benchmarks:
+        if benchmark == 'search':
+            continue
+        for backend in backends:
+            boards = load_corpus(BACKENDS[backend])
+            median, counts = run_benchmark(BENCHMARKS[benchmark], (boards, LOOPS[benchmark]), repeat)
+            key = f"{benchmark}/{backend}"
+            results[key] = {'median': median, 'ops': counts[0], 'per_op_us': median / counts[0] * 1e6}
+            print(f"{key:<24} {median:>9.4f}s {results[key]['per_op_us']:>10.2f}us {counts[0]:>9}", file=log)
+
+    if 'search' in benchmarks:
+        use_native = chess_eng.USE_NATIVE_SEARCH
+        try:
+            for search_backend, depth in search_depths.items():
+                median, nodes = run_benchmark(search_corpus, (search_backend, depth), repeat)
+                key = f"search/{search_backend}"
+                results[key] = {'median': median, 'depth': depth, 'nodes': nodes[0],
+                                'nps': int(nodes[0] / median)}
+                print(f"{key:<24} {median:>9.4f}s {results[key]['nps']:>10} nps, "
+                      f"{nodes[0]} nodes to depth {depth}", file=log)
+        finally:
+            chess_eng.USE_NATIVE_SEARCH = use_native
+    return results
+
+
+def compare(results, baseline, threshold, log=sys.stdout):
+    """Print each benchmark against the baseline and return the regressions."""
+    regressions = []
+    print(f"\n{'Benchmark':<24} {'Baseline':>10} {'Now':>10} {'Change':>8}", file=log)
+    print("-" * 56, file=log)
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<24} {'':>10} {result['median']:>9.4f}s {'new':>8}", file=log)
+            continue
+        change = result['median'] / base['median'] - 1
+        note = ""
+        if change > threshold:
+            regressions.append(key)
+            note = "  REGRESSION"
+        if 'nodes' in result and result['nodes'] != base.get('nodes'):
+            # Different node counts mean the search itself changed, not only its speed
+            note += f"  nodes {base.get('nodes')} -> {result['nodes']}"
+        print(f"{key:<24} {base['median']:>9.4f}s {result['median']:>9.4f}s {change:>+7.1%}{note}", file=log)
+    return regressions
+
+
+def main(argv=None):
+    names = list(BENCHMARKS) + ['search']
+    parser = argparse.ArgumentParser(description="Benchmark move generation, evaluation and search")
+    parser.add_argument('--only', action='append', choices=names,
+                        help="benchmark to run, may be repeated (default all)")
+    parser.add_argument('--backend', action='append', choices=sorted(BACKENDS),
+                        help="board backend, may be repeated (default all)")
+    parser.add_argument('--search-depth', nargs='+', metavar='BACKEND=DEPTH',
+                        help=f"search backends and depths (default "
+                             f"{' '.join(f'{name}={depth}' for name, depth in SEARCH_DEPTHS.items())})")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help=f"timed runs (default {REPEAT})")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=f"slowdown that counts as a regression (default {THRESHOLD})")
+    args = parser.parse_args(argv)
+
+    search_depths = dict(SEARCH_DEPTHS)
+    if args.search_depth:
+        search_depths = {}
+        for setting in args.search_depth:
+            name, _, depth = setting.partition('=')
+            if name not in SEARCH_DEPTHS or not depth.isdigit():
+                parser.error(f"--search-depth takes python=N or native=N, not {setting}")
+            search_depths[name] = int(depth)
+    if chess_eng.Searcher is None:
+        search_depths.pop('native', None)
+
+    results = run_suite(args.only or names, args.backend or list(BACKENDS), search_depths, args.repeat)
+    if args.output:
+        document = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'results': results,
+        }
+        with open(args.output, 'w') as output:
+            json.dump(document, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,64 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
+#include <pybind11/numpy.h>
 #include "rights.hpp"
+#include "bitbase.hpp"
+#include "position.hpp"
+#include "search.hpp"
 
 namespace py = pybind11;
 
+// Encoded moves from generate(out, capacity) as a uint16 NumPy array. The
+// count can exceed MAX_MOVES only for boards no game reaches; those are
+// generated again into a buffer of the full size.
+template <typename Generate>
+static py::array_t<uint16_t> move_array(Generate generate) {
+    uint16_t buffer[MAX_MOVES];
+    int count = generate(buffer, MAX_MOVES);
+    py::array_t<uint16_t> result(count);
+    if (count > MAX_MOVES) {
+        generate(result.mutable_data(), count);
+    } else {
+        std::copy(buffer, buffer + count, result.mutable_data());
+    }
+    return result;
+}
+
+// Reads the board in place through the buffer protocol (an int64 C-contiguous
+// array is not copied) and returns the encoded moves as a uint16 NumPy array
+static py::array_t<uint16_t> generate_all(
+        py::array_t<int64_t, py::array::c_style | py::array::forcecast> board,
+        int turn, int castling_bits, int ep_square, bool captures_only) {
+    if (board.ndim() != 2 || board.shape(0) != 8 || board.shape(1) != 8) {
+        throw std::invalid_argument("board must be an 8x8 array");
+    }
+    const int64_t* squares = board.data();
+    return move_array([&](uint16_t* out, int capacity) {
+        return generate_all_moves(squares, turn, castling_bits, ep_square, out, capacity, captures_only);
+    });
+}
+
+static py::array_t<uint16_t> legal_moves(Position& position, bool captures_only) {
+    return move_array([&](uint16_t* out, int capacity) {
+        return position.legal_moves(out, capacity, captures_only);
+    });
+}
+
+static py::array_t<uint16_t> pseudo_moves(const Position& position, bool captures_only) {
+    return move_array([&](uint16_t* out, int capacity) {
+        return position.pseudo_moves(out, capacity, captures_only);
+    });
+}
+
+// A read-only 8x8 view of the mailbox that stays valid while the
+// Position lives; it always reflects the current position without copying
+static py::array_t<int64_t> board_view(py::object self) {
+    Position& position = self.cast<Position&>();
+    py::array_t<int64_t> view({8, 8}, {8 * sizeof(int64_t), sizeof(int64_t)}, position.board, self);
+    py::detail::array_proxy(view.ptr())->flags &= ~py::detail::npy_api::NPY_ARRAY_WRITEABLE_;
+    return view;
+}
+
 PYBIND11_MODULE(rights_cpp, m) {
     py::class_<Move>(m, "Move")
         .def(py::init<std::pair<int,int>, std::pair<int,int>, bool>())
@@ -19,4 +74,127 @@ PYBIND11_MODULE(rights_cpp, m) {
           py::arg("board"), py::arg("turn"), py::arg("equal") = -1);
     m.def("queen", &queen_moves, "Generate queen moves");
     m.def("king", &king_moves, "Generate king moves");
+    m.def("generate_all", &generate_all, "Generate all pseudo-legal moves as encoded uint16s",
+          py::arg("board"), py::arg("turn"), py::arg("castling_bits"), py::arg("ep_square") = -1,
+          py::arg("captures_only") = false);
+
+    m.def("set_eval_tables", &set_eval_tables,
+          "Load per-square scores (12x64, PIECE_INDEX order), phase weights and constants",
+          py::arg("mg"), py::arg("eg"), py::arg("phase"), py::arg("max_phase"),
+          py::arg("mobility_weight"));
+
+    py::class_<Position>(m, "Position")
+        .def(py::init<>())
+        .def(py::init<const std::string&>(), py::arg("fen"))
+        .def("set_fen", &Position::set_fen, py::arg("fen"))
+        .def("copy", [](const Position& p) { return Position(p); }, "Independent copy, history included")
+        .def("fen", &Position::fen)
+        .def("push", &Position::push, py::arg("move"))
+        .def("push_null", &Position::push_null)
+        .def("pop", &Position::pop)
+        .def("legal_moves", &legal_moves, "Legal moves as encoded uint16s",
+             py::arg("captures_only") = false)
+        .def("pseudo_moves", &pseudo_moves, "Pseudo-legal moves as encoded uint16s",
+             py::arg("captures_only") = false)
+        .def("in_check", &Position::in_check, "Whether the side to move is in check")
+        .def("evaluate", &Position::evaluate, "Board.evaluate_board score, from White's perspective")
+        .def("king_attacked", &Position::king_attacked, py::arg("color"))
+        .def("is_square_attacked", &Position::is_square_attacked, py::arg("square"), py::arg("by_white"))
+        .def("see", &Position::see, "Static exchange evaluation of an encoded capture", py::arg("move"))
+        .def("piece_at", [](const Position& p, int sq) { return p.board[sq & 63]; }, py::arg("square"))
+        .def("bitboards", [](const Position& p) {
+            return py::make_tuple(std::vector<uint64_t>(p.pieces, p.pieces + 12),
+                                  std::vector<uint64_t>(p.occupancy, p.occupancy + 3));
+        }, "Twelve piece bitboards and [white, black, all] occupancy")
+        .def_property_readonly("board", &board_view)
+        .def_property_readonly("key", &Position::key)
+        .def_property("turn", &Position::turn, &Position::set_turn)
+        .def_property("castling", &Position::castling_bits, &Position::set_castling)
+        .def_property("ep_square", &Position::en_passant, &Position::set_en_passant)
+        .def_readwrite("halfmove_clock", &Position::halfmove)
+        .def_readwrite("fullmove_number", &Position::fullmove)
+        .def_readwrite("prior_keys", &Position::prior_keys)
+        .def_property_readonly("game_keys", [](const Position& p) {
+            std::vector<uint64_t> keys = p.prior_keys;
+            for (const UndoState& undo : p.history) keys.push_back(undo.key);
+            return keys;
+        }, "prior_keys followed by the key before each pushed move, oldest first")
+        .def("is_repetition", &Position::is_repetition, py::arg("count") = 1)
+        .def("is_fifty_move_draw", &Position::is_fifty_move_draw)
+        .def_readonly("eval_mg", &Position::eval_mg)
+        .def_readonly("eval_eg", &Position::eval_eg)
+        .def_readonly("phase", &Position::phase)
+        .def_property_readonly("ply", [](const Position& p) { return p.history.size(); });
+
+    py::class_<SearchResult>(m, "SearchResult")
+        .def_readonly("best_move", &SearchResult::best_move)
+        .def_readonly("score", &SearchResult::score)
+        .def_readonly("depth", &SearchResult::depth)
+        .def_readonly("nodes", &SearchResult::nodes)
+        .def_readonly("pv", &SearchResult::pv);
+
+    py::class_<SearchStats>(m, "SearchStats")
+        .def_readonly("depth", &SearchStats::depth)
+        .def_readonly("score", &SearchStats::score)
+        .def_readonly("pv", &SearchStats::pv)
+        .def_readonly("nodes", &SearchStats::nodes)
+        .def_readonly("qnodes", &SearchStats::qnodes)
+        .def_readonly("tt_probes", &SearchStats::tt_probes)
+        .def_readonly("tt_hits", &SearchStats::tt_hits)
+        .def_readonly("tt_cutoffs", &SearchStats::tt_cutoffs)
+        .def_readonly("cutoffs", &SearchStats::cutoffs)
+        .def_readonly("depth_nodes", &SearchStats::depth_nodes)
+        .def_readonly("elapsed", &SearchStats::elapsed)
+        .def_readonly("movegen_time", &SearchStats::movegen_time)
+        .def_readonly("make_time", &SearchStats::make_time)
+        .def_readonly("eval_time", &SearchStats::eval_time);
+
+    py::class_<Searcher>(m, "Searcher")
+        .def(py::init<int>(), py::arg("size_mb") = 16)
+        .def("search", [](Searcher& searcher, const Position& root, int depth, int movetime, uint64_t nodes) {
+            // Copy the root while holding the GIL, then search without it so
+            // other threads keep running; one search at a time per Searcher
+            Position position = root;
+            py::gil_scoped_release release;
+            return searcher.search(position, depth, movetime, nodes);
+        }, "Search to depth or until movetime (ms) or nodes runs out, 0 for no limit",
+           py::arg("position"), py::arg("depth") = 0, py::arg("movetime") = 0, py::arg("nodes") = 0)
+        .def("stop", &Searcher::stop, "Abort a running search from another thread")
+        .def("clear", &Searcher::clear)
+        .def("resize", &Searcher::resize, py::arg("size_mb"))
+        .def("hashfull", &Searcher::hashfull, "Permille of sampled table slots used by the current search")
+        .def("set_bitbases", [](Searcher& searcher, py::buffer kpk, py::buffer krk) {
+            // Copied, so the Searcher does not depend on the mapping staying open
+            Bitbases tables;
+            for (auto table : {std::make_pair(&kpk, &tables.kpk), std::make_pair(&krk, &tables.krk)}) {
+                py::buffer_info info = table.first->request();
+                const uint8_t* data = static_cast<const uint8_t*>(info.ptr);
+                table.second->assign(data, data + info.size * info.itemsize);
+            }
+            searcher.set_bitbases(tables);
+        }, "Load bitbase.py tables, empty for a missing one", py::arg("kpk"), py::arg("krk"))
+        .def_readwrite("threads", &Searcher::threads)
+        .def_readwrite("quiescence_depth", &Searcher::quiescence_depth)
+        .def_readwrite("pvs", &Searcher::pvs)
+        .def_readwrite("aspiration", &Searcher::aspiration)
+        .def_readwrite("null_move", &Searcher::null_move)
+        .def_readwrite("lmr", &Searcher::lmr)
+        .def_readwrite("timing", &Searcher::timing)
+        .def_readonly("stats", &Searcher::stats)
+        .def_property("on_iteration", [](const Searcher&) { return py::none(); },
+                      [](Searcher& searcher, py::object hook) {
+            // The search runs without the GIL, so the hook takes it back
+            if (hook.is_none()) {
+                searcher.on_iteration = nullptr;
+                return;
+            }
+            searcher.on_iteration = [hook](const SearchStats& stats) {
+                py::gil_scoped_acquire acquire;
+                try {
+                    hook(stats);
+                } catch (py::error_already_set& error) {
+                    error.discard_as_unraisable("Searcher.on_iteration");
+                }
+            };
+        }, "Called with the SearchStats after each completed iteration; write-only");
 } 
\ No newline at end of file
@@ -0,0 +1,80 @@
+#include "bitbase.hpp"
+#include <algorithm>
+#include <cstdlib>
+
+namespace {
+
+const int KNOWN_WIN = 10000;
+const int EDGE_WEIGHT = 20;
+const int KING_DISTANCE_WEIGHT = 10;
+
+}  // namespace
+
+int Bitbases::probe(const Position& pos) const {
+    bool rook;
+    int strong_king, weak_king;
+    return lookup(pos, rook, strong_king, weak_king);
+}
+
+int Bitbases::score(const Position& pos) const {
+    bool rook;
+    int strong_king, weak_king;
+    int result = lookup(pos, rook, strong_king, weak_king);
+    if (result == BITBASE_NONE || result == BITBASE_DRAW) return result;
+    int bonus = KNOWN_WIN;
+    if (rook) {
+        int row = weak_king / 8, col = weak_king % 8;
+        int edge = std::max(3 - row, row - 4) + std::max(3 - col, col - 4);
+        int distance = std::max(std::abs(row - strong_king / 8), std::abs(col - strong_king % 8));
+        bonus += EDGE_WEIGHT * edge - KING_DISTANCE_WEIGHT * distance;
+    }
+    return result * bonus;
+}
+
+int Bitbases::lookup(const Position& pos, bool& rook, int& strong_king, int& weak_king) const {
+    if (__builtin_popcountll(pos.occupancy[2]) != 3) return BITBASE_NONE;
+    const uint64_t* p = pos.pieces;
+    // White or black pawn or rook, next to the two kings
+    int strong;
+    uint64_t piece;
+    if (p[0] || p[3]) {
+        strong = 0;
+        rook = !p[0];
+        piece = p[0] | p[3];
+    } else if (p[6] || p[9]) {
+        strong = 1;
+        rook = !p[6];
+        piece = p[6] | p[9];
+    } else {
+        return BITBASE_NONE;
+    }
+    const std::vector<uint8_t>& table = rook ? krk : kpk;
+    if (table.empty() || !p[5] || !p[11]) return BITBASE_NONE;
+
+    strong_king = __builtin_ctzll(p[strong ? 11 : 5]);
+    weak_king = __builtin_ctzll(p[strong ? 5 : 11]);
+    int sq = __builtin_ctzll(piece);
+    if (strong) {
+        // Flip the board so the strong side plays up it as White
+        strong_king ^= 56;
+        weak_king ^= 56;
+        sq ^= 56;
+    }
+    int weak_to_move = (pos.side == 1) != (strong == 0);
+    // Mirror onto files a-d
+    if ((rook ? strong_king : sq) % 8 > 3) {
+        strong_king ^= 7;
+        weak_king ^= 7;
+        sq ^= 7;
+    }
+    uint32_t index;
+    if (rook) {
+        int king_index = (strong_king / 8) * 4 + strong_king % 8;
+        index = ((weak_to_move * 32 + king_index) * 64 + weak_king) * 64 + sq;
+    } else {
+        int pawn_index = (sq / 8 - 1) * 4 + sq % 8;
+        index = ((weak_to_move * 24 + pawn_index) * 64 + strong_king) * 64 + weak_king;
+    }
+    if (index / 8 >= table.size() || !(table[index / 8] >> (index % 8) & 1)) return BITBASE_DRAW;
+    return weak_to_move ? BITBASE_LOSS : BITBASE_WIN;
+}
@@ -0,0 +1,27 @@
+#pragma once
+#include <cstdint>
+#include <vector>
+#include "position.hpp"
+
+// Probe results from the side to move's point of view, as in bitbase.py
+enum BitbaseResult {
+    BITBASE_LOSS = -1,
+    BITBASE_DRAW = 0,
+    BITBASE_WIN = 1,
+    BITBASE_NONE = 2  // No table covers the position
+};
+
+// KPK and KRK win/draw tables written by bitbase.py, one bit per position
+// with the same index layout; an empty table is never probed
+struct Bitbases {
+    std::vector<uint8_t> kpk;
+    std::vector<uint8_t> krk;
+
+    int probe(const Position& pos) const;
+    // bitbase.Bitbases.score: 0 for a draw, KNOWN_WIN plus the KRK mating
+    // terms for a win, negated for a loss, BITBASE_NONE when not covered
+    int score(const Position& pos) const;
+
+private:
+    int lookup(const Position& pos, bool& rook, int& strong_king, int& weak_king) const;
+};
@@ -0,0 +1,260 @@
+"""
+Win/draw bitbases for king and pawn against king (KPK) and king and rook
+against king (KRK).
+
+The generator enumerates every position of each ending with the strong
+side as White and works backwards from the decided ones: a position with
+the strong side to move is won if some move reaches a won position, one
+with the weak side to move if every move does, and the rest are draws.
+It runs offline and writes one bit per position to kpk.bin and krk.bin,
+which are generated files and not kept in the repository:
+
+    python bitbase.py [--output DIR]
+
+Boards run without bitbases until this has been run once.
+
+Positions are mirrored so the pawn (KPK) or the strong king (KRK) stands
+on files a-d. The index layout is shared with bitbase.cpp.
+"""
+import argparse
+import mmap
+import os
+import sys
+import time
+
+import numpy as np
+
+from bitboard import KING_ATTACKS, PAWN_ATTACKS, WHITE, iter_bits, rook_attacks
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+FILES = {'kpk': 'kpk.bin', 'krk': 'krk.bin'}
+
+# Positions per side to move: pawn on a2-d7 or strong king on files a-d,
+# times both king squares or the other king and the rook
+HALF_SIZES = {'kpk': 24 * 64 * 64, 'krk': 32 * 64 * 64}
+
+# probe() results, from the side to move's point of view
+LOSS = -1
+DRAW = 0
+WIN = 1
+
+KNOWN_WIN = 10000  # Bonus for a won bitbase position, well below mate scores
+EDGE_WEIGHT = 20  # KRK: per step the lone king is from the centre
+KING_DISTANCE_WEIGHT = 10  # KRK: per step between the kings
+
+
+def kpk_index(weak_to_move, strong_king, pawn, weak_king):
+    """Index of a KPK position with White strong and the pawn on files a-d."""
+    pawn_index = ((pawn >> 3) - 1) * 4 + (pawn & 7)
+    return ((weak_to_move * 24 + pawn_index) * 64 + strong_king) * 64 + weak_king
+
+
+def krk_index(weak_to_move, strong_king, rook, weak_king):
+    """Index of a KRK position with White strong and its king on files a-d."""
+    king_index = (strong_king >> 3) * 4 + (strong_king & 7)
+    return ((weak_to_move * 32 + king_index) * 64 + weak_king) * 64 + rook
+
+
+def _kpk(weak_to_move, strong_king, pawn, weak_king):
+    if pawn & 7 > 3:
+        strong_king, pawn, weak_king = strong_king ^ 7, pawn ^ 7, weak_king ^ 7
+    return kpk_index(weak_to_move, strong_king, pawn, weak_king)
+
+
+def _krk(weak_to_move, strong_king, rook, weak_king):
+    if strong_king & 7 > 3:
+        strong_king, rook, weak_king = strong_king ^ 7, rook ^ 7, weak_king ^ 7
+    return krk_index(weak_to_move, strong_king, rook, weak_king)
+
+
+def _positions(name):
+    """(strong king, piece, weak king) of every canonical position of one side to move."""
+    if name == 'kpk':
+        for pawn_index in range(24):
+            pawn = (pawn_index // 4 + 1) * 8 + pawn_index % 4
+            for strong_king in range(64):
+                for weak_king in range(64):
+                    yield strong_king, pawn, weak_king
+    else:
+        for king_index in range(32):
+            strong_king = (king_index // 4) * 8 + king_index % 4
+            for weak_king in range(64):
+                for rook in range(64):
+                    yield strong_king, rook, weak_king
+
+
+def _piece_attacks(name, piece, occupied):
+    if name == 'kpk':
+        return PAWN_ATTACKS[WHITE][piece]
+    return rook_attacks(piece, occupied)
+
+
+def generate(name):
+    """Bit-packed table of one ending: bit i is set when position i is won for the strong side."""
+    half = HALF_SIZES[name]
+    index = _kpk if name == 'kpk' else _krk
+    # Two extra states stand for moves that end the ending: a safe
+    # promotion is won, a capture of the strong piece is drawn
+    won_state, drawn_state = 2 * half, 2 * half + 1
+    strong = np.full((half, 22), drawn_state, np.int32)  # Padding never wins
+    weak = np.full((half, 8), won_state, np.int32)  # Padding never saves
+    legal = np.zeros(2 * half, bool)
+    weak_in_check = np.zeros(half, bool)
+    weak_has_moves = np.zeros(half, bool)
+
+    for i, (strong_king, piece, weak_king) in enumerate(_positions(name)):
+        if len({strong_king, piece, weak_king}) < 3 or KING_ATTACKS[strong_king] >> weak_king & 1:
+            continue
+        in_check = bool(_piece_attacks(name, piece, 1 << strong_king) >> weak_king & 1)
+
+        # Strong side to move, legal unless the weak king is already in check
+        if not in_check:
+            legal[i] = True
+            moves = []
+            for to in iter_bits(KING_ATTACKS[strong_king] & ~KING_ATTACKS[weak_king]):
+                if to != piece:
+                    moves.append(index(1, to, piece, weak_king))
+            if name == 'kpk':
+                to = piece + 8
+                if to not in (strong_king, weak_king):
+                    if to >> 3 == 7:
+                        # The new queen survives unless the weak king can take it
+                        if not KING_ATTACKS[weak_king] >> to & 1 or KING_ATTACKS[strong_king] >> to & 1:
+                            moves.append(won_state)
+                    else:
+                        moves.append(index(1, strong_king, to, weak_king))
+                        if piece >> 3 == 1 and to + 8 not in (strong_king, weak_king):
+                            moves.append(index(1, strong_king, to + 8, weak_king))
+            else:
+                blockers = 1 << strong_king | 1 << weak_king
+                for to in iter_bits(rook_attacks(piece, blockers) & ~blockers):
+                    moves.append(index(1, strong_king, to, weak_king))
+            strong[i, :len(moves)] = moves
+
+        # Weak side to move
+        legal[half + i] = True
+        weak_in_check[i] = in_check
+        moves = []
+        for to in iter_bits(KING_ATTACKS[weak_king] & ~KING_ATTACKS[strong_king]):
+            if to == piece:
+                moves.append(drawn_state)  # Undefended, since the strong king is not next to it
+            elif not _piece_attacks(name, piece, 1 << strong_king) >> to & 1:
+                moves.append(index(0, strong_king, piece, to))
+        weak_has_moves[i] = bool(moves)
+        weak[i, :len(moves)] = moves
+
+    won = np.zeros(2 * half + 2, bool)
+    won[won_state] = True
+    while True:
+        strong_won = won[strong].any(axis=1) & legal[:half]
+        # Mate wins, stalemate draws
+        weak_won = np.where(weak_has_moves, won[weak].all(axis=1), weak_in_check) & legal[half:]
+        update = np.concatenate([strong_won, weak_won])
+        if np.array_equal(update, won[:2 * half]):
+            break
+        won[:2 * half] = update
+    return np.packbits(won[:2 * half], bitorder='little')
+
+
+class Bitbases:
+    """The bitbase files found in a directory, memory-mapped."""
+
+    def __init__(self, directory=DIRECTORY):
+        self.tables = {}
+        for name, filename in FILES.items():
+            path = os.path.join(directory, filename)
+            if os.path.exists(path):
+                with open(path, 'rb') as table_file:
+                    self.tables[name] = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+                if len(self.tables[name]) != HALF_SIZES[name] // 4:
+                    raise ValueError(f"{path} is not a {name.upper()} bitbase")
+
+    def __bool__(self):
+        return bool(self.tables)
+
+    def probe(self, board):
+        """WIN, DRAW or LOSS for the side to move, or None when no bitbase covers the position."""
+        found = self._lookup(board)
+        return None if found is None else found[0]
+
+    def score(self, board):
+        """
+        Search bonus for the side to move: 0 for a draw, KNOWN_WIN for a
+        win (negated for a loss), or None when no bitbase covers the position.
+        Won KRK positions also score the lone king's distance from the
+        centre and from the other king, so the search makes progress
+        towards mate.
+        """
+        found = self._lookup(board)
+        if found is None:
+            return None
+        result, name, strong_king, weak_king = found
+        if result == DRAW:
+            return 0
+        bonus = KNOWN_WIN
+        if name == 'krk':
+            row, col = weak_king >> 3, weak_king & 7
+            edge = max(3 - row, row - 4) + max(3 - col, col - 4)
+            distance = max(abs(row - (strong_king >> 3)), abs(col - (strong_king & 7)))
+            bonus += EDGE_WEIGHT * edge - KING_DISTANCE_WEIGHT * distance
+        return result * bonus
+
+    def _lookup(self, board):
+        squares = np.flatnonzero(board.board)
+        if len(squares) != 3:
+            return None
+        pieces = board.board.ravel()[squares].tolist()
+        kings = {piece: int(sq) for piece, sq in zip(pieces, squares) if abs(piece) == 6}
+        others = [(piece, int(sq)) for piece, sq in zip(pieces, squares) if abs(piece) != 6]
+        if len(kings) != 2 or abs(others[0][0]) not in (1, 4):
+            return None
+        piece, piece_sq = others[0]
+        name = 'kpk' if abs(piece) == 1 else 'krk'
+        table = self.tables.get(name)
+        if table is None:
+            return None
+
+        strong = 1 if piece > 0 else -1
+        strong_king, weak_king = kings[6 * strong], kings[-6 * strong]
+        if strong == -1:
+            # Flip the board so the strong side plays up it as White
+            strong_king, piece_sq, weak_king = strong_king ^ 56, piece_sq ^ 56, weak_king ^ 56
+        weak_to_move = int(board.turn != strong)
+        index = (_kpk if name == 'kpk' else _krk)(weak_to_move, strong_king, piece_sq, weak_king)
+        if not table[index >> 3] >> (index & 7) & 1:
+            return DRAW, name, strong_king, weak_king
+        return LOSS if weak_to_move else WIN, name, strong_king, weak_king
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+
+
+_default = None
+
+
+def default_bitbases():
+    """Bitbases from the package directory, shared by every Board; None if not generated."""
+    global _default
+    if _default is None:
+        _default = Bitbases()
+    return _default or None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the KPK and KRK bitbases")
+    parser.add_argument('--output', default=DIRECTORY, help="directory to write to (default the package)")
+    args = parser.parse_args(argv)
+    for name, filename in FILES.items():
+        start = time.perf_counter()
+        table = generate(name)
+        path = os.path.join(args.output, filename)
+        with open(path, 'wb') as table_file:
+            table_file.write(table.tobytes())
+        wins = int(np.unpackbits(table).sum())
+        print(f"{path}: {len(table)} bytes, {wins} won positions, {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
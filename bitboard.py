@@ -0,0 +1,244 @@
+"""
+Bitboard helpers shared by the bitboard-backed board.
+
+Squares are numbered rank * 8 + file, so a1 is bit 0 and h8 is bit 63,
+matching row/col indexing of Board.board and the layout in reng/src/board.rs.
+"""
+
+FULL = (1 << 64) - 1
+
+WHITE = 0
+BLACK = 1
+BOTH = 2
+
+# Index of each piece value (1..6 white, -1..-6 black) into a list of twelve bitboards
+PIECE_INDEX = {1: 0, 2: 1, 3: 2, 4: 3, 5: 4, 6: 5,
+               -1: 6, -2: 7, -3: 8, -4: 9, -5: 10, -6: 11}
+
+SQUARES = [(sq >> 3, sq & 7) for sq in range(64)]
+
+
+def square(row, col):
+    return row * 8 + col
+
+
+def bit(row, col):
+    return 1 << (row * 8 + col)
+
+
+def lsb(bb):
+    return (bb & -bb).bit_length() - 1
+
+
+def msb(bb):
+    return bb.bit_length() - 1
+
+
+def iter_bits(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def _step_table(steps):
+    table = []
+    for sq in range(64):
+        row, col = SQUARES[sq]
+        attacks = 0
+        for d_row, d_col in steps:
+            r, c = row + d_row, col + d_col
+            if 0 <= r < 8 and 0 <= c < 8:
+                attacks |= bit(r, c)
+        table.append(attacks)
+    return table
+
+
+KNIGHT_ATTACKS = _step_table([(2, 1), (2, -1), (-2, 1), (-2, -1),
+                              (1, 2), (1, -2), (-1, 2), (-1, -2)])
+KING_ATTACKS = _step_table([(1, 0), (-1, 0), (0, 1), (0, -1),
+                            (1, 1), (1, -1), (-1, 1), (-1, -1)])
+# PAWN_ATTACKS[WHITE][sq] are the squares a white pawn on sq attacks
+PAWN_ATTACKS = [_step_table([(1, 1), (1, -1)]), _step_table([(-1, 1), (-1, -1)])]
+
+
+def _ray_table(d_row, d_col):
+    table = []
+    for sq in range(64):
+        row, col = SQUARES[sq]
+        ray = 0
+        r, c = row + d_row, col + d_col
+        while 0 <= r < 8 and 0 <= c < 8:
+            ray |= bit(r, c)
+            r, c = r + d_row, c + d_col
+        table.append(ray)
+    return table
+
+
+# Rays pointing towards higher square numbers stop at their lowest blocker,
+# rays pointing towards lower square numbers stop at their highest blocker.
+ROOK_RAYS_UP = [_ray_table(1, 0), _ray_table(0, 1)]
+ROOK_RAYS_DOWN = [_ray_table(-1, 0), _ray_table(0, -1)]
+BISHOP_RAYS_UP = [_ray_table(1, 1), _ray_table(1, -1)]
+BISHOP_RAYS_DOWN = [_ray_table(-1, 1), _ray_table(-1, -1)]
+
+
+def _slide(sq, occ, rays_up, rays_down):
+    attacks = 0
+    for rays in rays_up:
+        ray = rays[sq]
+        blockers = ray & occ
+        if blockers:
+            ray ^= rays[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for rays in rays_down:
+        ray = rays[sq]
+        blockers = ray & occ
+        if blockers:
+            ray ^= rays[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def bishop_attacks(sq, occ):
+    return _slide(sq, occ, BISHOP_RAYS_UP, BISHOP_RAYS_DOWN)
+
+
+def rook_attacks(sq, occ):
+    return _slide(sq, occ, ROOK_RAYS_UP, ROOK_RAYS_DOWN)
+
+
+def queen_attacks(sq, occ):
+    return bishop_attacks(sq, occ) | rook_attacks(sq, occ)
+
+
+def is_square_attacked(bitboards, occ, sq, by_white):
+    """True if any piece of the given colour attacks sq."""
+    if by_white:
+        pawns, knights, bishops, rooks, queens, king = bitboards[0:6]
+        defender = BLACK
+    else:
+        pawns, knights, bishops, rooks, queens, king = bitboards[6:12]
+        defender = WHITE
+    if PAWN_ATTACKS[defender][sq] & pawns:
+        return True
+    if KNIGHT_ATTACKS[sq] & knights:
+        return True
+    if KING_ATTACKS[sq] & king:
+        return True
+    if (bishops | queens) and bishop_attacks(sq, occ) & (bishops | queens):
+        return True
+    if (rooks | queens) and rook_attacks(sq, occ) & (rooks | queens):
+        return True
+    return False
+
+
+def _line_tables():
+    between = [[0] * 64 for _ in range(64)]
+    line = [[0] * 64 for _ in range(64)]
+    directions = [(1, 0), (0, 1), (1, 1), (1, -1), (-1, 0), (0, -1), (-1, -1), (-1, 1)]
+    rays = {direction: _ray_table(*direction) for direction in directions}
+    for sq in range(64):
+        row, col = SQUARES[sq]
+        for d_row, d_col in directions:
+            full = rays[(d_row, d_col)][sq] | rays[(-d_row, -d_col)][sq] | (1 << sq)
+            path = 0
+            r, c = row + d_row, col + d_col
+            while 0 <= r < 8 and 0 <= c < 8:
+                to = r * 8 + c
+                between[sq][to] = path
+                line[sq][to] = full
+                path |= 1 << to
+                r, c = r + d_row, c + d_col
+    return between, line
+
+
+# BETWEEN[a][b]: squares strictly between two aligned squares
+# LINE[a][b]: the whole rank, file or diagonal through both, 0 if not aligned
+BETWEEN, LINE = _line_tables()
+
+
+def bitboards_from_array(board):
+    """Twelve piece bitboards plus [white, black, all] occupancy from an 8x8 array."""
+    bitboards = [0] * 12
+    for sq, piece in enumerate(board.ravel().tolist()):
+        if piece:
+            bitboards[PIECE_INDEX[piece]] |= 1 << sq
+    white = bitboards[0] | bitboards[1] | bitboards[2] | bitboards[3] | bitboards[4] | bitboards[5]
+    black = bitboards[6] | bitboards[7] | bitboards[8] | bitboards[9] | bitboards[10] | bitboards[11]
+    return bitboards, [white, black, white | black]
+
+
+def attackers_to(bitboards, occ, sq, by_white):
+    """Bitboard of the pieces of the given colour that attack sq."""
+    if by_white:
+        pawns, knights, bishops, rooks, queens, king = bitboards[0:6]
+        defender = BLACK
+    else:
+        pawns, knights, bishops, rooks, queens, king = bitboards[6:12]
+        defender = WHITE
+    return ((PAWN_ATTACKS[defender][sq] & pawns)
+            | (KNIGHT_ATTACKS[sq] & knights)
+            | (KING_ATTACKS[sq] & king)
+            | (bishop_attacks(sq, occ) & (bishops | queens))
+            | (rook_attacks(sq, occ) & (rooks | queens)))
+
+
+def attacked_squares(bitboards, occ, by_white):
+    """Every square attacked by the given colour."""
+    if by_white:
+        pawns, knights, bishops, rooks, queens, king = bitboards[0:6]
+        colour = WHITE
+    else:
+        pawns, knights, bishops, rooks, queens, king = bitboards[6:12]
+        colour = BLACK
+    attacked = 0
+    for sq in iter_bits(pawns):
+        attacked |= PAWN_ATTACKS[colour][sq]
+    for sq in iter_bits(knights):
+        attacked |= KNIGHT_ATTACKS[sq]
+    for sq in iter_bits(bishops | queens):
+        attacked |= bishop_attacks(sq, occ)
+    for sq in iter_bits(rooks | queens):
+        attacked |= rook_attacks(sq, occ)
+    for sq in iter_bits(king):
+        attacked |= KING_ATTACKS[sq]
+    return attacked
+
+
+def pinned_pieces(bitboards, occupancy, king_sq, white):
+    """Map each of our pinned pieces' squares to the line it may still move along."""
+    if white:
+        bishops, rooks, queens = bitboards[8], bitboards[9], bitboards[10]
+        own = occupancy[WHITE]
+    else:
+        bishops, rooks, queens = bitboards[2], bitboards[3], bitboards[4]
+        own = occupancy[BLACK]
+    occ = occupancy[BOTH]
+    pins = {}
+    snipers = ((bishop_attacks(king_sq, 0) & (bishops | queens))
+               | (rook_attacks(king_sq, 0) & (rooks | queens)))
+    for sq in iter_bits(snipers):
+        blockers = BETWEEN[king_sq][sq] & occ
+        if blockers and not blockers & (blockers - 1) and blockers & own:
+            pins[lsb(blockers)] = LINE[king_sq][sq]
+    return pins
+
+
+def mobility(bitboards, occupancy, white):
+    """Squares attacked by the knights, bishops, rooks and queens of one colour, minus own pieces."""
+    if white:
+        knights, bishops, rooks, queens = bitboards[1:5]
+        targets = ~occupancy[WHITE] & FULL
+    else:
+        knights, bishops, rooks, queens = bitboards[7:11]
+        targets = ~occupancy[BLACK] & FULL
+    occ = occupancy[BOTH]
+    count = 0
+    for sq in iter_bits(knights):
+        count += (KNIGHT_ATTACKS[sq] & targets).bit_count()
+    for sq in iter_bits(bishops | queens):
+        count += (bishop_attacks(sq, occ) & targets).bit_count()
+    for sq in iter_bits(rooks | queens):
+        count += (rook_attacks(sq, occ) & targets).bit_count()
+    return count
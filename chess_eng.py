@@ -1,24 +1,109 @@
 import numpy as np
+from array import array
 from tqdm import tqdm
-from rights import Move
+from rights import (
+    Move, QUIET, DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EN_PASSANT,
+    PROMOTION_PIECES, encode_move, promotion_flag, move_to_uci
+)
+from bitboard import (
+    PIECE_INDEX, SQUARES, FULL, WHITE, BLACK, BOTH,
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS,
+    BETWEEN, bishop_attacks, rook_attacks, is_square_attacked, iter_bits, lsb,
+    attackers_to, attacked_squares, pinned_pieces, bitboards_from_array, mobility
+)
+from bitbase import DRAW, default_bitbases
+from search import Search, SearchResult, SearchStats
+from smp import LazySMP
+from evaluation import (
+    PIECE_VALUES, PAWN_TABLE, KNIGHT_TABLE, MG_SCORES, EG_SCORES, PHASE,
+    MOBILITY_WEIGHT, MAX_PHASE, score_position, tapered
+)
+from zobrist import (
+    PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, CASTLING_BITS, castling_mask, en_passant_key,
+    position_key
+)
 
 # Create a flag to switch between C++ and Python implementations
 USE_CPP_RIGHTS = True
 
 if USE_CPP_RIGHTS:
-    from rights_cpp import (
-        pawn as pawn,
-        knight as knight,
-        bishop as bishop,
-        rook as rook,
-        queen as queen,
-        king as king
-    )
+    from rights_cpp import generate_all
+else:
+    from rights import generate_all
+
+# find_best_move hands the search to the extension when it is built
+USE_NATIVE_SEARCH = True
+
+# Boards use the KPK/KRK bitbases once `python bitbase.py` has generated them
+USE_BITBASES = True
+
+try:
+    from rights_cpp import Position, Searcher, set_eval_tables
+except ImportError:
+    Position = Searcher = None  # NativeBoard and the native search need the extension
 else:
-    from rights import pawn, knight, bishop, rook, queen, king
+    # The native position keeps the same incremental scores as Board
+    _PIECE_ORDER = sorted(PIECE_INDEX, key=PIECE_INDEX.get)
+    set_eval_tables([MG_SCORES[piece][sq] for piece in _PIECE_ORDER for sq in range(64)],
+                    [EG_SCORES[piece][sq] for piece in _PIECE_ORDER for sq in range(64)],
+                    [PHASE[piece] for piece in _PIECE_ORDER], MAX_PHASE, MOBILITY_WEIGHT)
+
+# Castling right lost when a piece leaves or is captured on each rook's home square
+ROOK_HOME_SQUARES = {
+    (0, 0): 'w_queen',
+    (0, 7): 'w_king',
+    (7, 0): 'b_queen',
+    (7, 7): 'b_king',
+}
+
+def _move_squares(move):
+    """(start, end, promotion) of a Move object or a 16-bit encoded move."""
+    if isinstance(move, (int, np.integer)):
+        code = int(move)
+        return SQUARES[code & 63], SQUARES[(code >> 6) & 63], PROMOTION_PIECES[code >> 12]
+    return move.start, move.end, move.promotion
 
 class Board:
-    
+    # Constant tables, shared by every board
+    pieces = {
+        'empty': 0,
+        'w_pawn': 1,
+        'w_knight': 2,
+        'w_bishop': 3,
+        'w_rook': 4,
+        'w_queen': 5,
+        'w_king': 6,
+        'b_pawn': -1,
+        'b_knight': -2,
+        'b_bishop': -3,
+        'b_rook': -4,
+        'b_queen': -5,
+        'b_king': -6
+    }
+    value_map = {
+        'empty': 0,
+        'pawn': 1,
+        'knight': 3,
+        'bishop': 3,
+        'rook': 5,
+        'queen': 9,
+        'king': 100,
+    }
+
+    # Piece-square tables and piece values live in evaluation.py, which
+    # folds them into the per-square scores kept up to date by _set_piece
+    pawn_table = PAWN_TABLE
+    knight_table = KNIGHT_TABLE
+    piece_values = PIECE_VALUES
+
+    # Subclasses declare their own slots for the state they add
+    __slots__ = (
+        'board', 'turn', 'castling_rights', 'en_passant', '_key_history', 'halfmove_clock',
+        '_undo_stack', '_zobrist', 'eval_mg', 'eval_eg', 'phase',
+        'hash_size_mb', 'transposition_table', 'move_orderer', 'searcher', 'smp', 'book',
+        'bitbases', 'search_result', 'search_stats', '_running', 'search_options',
+    )
+
     def __init__(self):
         self.board = np.zeros((8, 8), dtype=int)
         self.turn = 1 # 1 for white, -1 for black
@@ -28,68 +113,84 @@ class Board:
             'b_king': True,
             'b_queen': True,
         }
-        self.pieces = {
-            'empty': 0,
-            'w_pawn': 1,
-            'w_knight': 2,
-            'w_bishop': 3,
-            'w_rook': 4,
-            'w_queen': 5,
-            'w_king': 6,
-            'b_pawn': -1,
-            'b_knight': -2,
-            'b_bishop': -3,
-            'b_rook': -4,
-            'b_queen': -5,
-            'b_king': -6
-        }
-        self.value_map = {
-            'empty': 0,
-            'pawn': 1,
-            'knight': 3,
-            'bishop': 3,
-            'rook': 5,
-            'queen': 9,
-            'king': 100,
-        }
+        self.en_passant = None  # (row, col) of the square a pawn skipped, if any
         
-        # Add piece-square tables as class attributes
-        self.pawn_table = np.array([
-            [ 0,  0,  0,  0,  0,  0,  0,  0],
-            [50, 50, 50, 50, 50, 50, 50, 50],
-            [10, 10, 20, 30, 30, 20, 10, 10],
-            [ 5,  5, 10, 25, 25, 10,  5,  5],
-            [ 0,  0,  0, 20, 20,  0,  0,  0],
-            [ 5, -5,-10,  0,  0,-10, -5,  5],
-            [ 5, 10, 10,-20,-20, 10, 10,  5],
-            [ 0,  0,  0,  0,  0,  0,  0,  0]
-        ])
-        
-        self.knight_table = np.array([
-            [-50,-40,-30,-30,-30,-30,-40,-50],
-            [-40,-20,  0,  0,  0,  0,-20,-40],
-            [-30,  0, 10, 15, 15, 10,  0,-30],
-            [-30,  5, 15, 20, 20, 15,  5,-30],
-            [-30,  0, 15, 20, 20, 15,  0,-30],
-            [-30,  5, 10, 15, 15, 10,  5,-30],
-            [-40,-20,  0,  5,  5,  0,-20,-40],
-            [-50,-40,-30,-30,-30,-30,-40,-50]
-        ])
-        
-        # Add position history to track repetitions
-        self.position_history = []
-        
-        # Add piece_values as a class attribute
-        self.piece_values = {
-            1: 100,    # Pawn
-            2: 320,    # Knight
-            3: 330,    # Bishop
-            4: 500,    # Rook
-            5: 900,    # Queen
-            6: 20000   # King
-        }
+        # Keys of the positions before each move since from_fen, for
+        # repetition detection, and plies since the last capture or pawn move
+        self._key_history = []
+        self.halfmove_clock = 0
 
-        self.transposition_table = {}  # Add at class level in __init__
+        # Bounded transposition table, allocated on the first search
+        self.hash_size_mb = 16
+        self.transposition_table = None
+        self.move_orderer = None  # Killer and history tables, kept between searches
+        self.searcher = None  # Native search session with its own tables
+        self.smp = None  # Worker processes for threads > 1 without the native search
+        self.book = None  # polyglot.Book consulted before every search
+        self.bitbases = default_bitbases() if USE_BITBASES else None
+        self.search_result = None  # SearchResult of the last find_best_move
+        self.search_stats = None  # SearchStats of the last search that was not a book move
+        self._running = None  # What stop_search stops while search() runs
+        # Switches for the selective search, e.g. {'null_move': False} to A/B it
+        self.search_options = {}
+
+        # make_move pushes what undo_move needs to restore the position
+        self._undo_stack = []
+
+        self._reset_incremental()
+
+    def _reset_incremental(self):
+        # Zobrist key of pieces, castling rights and en passant square;
+        # zobrist_key folds in the side to move
+        self._zobrist = position_key(self.board, self.castling_rights, self.en_passant)
+
+        # Running midgame/endgame material and piece-square sums and game phase
+        self.eval_mg, self.eval_eg, self.phase = score_position(self.board)
+
+    def copy(self):
+        """
+        Independent board in the same position, move history included, so
+        undo_move and repetition checks work on it as on the original.
+        Settings are shared; search tables and results start empty.
+        """
+        clone = object.__new__(type(self))
+        self._copy_position(clone)
+        clone.hash_size_mb = self.hash_size_mb
+        clone.book = self.book
+        clone.bitbases = self.bitbases
+        clone.search_options = self.search_options.copy()
+        clone.transposition_table = clone.move_orderer = clone.searcher = clone.smp = None
+        clone.search_result = clone.search_stats = clone._running = None
+        return clone
+
+    def _copy_position(self, clone):
+        clone.board = self.board.copy()
+        clone.turn = self.turn
+        clone.castling_rights = self.castling_rights.copy()
+        clone.en_passant = self.en_passant
+        clone.halfmove_clock = self.halfmove_clock
+        # Undo entries are never changed once pushed, so they can be shared
+        clone._undo_stack = self._undo_stack.copy()
+        clone._key_history = self._key_history.copy()
+        clone._zobrist = self._zobrist
+        clone.eval_mg, clone.eval_eg, clone.phase = self.eval_mg, self.eval_eg, self.phase
+
+    @property
+    def zobrist_key(self):
+        return self._zobrist ^ SIDE_KEY if self.turn == -1 else self._zobrist
+
+    def piece_at(self, row, col):
+        return self.board[row, col]
+
+    def _set_piece(self, row, col, piece):
+        # Every square change in make_move/undo_move goes through here
+        sq = row * 8 + col
+        old = self.board[row, col]
+        self._zobrist ^= PIECE_KEYS[old][sq] ^ PIECE_KEYS[piece][sq]
+        self.eval_mg += MG_SCORES[piece][sq] - MG_SCORES[old][sq]
+        self.eval_eg += EG_SCORES[piece][sq] - EG_SCORES[old][sq]
+        self.phase += PHASE[piece] - PHASE[old]
+        self.board[row, col] = piece
 
     def to_fen(self):
         fen = ""
@@ -98,7 +199,7 @@ class Board:
         # Board position
         for rank in range(7, -1, -1):
             for file in range(8):
-                piece = self.board[rank][file]
+                piece = self.piece_at(rank, file)
                 
                 if piece == 0:
                     empty_count += 1
@@ -138,8 +239,12 @@ class Board:
         if self.castling_rights['b_queen']: castling += 'q'
         fen += castling if castling else '-'
         
-        # Add placeholder for en passant and move counters
-        fen += ' - 0 1'
+        # Add en passant square and placeholder for move counters
+        if self.en_passant is None:
+            fen += ' -'
+        else:
+            fen += ' ' + 'abcdefgh'[self.en_passant[1]] + str(self.en_passant[0] + 1)
+        fen += f' {self.halfmove_clock} 1'
         
         return fen
 
@@ -160,7 +265,15 @@ class Board:
                 'b_king': 'k' in parts[2],
                 'b_queen': 'q' in parts[2]
             }
-        
+
+        # Get en passant square if provided
+        self.en_passant = None
+        if len(parts) > 3 and parts[3] != '-':
+            self.en_passant = (int(parts[3][1]) - 1, ord(parts[3][0]) - ord('a'))
+        self._undo_stack = []
+        self._key_history = []
+        self.halfmove_clock = int(parts[4]) if len(parts) > 4 and parts[4].isdigit() else 0
+
         # Reset board to empty
         self.board = np.zeros((8, 8), dtype=int)
         
@@ -195,22 +308,29 @@ class Board:
                     self.board[rank][file] = piece
                 file += 1
 
+        self._reset_incremental()
+
+    def _bitboards(self):
+        # Piece bitboards and occupancy derived from the array, for attack queries
+        return bitboards_from_array(self.board)
+
+    def is_square_attacked(self, row, col, by_white):
+        bitboards, occupancy = self._bitboards()
+        return is_square_attacked(bitboards, occupancy[BOTH], row * 8 + col, by_white)
+
     def in_check(self, white):
-        # Generate opponent's moves directly
-        moves = self.generate_legal_moves(is_pseudo=True, for_white=(not white))
-        
-        # Look for the king
-        king_value = 6 if white else -6
-        kings = np.where(self.board == king_value)
-        if kings[0].size > 0:
-            king = (kings[0][0], kings[1][0])
-            for move in moves:
-                if move.end == king:
-                    return True
-        return False
+        bitboards, occupancy = self._bitboards()
+        king = bitboards[PIECE_INDEX[6 if white else -6]]
+        if not king:
+            return False
+        return is_square_attacked(bitboards, occupancy[BOTH], lsb(king), not white)
     
-    def generate_legal_moves(self, is_pseudo=False, for_white=None):
-        moves = []
+    def generate_legal_moves(self, is_pseudo=False, for_white=None, encoded=False, captures_only=False):
+        """
+        Moves for the side to move, as Move objects or, with encoded=True,
+        as an array('H') of 16-bit encoded moves. captures_only keeps
+        captures and promotions, for quiescence search.
+        """
         # Store the original turn
         original_turn = self.turn
         
@@ -221,54 +341,124 @@ class Board:
         """
         
         try:
-            if self.turn == 1:  # White's moves
-                moves.extend(pawn(self.board, 1))
-                moves.extend(knight(self.board, 1))
-                moves.extend(bishop(self.board, 1))
-                moves.extend(rook(self.board, 1))
-                moves.extend(queen(self.board, 1))
-                moves.extend(king(self.board, 1, self.castling_rights))
-            else:  # Black's moves
-                moves.extend(pawn(self.board, -1))
-                moves.extend(knight(self.board, -1))
-                moves.extend(bishop(self.board, -1))
-                moves.extend(rook(self.board, -1))
-                moves.extend(queen(self.board, -1))
-                moves.extend(king(self.board, -1, self.castling_rights))
-
+            moves = self._pseudo_moves(captures_only)
             if not is_pseudo:
-                legal_moves = []
-                for move in moves:
-                    piece, rights = self.make_move(move)
-                    if not self.in_check(self.turn == 1):  # Check if our king is safe after move
-                        legal_moves.append(move)
-                    self.undo_move(move, piece, rights)
-                return legal_moves
-            return moves
+                moves = self._filter_legal(moves)
+            if encoded:
+                return moves
+            return [self.decode_move(code) for code in moves]
         
         finally:
             # Always restore the original turn, even if an error occurs
             self.turn = original_turn
 
+    def encode_move(self, move):
+        """16-bit encoding of a Move object, with flags read from the current position."""
+        from_sq = int(move.start[0]) * 8 + int(move.start[1])
+        to_sq = int(move.end[0]) * 8 + int(move.end[1])
+        piece = self.piece_at(*move.start)
+        capture = self.piece_at(*move.end) != 0
+        if move.promotion:
+            promoted = int(move.promotion)
+            return encode_move(from_sq, to_sq, promotion_flag(promoted if promoted > 1 else 5, capture))
+        if capture:
+            return encode_move(from_sq, to_sq, CAPTURE)
+        if abs(piece) == self.pieces['w_king'] and abs(to_sq - from_sq) == 2:
+            return encode_move(from_sq, to_sq, KING_CASTLE if to_sq > from_sq else QUEEN_CASTLE)
+        if abs(piece) == self.pieces['w_pawn']:
+            if abs(to_sq - from_sq) == 16:
+                return encode_move(from_sq, to_sq, DOUBLE_PUSH)
+            if (to_sq - from_sq) % 8:
+                return encode_move(from_sq, to_sq, EN_PASSANT)
+        return encode_move(from_sq, to_sq)
+
+    def decode_move(self, code):
+        start, end, promotion = _move_squares(code)
+        return Move(start, end, promotion or False)
+
+    def move_from_uci(self, uci):
+        """Encoded legal move for a UCI string such as 'e2e4' or 'e7e8q'."""
+        for code in self.generate_legal_moves(encoded=True):
+            if move_to_uci(code) == uci:
+                return code
+        raise ValueError(f"Illegal move {uci} in {self.to_fen()}")
+
+    def _pseudo_moves(self, captures_only=False):
+        # One call reads the array in place and returns every encoded move
+        ep_square = -1 if self.en_passant is None else self.en_passant[0] * 8 + self.en_passant[1]
+        moves = generate_all(self.board, self.turn, castling_mask(self.castling_rights), ep_square,
+                             captures_only)
+        return array('H', moves.tobytes())
+
+    def _filter_legal(self, moves):
+        """
+        Keep the pseudo-legal moves that do not leave our king attacked.
+        Checkers, pinned pieces and the squares the opponent attacks are
+        worked out once for the position, then each move is tested against them.
+        """
+        white = self.turn == 1
+        bitboards, occupancy = self._bitboards()
+        king = bitboards[PIECE_INDEX[6 if white else -6]]
+        if not king:
+            return moves
+        king_sq = lsb(king)
+        occ = occupancy[BOTH]
+        
+        checkers = attackers_to(bitboards, occ, king_sq, not white)
+        # Take the king off the board so it cannot step back along a checking ray
+        attacked = attacked_squares(bitboards, occ ^ king, not white)
+        pins = pinned_pieces(bitboards, occupancy, king_sq, white)
+        double_check = checkers & (checkers - 1)
+        # Squares that capture the checker or block its ray
+        evasions = checkers | BETWEEN[king_sq][lsb(checkers)] if checkers else FULL
+        
+        legal_moves = array('H')
+        for move in moves:
+            from_sq = move & 63
+            to_sq = (move >> 6) & 63
+            if from_sq == king_sq:
+                if attacked >> to_sq & 1:
+                    continue
+                # Castling may not start in check or pass through an attacked square
+                if (move >> 12 in (KING_CASTLE, QUEEN_CASTLE)
+                        and (checkers or attacked >> ((from_sq + to_sq) // 2) & 1)):
+                    continue
+                legal_moves.append(move)
+            elif double_check:
+                continue
+            elif move >> 12 == EN_PASSANT:
+                # En passant removes two pieces from a rank, so test it by playing it
+                self.make_move(move)
+                if not self.in_check(white):
+                    legal_moves.append(move)
+                self.undo_move(move)
+            elif evasions >> to_sq & 1 and (from_sq not in pins or pins[from_sq] >> to_sq & 1):
+                legal_moves.append(move)
+        return legal_moves
+
     def make_move(self, move):
-        # Store position before making move
-        current_fen = self.to_fen().split(' ')[0]
-        self.position_history.append(current_fen)
-        
-        # Limit history length to prevent memory issues
-        if len(self.position_history) > 50:
-            self.position_history.pop(0)
+        self._key_history.append(self.zobrist_key)
+        start, end, promotion = _move_squares(move)
+        start_row, start_col = start
+        end_row, end_col = end
         
         # Store the piece at the end position (captured piece)
-        captured_piece = self.board[move.end[0]][move.end[1]]
-        moving_piece = self.board[move.start[0]][move.start[1]]
-        
-        # Store original castling rights
-        original_castling_rights = self.castling_rights.copy()
+        captured_piece = self.piece_at(end_row, end_col)
+        moving_piece = self.piece_at(start_row, start_col)
+        
+        # Store original castling rights and en passant square; the rights
+        # are changed on a fresh dict so the stored one stays as it was
+        original_castling_rights = self.castling_rights
+        self.castling_rights = original_castling_rights.copy()
+        original_en_passant = self.en_passant
+        original_zobrist = self._zobrist
+        original_halfmove = self.halfmove_clock
+        en_passant_capture = False
+        self.en_passant = None
         
         # Move the piece
-        self.board[move.end[0]][move.end[1]] = self.board[move.start[0]][move.start[1]]
-        self.board[move.start[0]][move.start[1]] = 0
+        self._set_piece(end_row, end_col, moving_piece)
+        self._set_piece(start_row, start_col, 0)
         
         # Handle castling
         if abs(moving_piece) == self.pieces['w_king']:
@@ -281,238 +471,544 @@ class Board:
                 self.castling_rights['b_queen'] = False
             
             # Handle castling move
-            if abs(move.start[1] - move.end[1]) == 2:
+            if abs(start_col - end_col) == 2:
+                rook = self.piece_at(start_row, 7 if end_col == 6 else 0)
                 # Kingside castling
-                if move.end[1] == 6:
-                    self.board[move.start[0]][5] = self.board[move.start[0]][7]  # Move rook
-                    self.board[move.start[0]][7] = 0  # Clear rook's original position
+                if end_col == 6:
+                    self._set_piece(start_row, 5, rook)  # Move rook
+                    self._set_piece(start_row, 7, 0)  # Clear rook's original position
                 # Queenside castling
-                elif move.end[1] == 2:
-                    self.board[move.start[0]][3] = self.board[move.start[0]][0]  # Move rook
-                    self.board[move.start[0]][0] = 0  # Clear rook's original position
-        
-        # Update castling rights when rook moves
-        elif abs(moving_piece) == self.pieces['w_rook']:
-            if move.start[0] == 0 and move.start[1] == 0:
-                self.castling_rights['w_queen'] = False
-            elif move.start[0] == 0 and move.start[1] == 7:
-                self.castling_rights['w_king'] = False
-            elif move.start[0] == 7 and move.start[1] == 0:
-                self.castling_rights['b_queen'] = False
-            elif move.start[0] == 7 and move.start[1] == 7:
-                self.castling_rights['b_king'] = False
+                elif end_col == 2:
+                    self._set_piece(start_row, 3, rook)  # Move rook
+                    self._set_piece(start_row, 0, 0)  # Clear rook's original position
+        
+        elif abs(moving_piece) == self.pieces['w_pawn']:
+            # A double push leaves the skipped square open to en passant
+            if abs(end_row - start_row) == 2:
+                self.en_passant = ((start_row + end_row) // 2, start_col)
+            # A diagonal move onto an empty square captures en passant
+            elif start_col != end_col and captured_piece == 0:
+                en_passant_capture = True
+                self._set_piece(start_row, end_col, 0)
+        
+        # Moving from or capturing on a rook's home square removes its castling right
+        for square in (start, end):
+            if square in ROOK_HOME_SQUARES:
+                self.castling_rights[ROOK_HOME_SQUARES[square]] = False
         
         # Handle pawn promotion
-        if move.promotion:
-            self.board[move.end[0]][move.end[1]] = 5 if moving_piece > 0 else -5  # Promote to queen
-        
+        if promotion:
+            promoted = int(promotion)
+            if promoted < self.pieces['w_knight']:
+                promoted = self.pieces['w_queen']  # A plain True promotes to queen
+            self._set_piece(end_row, end_col, promoted if moving_piece > 0 else -promoted)
+        
+        # Hash out the old castling rights and en passant file, hash in the new ones
+        self._zobrist ^= (
+            CASTLING_KEYS[castling_mask(original_castling_rights)]
+            ^ CASTLING_KEYS[castling_mask(self.castling_rights)]
+            ^ en_passant_key(original_en_passant)
+            ^ en_passant_key(self.en_passant)
+        )
+        
+        self.halfmove_clock = 0 if captured_piece or abs(moving_piece) == 1 else original_halfmove + 1
+        
+        self._undo_stack.append(
+            (captured_piece, original_castling_rights, original_en_passant,
+             en_passant_capture, original_zobrist, original_halfmove)
+        )
         return captured_piece, original_castling_rights
 
-    def undo_move(self, move, captured_piece, original_castling_rights):
-        moving_piece = self.board[move.end[0]][move.end[1]]
-        
-        # Move piece back to start position
-        self.board[move.start[0]][move.start[1]] = self.board[move.end[0]][move.end[1]]
+    def undo_move(self, move, captured_piece=None, original_castling_rights=None):
+        # The undo stack holds the same captured piece and castling rights that
+        # make_move returned, so callers may still pass them but need not
+        (captured_piece, original_castling_rights, original_en_passant,
+         en_passant_capture, original_zobrist, original_halfmove) = self._undo_stack.pop()
+        self._key_history.pop()
+        
+        start, end, promotion = _move_squares(move)
+        start_row, start_col = start
+        end_row, end_col = end
+        moving_piece = self.piece_at(end_row, end_col)
         
         # If it was a promotion, restore original pawn
-        if move.promotion:
-            self.board[move.start[0]][move.start[1]] = 1 if moving_piece > 0 else -1
+        if promotion:
+            moving_piece = 1 if moving_piece > 0 else -1
         
-        # Restore captured piece if any
-        self.board[move.end[0]][move.end[1]] = captured_piece
+        # Move piece back to start position and restore captured piece if any
+        self._set_piece(start_row, start_col, moving_piece)
+        self._set_piece(end_row, end_col, captured_piece)
+        
+        if en_passant_capture:
+            self._set_piece(start_row, end_col, -moving_piece)
         
         # Handle undoing castling
         if abs(moving_piece) == self.pieces['w_king']:
-            if abs(move.start[1] - move.end[1]) == 2:
+            if abs(start_col - end_col) == 2:
                 # Undo kingside castling
-                if move.end[1] == 6:
-                    self.board[move.start[0]][7] = self.board[move.start[0]][5]  # Move rook back
-                    self.board[move.start[0]][5] = 0  # Clear rook's temporary position
+                if end_col == 6:
+                    self._set_piece(start_row, 7, self.piece_at(start_row, 5))  # Move rook back
+                    self._set_piece(start_row, 5, 0)  # Clear rook's temporary position
                 # Undo queenside castling
-                elif move.end[1] == 2:
-                    self.board[move.start[0]][0] = self.board[move.start[0]][3]  # Move rook back
-                    self.board[move.start[0]][3] = 0  # Clear rook's temporary position
+                elif end_col == 2:
+                    self._set_piece(start_row, 0, self.piece_at(start_row, 3))  # Move rook back
+                    self._set_piece(start_row, 3, 0)  # Clear rook's temporary position
         
-        # Restore original castling rights
+        # Restore original castling rights, en passant square, key and clock
         self.castling_rights = original_castling_rights
-        
+        self.en_passant = original_en_passant
+        self._zobrist = original_zobrist
+        self.halfmove_clock = original_halfmove
+
+    def make_null_move(self):
+        """
+        Pass: only the en passant square is cleared. The halfmove clock
+        restarts so no repetition is matched across the pass. Callers flip
+        turn as for make_move.
+        """
+        self._undo_stack.append((self.en_passant, self._zobrist, self.halfmove_clock))
+        self._key_history.append(self.zobrist_key)
+        self._zobrist ^= en_passant_key(self.en_passant)
+        self.en_passant = None
+        self.halfmove_clock = 0
+
+    def undo_null_move(self):
+        self.en_passant, self._zobrist, self.halfmove_clock = self._undo_stack.pop()
+        self._key_history.pop()
+
+    def is_repetition(self, count=1):
+        """
+        Whether the position occurred count times before since the last
+        capture or pawn move: 1 is enough for the search to score a draw,
+        2 makes a threefold repetition.
+        """
+        # Same side to move every other ply, back as far as the clock allows
+        earlier = self._key_history[-2:-self.halfmove_clock - 1:-2]
+        return earlier.count(self.zobrist_key) >= count
+
+    def is_fifty_move_draw(self):
+        return self.halfmove_clock >= 100
 
     def game_over(self):
         if len(self.generate_legal_moves()) == 0:
             if self.in_check(self.turn == 1):
                 return True, "black loss" if self.turn == 1 else "white loss"
             return True, "draw by stalemate"
+        if self.is_fifty_move_draw():
+            return True, "draw by fifty-move rule"
+        if self.is_repetition(2):
+            return True, "draw by repetition"
+        if self.bitbases is not None and self.bitbases.probe(self) == DRAW:
+            return True, "draw by bitbase"
         return False, "keep playing"
 
+    def incremental_score(self):
+        """Material plus piece-square score, tapered between midgame and endgame."""
+        return tapered(self.eval_mg, self.eval_eg, self.phase)
+
     def evaluate_board(self):
         """
         Evaluates the board position from White's perspective.
         Positive values mean White is winning, negative values mean Black is winning.
         """
-        score = 0
-        
-        # Material counting (most important factor)
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece != 0:
-                    # Base piece value
-                    value = self.piece_values[abs(piece)]
-                    score += value if piece > 0 else -value
-        
-        # Simple positional bonuses
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece != 0:
-                    # Center control (small bonus)
-                    if 2 <= row <= 5 and 2 <= col <= 5:
-                        score += 10 if piece > 0 else -10
-                    
-                    # Pawn structure
-                    if abs(piece) == 1:  # Pawns
-                        # Bonus for advanced pawns
-                        if piece > 0:  # White pawns
-                            score += (row - 1) * 10
-                        else:  # Black pawns
-                            score -= (6 - row) * 10
-        
-        # King safety (simplified)
-        white_king_pos = np.where(self.board == 6)
-        black_king_pos = np.where(self.board == -6)
-        
-        if white_king_pos[0].size > 0 and black_king_pos[0].size > 0:
-            w_king = (white_king_pos[0][0], white_king_pos[1][0])
-            b_king = (black_king_pos[0][0], black_king_pos[1][0])
-            
-            # Penalize exposed kings
-            if w_king[0] > 1:  # White king moved away from back rank
-                score -= 50
-            if b_king[0] < 6:  # Black king moved away from back rank
-                score += 50
+        # Material and piece-square scores are kept up to date by make_move/undo_move
+        score = self.incremental_score()
         
-        # Mobility (simplified)
-        self.turn = 1  # Temporarily set turn to white
-        white_moves = len(self.generate_legal_moves())
-        self.turn = -1  # Set turn to black
-        black_moves = len(self.generate_legal_moves())
-        self.turn = 1  # Restore original turn
+        # Mobility: squares each side's pieces attack, counted on the bitboards
+        # without generating moves or touching the side to move
+        bitboards, occupancy = self._bitboards()
+        white_mobility = mobility(bitboards, occupancy, True)
+        black_mobility = mobility(bitboards, occupancy, False)
         
-        score += (white_moves - black_moves) * 5  # Small bonus for mobility
+        score += (white_mobility - black_mobility) * MOBILITY_WEIGHT  # Small bonus for mobility
         
         return score
     
-    def find_best_move(self, depth=4):
+    def new_game(self):
+        """Forget what earlier searches learned: hash table, killers and history."""
+        if self.transposition_table is not None:
+            self.transposition_table.clear()
+        if self.move_orderer is not None:
+            self.move_orderer.clear()
+        if self.searcher is not None:
+            self.searcher.clear()
+        if self.smp is not None:
+            self.smp.clear()
+
+    def find_best_move(self, depth=4, movetime=None, nodes=None, threads=1):
         """
-        Optimized version with move ordering, transposition table, and basic quiescence search
+        Iterative-deepening search to depth, or until movetime (milliseconds)
+        or nodes runs out; depth=None searches until a budget stops it.
+        threads > 1 runs a Lazy SMP search on that many threads or processes,
+        and nodes is then the budget of all of them together, on either
+        backend. Returns the best move of the last completed depth.
         """
-        def move_value(move):
-            """Order moves to improve alpha-beta pruning efficiency"""
-            piece = self.board[move.start[0]][move.start[1]]
-            captured = self.board[move.end[0]][move.end[1]]
-            
-            # Base score: MVV-LVA (Most Valuable Victim - Least Valuable Attacker)
-            score = 0
-            if captured != 0:
-                score = 10 * self.piece_values[abs(captured)] - self.piece_values[abs(piece)]
-            
-            # Bonus for promotions
-            if move.promotion:
-                score += 900
-            
-            # Bonus for attacking center squares
-            if 2 <= move.end[0] <= 5 and 2 <= move.end[1] <= 5:
-                score += 10
-            
-            return score
+        self.search_result = self.search(depth, movetime, nodes, threads)
+        best_move = self.search_result.best_move
+        return self.decode_move(best_move) if best_move else None
 
-        def quiescence_search(alpha, beta, depth=0, max_depth=4):
-            """Search capture moves to avoid horizon effect"""
-            stand_pat = self.evaluate_board()
-            
-            if stand_pat >= beta:
-                return beta
-            if stand_pat > alpha:
-                alpha = stand_pat
-            if depth >= max_depth:
-                return alpha
-
-            # Only look at captures
-            moves = [move for move in self.generate_legal_moves() 
-                    if self.board[move.end[0]][move.end[1]] != 0]
-            moves.sort(key=move_value, reverse=True)
-
-            for move in moves:
-                piece, rights = self.make_move(move)
-                self.turn *= -1
-                score = -quiescence_search(-beta, -alpha, depth + 1)
-                self.turn *= -1
-                self.undo_move(move, piece, rights)
-                
-                if score >= beta:
-                    return beta
-                if score > alpha:
-                    alpha = score
-
-            return alpha
-
-        def minimax(depth, alpha, beta, maximizing_player):
-            # Check transposition table
-            board_hash = hash(str(self.board.tobytes()) + str(maximizing_player))
-            if board_hash in self.transposition_table:
-                stored_depth, stored_value, stored_move = self.transposition_table[board_hash]
-                if stored_depth >= depth:
-                    return stored_value, stored_move
-
-            if depth == 0:
-                return quiescence_search(alpha, beta), None
-
-            legal_moves = self.generate_legal_moves()
-            if not legal_moves:
-                return -20000 if maximizing_player else 20000, None
-
-            # Move ordering - sort moves by their estimated value
-            legal_moves.sort(key=move_value, reverse=True)
-            
-            best_move = None
-            if maximizing_player:
-                max_eval = float('-inf')
-                for move in legal_moves:
-                    piece, rights = self.make_move(move)
-                    self.turn *= -1
-                    eval, _ = minimax(depth - 1, alpha, beta, False)
-                    self.turn *= -1
-                    self.undo_move(move, piece, rights)
-                    
-                    if eval > max_eval:
-                        max_eval = eval
-                        best_move = move
-                    alpha = max(alpha, eval)
-                    if beta <= alpha:
-                        break
-                # Store in transposition table
-                self.transposition_table[board_hash] = (depth, max_eval, best_move)
-                return max_eval, best_move
-            else:
-                min_eval = float('inf')
-                for move in legal_moves:
-                    piece, rights = self.make_move(move)
-                    self.turn *= -1
-                    eval, _ = minimax(depth - 1, alpha, beta, True)
-                    self.turn *= -1
-                    self.undo_move(move, piece, rights)
-                    
-                    if eval < min_eval:
-                        min_eval = eval
-                        best_move = move
-                    beta = min(beta, eval)
-                    if beta <= alpha:
-                        break
-                # Store in transposition table
-                self.transposition_table[board_hash] = (depth, min_eval, best_move)
-                return min_eval, best_move
-
-        # Call minimax with initial parameters
-        _, best_move = minimax(depth, float('-inf'), float('inf'), self.turn == 1)
-        return best_move
+    def search(self, depth=4, movetime=None, nodes=None, threads=1):
+        """
+        Run the search and return its SearchResult (best move, score, depth,
+        nodes, PV); its SearchStats are left in search_stats. A book move
+        is returned at once with depth 0.
+        """
+        if self.book is not None:
+            move = self.book.choose(self)
+            if move is not None:
+                return SearchResult(move, 0, 0, 0, [move])
+        if USE_NATIVE_SEARCH and Searcher is not None:
+            # The search runs on a copy of the position without holding the GIL
+            if self.searcher is None:
+                self.searcher = Searcher(self.hash_size_mb)
+                if self.bitbases is not None:
+                    self.searcher.set_bitbases(self.bitbases.tables.get('kpk', b''),
+                                               self.bitbases.tables.get('krk', b''))
+            for option, value in self.search_options.items():
+                setattr(self.searcher, option, value)
+            self.searcher.threads = threads
+            self._running = self.searcher
+            try:
+                return self.searcher.search(self._native_position(), depth or 0,
+                                            movetime or 0, nodes or 0)
+            finally:
+                self._running = None
+                self.search_stats = SearchStats.copy_of(self.searcher.stats)
+        if threads > 1:
+            # Processes, since threads would share the GIL
+            if self.smp is None or self.smp.threads != threads:
+                if self.smp is not None:
+                    self.smp.close()
+                self.smp = LazySMP(threads, self.hash_size_mb)
+            self._running = self.smp
+            try:
+                return self.smp.search(self, depth, movetime, nodes, self.search_options)
+            finally:
+                self._running = None
+                self.search_stats = self.smp.stats
+        search = self._running = Search(self, **self.search_options)
+        try:
+            return search.run(depth, movetime, nodes)
+        finally:
+            self._running = None
+            self.search_stats = search.stats
+
+    def stop_search(self):
+        """
+        Stop a search() running on another thread, which then returns its
+        last completed depth. Does nothing if no search has started yet.
+        """
+        running = self._running
+        if running is not None:
+            running.stop()
+
+    def hashfull(self):
+        """Permille of the transposition table in use filled by the current or last search."""
+        if USE_NATIVE_SEARCH and self.searcher is not None:
+            return self.searcher.hashfull()
+        if self.smp is not None and self._running is self.smp:
+            return self.smp.table.hashfull()
+        return self.transposition_table.hashfull() if self.transposition_table is not None else 0
+
+    def set_hash_size(self, size_mb):
+        """Resize the transposition table of every search backend, emptying it."""
+        self.hash_size_mb = size_mb
+        self.transposition_table = None
+        if self.searcher is not None:
+            self.searcher.resize(size_mb)
+        if self.smp is not None:
+            self.smp.close()
+            self.smp = None
+
+    def prior_keys(self):
+        """Keys of the earlier positions a repetition could still match, oldest first."""
+        return self._key_history[max(0, len(self._key_history) - self.halfmove_clock):]
+
+    def set_prior_keys(self, keys):
+        """Restore prior_keys() after from_fen, whose FEN carries no history."""
+        self._key_history = list(keys)
+
+    def _native_position(self):
+        position = Position(self.to_fen())
+        # The FEN has no history, so pass on the positions a repetition could match
+        position.prior_keys = self.prior_keys()
+        return position
     
+
+
+class BitBoard(Board):
+    """
+    Board backed by twelve 64-bit piece sets plus occupancy sets.
+
+    Exposes the same from_fen/to_fen/make_move/undo_move/generate_legal_moves
+    API as Board. Legality, check detection and attack queries work on the
+    bitboards, and self.board is kept in sync on every move for evaluation
+    and the GUI.
+
+    Pseudo-legal move generation is array-backed by default: with the
+    extension (USE_CPP_RIGHTS, the default) it is the same native
+    generator Board uses, reading self.board, because it is faster than
+    walking the piece sets in Python. Moves are generated from the
+    bitboards only with USE_CPP_RIGHTS = False.
+    """
+
+    __slots__ = ('bitboards', 'occupancy', 'squares')
+
+    def __init__(self):
+        super().__init__()
+        self.bitboards = [0] * 12  # Indexed by bitboard.PIECE_INDEX
+        self.occupancy = [0, 0, 0]  # White, black and all pieces
+        self.squares = [0] * 64  # Piece on each square, for fast lookups
+
+    def _copy_position(self, clone):
+        super()._copy_position(clone)
+        clone.bitboards = self.bitboards.copy()
+        clone.occupancy = self.occupancy.copy()
+        clone.squares = self.squares.copy()
+
+    def from_fen(self, fen):
+        super().from_fen(fen)
+        self.bitboards, self.occupancy = bitboards_from_array(self.board)
+        self.squares = self.board.ravel().tolist()
+
+    def piece_at(self, row, col):
+        return self.squares[row * 8 + col]
+
+    def _set_piece(self, row, col, piece):
+        sq = row * 8 + col
+        b = 1 << sq
+        old = self.squares[sq]
+        if old:
+            self.bitboards[PIECE_INDEX[old]] ^= b
+            self.occupancy[old < 0] ^= b
+        if piece:
+            self.bitboards[PIECE_INDEX[piece]] |= b
+            self.occupancy[piece < 0] |= b
+        self.occupancy[BOTH] = self.occupancy[WHITE] | self.occupancy[BLACK]
+        self.squares[sq] = piece
+        # Board._set_piece without reading the old piece back from the array
+        self._zobrist ^= PIECE_KEYS[old][sq] ^ PIECE_KEYS[piece][sq]
+        self.eval_mg += MG_SCORES[piece][sq] - MG_SCORES[old][sq]
+        self.eval_eg += EG_SCORES[piece][sq] - EG_SCORES[old][sq]
+        self.phase += PHASE[piece] - PHASE[old]
+        self.board[row, col] = piece
+
+    def _bitboards(self):
+        return self.bitboards, self.occupancy
+
+    def _pseudo_moves(self, captures_only=False):
+        if USE_CPP_RIGHTS:
+            # The array is kept in sync, and the native generator reads it
+            # far faster than the loops below walk the piece sets
+            return super()._pseudo_moves(captures_only)
+        white = self.turn == 1
+        us, them = (WHITE, BLACK) if white else (BLACK, WHITE)
+        pawns, knights, bishops, rooks, queens, king = \
+            self.bitboards[0:6] if white else self.bitboards[6:12]
+        occ = self.occupancy[BOTH]
+        enemy = self.occupancy[them]
+        targets = enemy if captures_only else ~self.occupancy[us] & FULL
+        moves = array('H')
+        append = moves.append
+
+        # Pawns: pushes, double pushes, captures, en passant and all four promotions
+        forward = 8 if white else -8
+        start_row, last_row = (1, 7) if white else (6, 0)
+        en_passant = self.en_passant[0] * 8 + self.en_passant[1] if self.en_passant else -1
+        for sq in iter_bits(pawns):
+            to = sq + forward
+            if not 0 <= to < 64:
+                continue
+            if not (occ >> to) & 1:
+                if to >> 3 == last_row:
+                    for piece_type in (5, 2, 3, 4):
+                        append(encode_move(sq, to, promotion_flag(piece_type)))
+                elif not captures_only:
+                    append(encode_move(sq, to))
+                    if sq >> 3 == start_row and not (occ >> (to + forward)) & 1:
+                        append(encode_move(sq, to + forward, DOUBLE_PUSH))
+            for to in iter_bits(PAWN_ATTACKS[us][sq] & enemy):
+                if to >> 3 == last_row:
+                    for piece_type in (5, 2, 3, 4):
+                        append(encode_move(sq, to, promotion_flag(piece_type, True)))
+                else:
+                    append(encode_move(sq, to, CAPTURE))
+            if en_passant >= 0 and PAWN_ATTACKS[us][sq] >> en_passant & 1:
+                append(encode_move(sq, en_passant, EN_PASSANT))
+
+        for sq in iter_bits(knights):
+            for to in iter_bits(KNIGHT_ATTACKS[sq] & targets):
+                append(sq | to << 6 | (CAPTURE << 12 if enemy >> to & 1 else 0))
+
+        for sq in iter_bits(bishops | queens):
+            for to in iter_bits(bishop_attacks(sq, occ) & targets):
+                append(sq | to << 6 | (CAPTURE << 12 if enemy >> to & 1 else 0))
+
+        for sq in iter_bits(rooks | queens):
+            for to in iter_bits(rook_attacks(sq, occ) & targets):
+                append(sq | to << 6 | (CAPTURE << 12 if enemy >> to & 1 else 0))
+
+        for sq in iter_bits(king):
+            for to in iter_bits(KING_ATTACKS[sq] & targets):
+                append(sq | to << 6 | (CAPTURE << 12 if enemy >> to & 1 else 0))
+
+        # Castling: king and rook on their home squares and the squares between
+        # them empty; whether the king passes through check is left to _filter_legal
+        home = 0 if white else 56
+        rook = 4 if white else -4
+        side = 'w_' if white else 'b_'
+        if king >> (home + 4) & 1 and not captures_only:
+            if (self.castling_rights[side + 'king'] and self.squares[home + 7] == rook
+                    and not occ & (0b11 << (home + 5))):
+                append(encode_move(home + 4, home + 6, KING_CASTLE))
+            if (self.castling_rights[side + 'queen'] and self.squares[home] == rook
+                    and not occ & (0b111 << (home + 1))):
+                append(encode_move(home + 4, home + 2, QUEEN_CASTLE))
+
+        return moves
+
+
+class NativeBoard(Board):
+    """
+    Board that delegates its state to a native rights_cpp.Position.
+
+    Exposes the same API as Board; self.board is a read-only NumPy view of
+    the native mailbox, so it always reflects the current position. The
+    caller still flips self.turn after make_move, and the native side to
+    move is brought in line with it before each query.
+    """
+
+    __slots__ = ('position',)
+
+    def __init__(self):
+        if Position is None:
+            raise ImportError("NativeBoard needs rights_cpp built with position.cpp")
+        self.position = Position()
+        super().__init__()
+        self.board = self.position.board
+
+    def _reset_incremental(self):
+        # The native position keeps its own key and scores
+        pass
+
+    def _copy_position(self, clone):
+        # The native copy carries the castling rights, clocks, key and history
+        clone.position = self.position.copy()
+        clone.board = clone.position.board
+        clone.turn = self.turn
+
+    @property
+    def eval_mg(self):
+        return self.position.eval_mg
+
+    @property
+    def eval_eg(self):
+        return self.position.eval_eg
+
+    @property
+    def phase(self):
+        return self.position.phase
+
+    @property
+    def castling_rights(self):
+        bits = self.position.castling
+        return {right: bool(bits & flag) for right, flag in CASTLING_BITS.items()}
+
+    @castling_rights.setter
+    def castling_rights(self, rights):
+        self.position.castling = castling_mask(rights)
+
+    @property
+    def halfmove_clock(self):
+        return self.position.halfmove_clock
+
+    @halfmove_clock.setter
+    def halfmove_clock(self, clock):
+        self.position.halfmove_clock = clock
+
+    @property
+    def en_passant(self):
+        sq = self.position.ep_square
+        return None if sq < 0 else SQUARES[sq]
+
+    @en_passant.setter
+    def en_passant(self, square):
+        self.position.ep_square = -1 if square is None else square[0] * 8 + square[1]
+
+    def _sync_turn(self):
+        if self.position.turn != self.turn:
+            self.position.turn = self.turn
+
+    @property
+    def zobrist_key(self):
+        self._sync_turn()
+        return self.position.key
+
+    def piece_at(self, row, col):
+        return self.position.piece_at(row * 8 + col)
+
+    def to_fen(self):
+        self._sync_turn()
+        return self.position.fen()
+
+    def from_fen(self, fen):
+        self.position.set_fen(fen)
+        self.turn = self.position.turn
+
+    def _bitboards(self):
+        return self.position.bitboards()
+
+    def is_square_attacked(self, row, col, by_white):
+        return self.position.is_square_attacked(row * 8 + col, by_white)
+
+    def in_check(self, white):
+        return self.position.king_attacked(1 if white else -1)
+
+    def generate_legal_moves(self, is_pseudo=False, for_white=None, encoded=False, captures_only=False):
+        self._sync_turn()
+        if is_pseudo:
+            moves = self.position.pseudo_moves(captures_only)
+        else:
+            moves = self.position.legal_moves(captures_only)
+        moves = array('H', moves.tobytes())
+        if encoded:
+            return moves
+        return [self.decode_move(code) for code in moves]
+
+    def make_move(self, move):
+        if not isinstance(move, (int, np.integer)):
+            move = self.encode_move(move)
+        code = int(move)
+        captured_piece = self.position.piece_at((code >> 6) & 63)
+        original_castling_rights = self.castling_rights
+        self._sync_turn()
+        self.position.push(code)
+        return captured_piece, original_castling_rights
+
+    def undo_move(self, move, captured_piece=None, original_castling_rights=None):
+        self.position.pop()
+
+    def make_null_move(self):
+        self._sync_turn()
+        self.position.push_null()
+
+    def undo_null_move(self):
+        self.position.pop()
+
+    def is_repetition(self, count=1):
+        self._sync_turn()
+        return self.position.is_repetition(count)
+
+    def is_fifty_move_draw(self):
+        return self.position.is_fifty_move_draw()
+
+    def prior_keys(self):
+        keys = self.position.game_keys
+        return keys[max(0, len(keys) - self.halfmove_clock):]
+
+    def set_prior_keys(self, keys):
+        self.position.prior_keys = list(keys)
+
+    def _native_position(self):
+        self._sync_turn()
+        return self.position
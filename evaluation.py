@@ -0,0 +1,225 @@
+"""
+Evaluation weights and the per-square score tables built from them.
+
+Board keeps running midgame/endgame sums of MG_SCORES/EG_SCORES and a game
+phase as pieces are placed and removed, so a leaf evaluation only has to
+taper the two sums. Scores are from White's perspective.
+
+evaluate_batch scores a stack of boards at once with NumPy, for tuning
+(tune.py) and other bulk work.
+"""
+import numpy as np
+
+# Piece-square tables are written from White's side, rank 8 in the first row
+PIECE_VALUES = {
+    1: 100,    # Pawn
+    2: 320,    # Knight
+    3: 330,    # Bishop
+    4: 500,    # Rook
+    5: 900,    # Queen
+    6: 20000   # King
+}
+
+PAWN_TABLE = np.array([
+    [ 0,  0,  0,  0,  0,  0,  0,  0],
+    [50, 50, 50, 50, 50, 50, 50, 50],
+    [10, 10, 20, 30, 30, 20, 10, 10],
+    [ 5,  5, 10, 25, 25, 10,  5,  5],
+    [ 0,  0,  0, 20, 20,  0,  0,  0],
+    [ 5, -5,-10,  0,  0,-10, -5,  5],
+    [ 5, 10, 10,-20,-20, 10, 10,  5],
+    [ 0,  0,  0,  0,  0,  0,  0,  0]
+])
+
+KNIGHT_TABLE = np.array([
+    [-50,-40,-30,-30,-30,-30,-40,-50],
+    [-40,-20,  0,  0,  0,  0,-20,-40],
+    [-30,  0, 10, 15, 15, 10,  0,-30],
+    [-30,  5, 15, 20, 20, 15,  5,-30],
+    [-30,  0, 15, 20, 20, 15,  0,-30],
+    [-30,  5, 10, 15, 15, 10,  5,-30],
+    [-40,-20,  0,  5,  5,  0,-20,-40],
+    [-50,-40,-30,-30,-30,-30,-40,-50]
+])
+
+BISHOP_TABLE = np.array([
+    [-20,-10,-10,-10,-10,-10,-10,-20],
+    [-10,  0,  0,  0,  0,  0,  0,-10],
+    [-10,  0,  5, 10, 10,  5,  0,-10],
+    [-10,  5,  5, 10, 10,  5,  5,-10],
+    [-10,  0, 10, 10, 10, 10,  0,-10],
+    [-10, 10, 10, 10, 10, 10, 10,-10],
+    [-10,  5,  0,  0,  0,  0,  5,-10],
+    [-20,-10,-10,-10,-10,-10,-10,-20]
+])
+
+ROOK_TABLE = np.array([
+    [ 0,  0,  0,  0,  0,  0,  0,  0],
+    [ 5, 10, 10, 10, 10, 10, 10,  5],
+    [-5,  0,  0,  0,  0,  0,  0, -5],
+    [-5,  0,  0,  0,  0,  0,  0, -5],
+    [-5,  0,  0,  0,  0,  0,  0, -5],
+    [-5,  0,  0,  0,  0,  0,  0, -5],
+    [-5,  0,  0,  0,  0,  0,  0, -5],
+    [ 0,  0,  0,  5,  5,  0,  0,  0]
+])
+
+QUEEN_TABLE = np.array([
+    [-20,-10,-10, -5, -5,-10,-10,-20],
+    [-10,  0,  0,  0,  0,  0,  0,-10],
+    [-10,  0,  5,  5,  5,  5,  0,-10],
+    [ -5,  0,  5,  5,  5,  5,  0, -5],
+    [  0,  0,  5,  5,  5,  5,  0, -5],
+    [-10,  5,  5,  5,  5,  5,  0,-10],
+    [-10,  0,  5,  0,  0,  0,  0,-10],
+    [-20,-10,-10, -5, -5,-10,-10,-20]
+])
+
+KING_MG_TABLE = np.array([
+    [-30,-40,-40,-50,-50,-40,-40,-30],
+    [-30,-40,-40,-50,-50,-40,-40,-30],
+    [-30,-40,-40,-50,-50,-40,-40,-30],
+    [-30,-40,-40,-50,-50,-40,-40,-30],
+    [-20,-30,-30,-40,-40,-30,-30,-20],
+    [-10,-20,-20,-20,-20,-20,-20,-10],
+    [ 20, 20,  0,  0,  0,  0, 20, 20],
+    [ 20, 30, 10,  0,  0, 10, 30, 20]
+])
+
+KING_EG_TABLE = np.array([
+    [-50,-40,-30,-20,-20,-30,-40,-50],
+    [-30,-20,-10,  0,  0,-10,-20,-30],
+    [-30,-10, 20, 30, 30, 20,-10,-30],
+    [-30,-10, 30, 40, 40, 30,-10,-30],
+    [-30,-10, 30, 40, 40, 30,-10,-30],
+    [-30,-10, 20, 30, 30, 20,-10,-30],
+    [-30,-30,  0,  0,  0,  0,-30,-30],
+    [-50,-30,-30,-30,-30,-30,-30,-50]
+])
+
+CENTER_BONUS = 10          # Any piece on the central 4x4 squares
+PAWN_ADVANCE_BONUS = 10    # Per rank a pawn has advanced
+KING_EXPOSED_PENALTY = 50  # King off its back two ranks, midgame only
+MOBILITY_WEIGHT = 5
+
+# Game phase contributed by each piece type, 24 with all pieces on the board
+PHASE_WEIGHTS = {1: 0, 2: 1, 3: 1, 4: 2, 5: 4, 6: 0}
+MAX_PHASE = 24
+
+
+def _square_scores(piece_type, endgame):
+    """Score of a white piece_type on each square, indexed row * 8 + col."""
+    tables = {
+        1: PAWN_TABLE,
+        2: KNIGHT_TABLE,
+        3: BISHOP_TABLE,
+        4: ROOK_TABLE,
+        5: QUEEN_TABLE,
+        6: KING_EG_TABLE if endgame else KING_MG_TABLE,
+    }
+    scores = []
+    for row in range(8):
+        for col in range(8):
+            score = PIECE_VALUES[piece_type] + int(tables[piece_type][7 - row][col])
+            if 2 <= row <= 5 and 2 <= col <= 5:
+                score += CENTER_BONUS
+            if piece_type == 1:
+                score += (row - 1) * PAWN_ADVANCE_BONUS
+            if piece_type == 6 and row > 1 and not endgame:
+                score -= KING_EXPOSED_PENALTY
+            scores.append(score)
+    return scores
+
+
+def build_square_scores(endgame):
+    """Per-square scores for every piece value, black pieces mirrored and negated."""
+    scores = {0: [0] * 64}
+    for piece_type in range(1, 7):
+        white = _square_scores(piece_type, endgame)
+        scores[piece_type] = white
+        scores[-piece_type] = [-white[(7 - (sq >> 3)) * 8 + (sq & 7)] for sq in range(64)]
+    return scores
+
+
+MG_SCORES = build_square_scores(endgame=False)
+EG_SCORES = build_square_scores(endgame=True)
+PHASE = {0: 0}
+for _piece_type, _weight in PHASE_WEIGHTS.items():
+    PHASE[_piece_type] = PHASE[-_piece_type] = _weight
+
+
+def score_position(board):
+    """Midgame sum, endgame sum and phase of an 8x8 board, from scratch."""
+    mg = eg = phase = 0
+    for sq, piece in enumerate(np.asarray(board).ravel().tolist()):
+        if piece:
+            mg += MG_SCORES[piece][sq]
+            eg += EG_SCORES[piece][sq]
+            phase += PHASE[piece]
+    return mg, eg, phase
+
+
+def tapered(mg, eg, phase):
+    phase = min(phase, MAX_PHASE)
+    return (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+
+
+# Rows indexed by piece value + 6, for looking up whole stacks of boards
+MG_ARRAY = np.array([MG_SCORES[piece] for piece in range(-6, 7)], dtype=np.int64)
+EG_ARRAY = np.array([EG_SCORES[piece] for piece in range(-6, 7)], dtype=np.int64)
+PHASE_ARRAY = np.array([PHASE[piece] for piece in range(-6, 7)], dtype=np.int64)
+
+KNIGHT_OFFSETS = ((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+ROOK_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+def _shift(masks, rows, cols):
+    """(N, 8, 8) masks moved rows up and cols right, with nothing wrapping round."""
+    shifted = np.zeros_like(masks)
+    shifted[:, max(rows, 0):8 + min(rows, 0), max(cols, 0):8 + min(cols, 0)] = \
+        masks[:, max(-rows, 0):8 + min(-rows, 0), max(-cols, 0):8 + min(-cols, 0)]
+    return shifted
+
+
+def batch_mobility(boards, white):
+    """bitboard.mobility for each of an (N, 8, 8) stack of boards."""
+    sign = 1 if white else -1
+    empty = boards == 0
+    targets = boards * sign <= 0
+    # Attacks per square, summed over pieces: overlapping attacks count twice
+    attacks = np.zeros(boards.shape, dtype=np.int8)
+    knights = boards == 2 * sign
+    for rows, cols in KNIGHT_OFFSETS:
+        attacks += _shift(knights, rows, cols)
+    # A ray stops at the first piece, so rays of one direction never overlap
+    # and the fill counts each piece's squares exactly once
+    for directions, pieces in ((BISHOP_DIRECTIONS, (3, 5)), (ROOK_DIRECTIONS, (4, 5))):
+        sliders = (boards == pieces[0] * sign) | (boards == pieces[1] * sign)
+        for rows, cols in directions:
+            rays = sliders
+            while rays.any():
+                rays = _shift(rays, rows, cols)
+                attacks += rays
+                rays &= empty
+    attacks *= targets
+    return attacks.reshape(len(boards), 64).sum(axis=1, dtype=np.int64)
+
+
+def evaluate_batch(boards, turns=None):
+    """
+    Board.evaluate_board for an (N, 8, 8) int8 stack of boards laid out like
+    Board.board. Scores are from White's perspective, or from the side to
+    move's when turns (N values of 1 or -1) is given.
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    index = boards.reshape(len(boards), 64).astype(np.intp) + 6
+    squares = np.arange(64)
+    mg = MG_ARRAY[index, squares].sum(axis=1)
+    eg = EG_ARRAY[index, squares].sum(axis=1)
+    phase = np.minimum(PHASE_ARRAY[index].sum(axis=1), MAX_PHASE)
+    score = (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+    score += (batch_mobility(boards, True) - batch_mobility(boards, False)) * MOBILITY_WEIGHT
+    if turns is not None:
+        score *= np.asarray(turns, dtype=np.int64)
+    return score
@@ -0,0 +1,120 @@
+"""
+Move ordering shared by every search on a Board.
+
+The hash move comes first, then promotions and captures that win or trade
+material, then the two killer moves of the ply, then captures that lose
+material, then quiet moves by their butterfly history score. Killers and
+history are kept across iterations and searches and cleared by
+Board.new_game(). The native Searcher orders moves the same way.
+"""
+from bitboard import BOTH, PIECE_INDEX, attackers_to
+from evaluation import PIECE_VALUES
+from rights import CAPTURE, EN_PASSANT, PROMOTION, PROMOTION_PIECES
+
+MAX_PLY = 64
+
+HASH_MOVE = 1 << 30
+GOOD_CAPTURE = 1 << 28
+KILLER = 1 << 26  # Second killer scores one less
+BAD_CAPTURE = 1 << 25
+HISTORY_LIMIT = 1 << 22  # History is halved when an entry passes this
+
+
+def see(board, move):
+    """
+    Static exchange evaluation: material the side to move wins (or loses,
+    if negative) when both sides keep recapturing on the target square with
+    their least valuable piece, each free to stop when it pays.
+    """
+    bitboards, occupancy = board._bitboards()
+    from_sq, to = move & 63, (move >> 6) & 63
+    attacker = board.piece_at(*divmod(from_sq, 8))
+    occ = occupancy[BOTH] ^ (1 << from_sq)
+    if move >> 12 == EN_PASSANT:
+        victim = 1
+        occ ^= 1 << ((from_sq & ~7) | (to & 7))
+    else:
+        victim = abs(board.piece_at(*divmod(to, 8)))
+
+    # gain[d] is what the side making capture d has won if the other stops there
+    gain = [PIECE_VALUES[victim]]
+    on_square = PIECE_VALUES[abs(attacker)]
+    white = attacker < 0
+    while True:
+        # Recomputed on the shrinking occupancy, so sliders behind a capturer join in
+        attackers = attackers_to(bitboards, occ, to, white) & occ
+        if not attackers:
+            break
+        for piece_type in range(1, 7):
+            pieces = attackers & bitboards[PIECE_INDEX[piece_type if white else -piece_type]]
+            if pieces:
+                break
+        gain.append(on_square - gain[-1])
+        on_square = PIECE_VALUES[piece_type]
+        occ ^= pieces & -pieces
+        white = not white
+    while len(gain) > 1:
+        last = gain.pop()
+        gain[-1] = -max(-gain[-1], last)
+    return gain[0]
+
+
+def capture_value(board, move):
+    """MVV-LVA score of a capture and whether it wins or trades material."""
+    attacker = abs(board.piece_at(*divmod(move & 63, 8)))
+    row, col = divmod((move >> 6) & 63, 8)
+    victim = 1 if move >> 12 == EN_PASSANT else abs(board.piece_at(row, col))
+    victim_value, attacker_value = PIECE_VALUES[victim], PIECE_VALUES[attacker]
+    # Taking a dearer piece never loses material, anything else is checked with SEE
+    winning = victim_value >= attacker_value or see(board, move) >= 0
+    return 10 * victim_value - attacker_value, winning
+
+
+class MoveOrderer:
+
+    def __init__(self):
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [0] * (2 * 64 * 64)  # [side][from][to], White first
+
+    def clear(self):
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [0] * (2 * 64 * 64)
+
+    def new_search(self):
+        # Killers belong to plies of the last search; history only loses weight
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [value >> 1 for value in self.history]
+
+    def score(self, board, move, tt_move, ply, side):
+        if move == tt_move:
+            return HASH_MOVE
+        flags = move >> 12
+        if flags & PROMOTION:
+            return GOOD_CAPTURE + PIECE_VALUES[PROMOTION_PIECES[flags]]
+        if flags & CAPTURE:
+            value, winning = capture_value(board, move)
+            return (GOOD_CAPTURE if winning else BAD_CAPTURE) + value
+        killers = self.killers[ply] if ply < MAX_PLY else ()
+        if move in killers:
+            return KILLER - killers.index(move)
+        # History, with a centre bonus to break ties while it is still empty
+        row, col = divmod((move >> 6) & 63, 8)
+        return self.history[side + (move & 0xFFF)] * 2 + (2 <= row <= 5 and 2 <= col <= 5)
+
+    def order(self, board, moves, tt_move, ply):
+        side = 0 if board.turn == 1 else 4096
+        return sorted(moves, key=lambda move: self.score(board, move, tt_move, ply, side), reverse=True)
+
+    def cutoff(self, board, move, depth, ply):
+        """Record a quiet move that caused a beta cutoff."""
+        if move >> 12 & (CAPTURE | PROMOTION):
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        index = (0 if board.turn == 1 else 4096) + (move & 0xFFF)
+        self.history[index] += depth * depth
+        if self.history[index] > HISTORY_LIMIT:
+            self.history = [value >> 1 for value in self.history]
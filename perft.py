@@ -0,0 +1,127 @@
+"""
+Perft: count the leaf nodes of the legal move tree to validate move generation.
+
+    python perft.py                       # standard suite to depth 3 on every backend
+    python perft.py --depth 4 --backend NativeBoard
+    python perft.py --fen "<fen>" --depth 3 --divide
+"""
+import argparse
+import sys
+import time
+
+import chess_eng
+from rights import move_to_uci
+
+# Standard positions with their published node counts for depths 1, 2, ...
+SUITE = [
+    ("startpos", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+BACKENDS = {
+    'Board': chess_eng.Board,
+    'BitBoard': chess_eng.BitBoard,
+}
+if chess_eng.Position is not None:
+    BACKENDS['NativeBoard'] = chess_eng.NativeBoard
+
+
+def perft(board, depth):
+    """Number of legal move sequences of length depth from the current position."""
+    moves = board.generate_legal_moves(encoded=True)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.make_move(move)
+        board.turn *= -1
+        nodes += perft(board, depth - 1)
+        board.turn *= -1
+        board.undo_move(move)
+    return nodes
+
+
+def divide(board, depth):
+    """Perft of each root move, keyed by its UCI string."""
+    counts = {}
+    for move in board.generate_legal_moves(encoded=True):
+        board.make_move(move)
+        board.turn *= -1
+        counts[move_to_uci(move)] = perft(board, depth - 1)
+        board.turn *= -1
+        board.undo_move(move)
+    return counts
+
+
+def run_suite(backends, max_depth):
+    """Run SUITE on each backend, printing nodes per second; returns the mismatch count."""
+    mismatches = 0
+    print(f"{'Backend':<12} {'Position':<10} {'Depth':>5} {'Nodes':>10} {'Expected':>10} {'Time':>8} {'NPS':>10}")
+    print("-" * 72)
+    for name in backends:
+        total_nodes = total_time = 0
+        for position, fen, counts in SUITE:
+            board = BACKENDS[name]()
+            board.from_fen(fen)
+            for depth, expected in enumerate(counts[:max_depth], 1):
+                start = time.perf_counter()
+                nodes = perft(board, depth)
+                elapsed = time.perf_counter() - start
+                total_nodes += nodes
+                total_time += elapsed
+                flag = "" if nodes == expected else "  MISMATCH"
+                mismatches += nodes != expected
+                nps = nodes / elapsed if elapsed > 0 else float('inf')
+                print(f"{name:<12} {position:<10} {depth:>5} {nodes:>10} {expected:>10} "
+                      f"{elapsed:>7.3f}s {nps:>10.0f}{flag}")
+        nps = total_nodes / total_time if total_time > 0 else float('inf')
+        print(f"{name:<12} {'total':<10} {'':>5} {total_nodes:>10} {'':>10} {total_time:>7.3f}s {nps:>10.0f}")
+        print("-" * 72)
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and time move generation with perft")
+    parser.add_argument('--depth', type=int, default=3, help="maximum depth (default 3)")
+    parser.add_argument('--backend', action='append', choices=sorted(BACKENDS),
+                        help="backend to run, may be repeated (default all)")
+    parser.add_argument('--fen', help="run one position instead of the suite")
+    parser.add_argument('--divide', action='store_true', help="with --fen, list the count per root move")
+    args = parser.parse_args(argv)
+    backends = args.backend or list(BACKENDS)
+
+    if args.fen:
+        for name in backends:
+            board = BACKENDS[name]()
+            board.from_fen(args.fen)
+            start = time.perf_counter()
+            if args.divide:
+                counts = divide(board, args.depth)
+                for uci, nodes in sorted(counts.items()):
+                    print(f"{uci}: {nodes}")
+                nodes = sum(counts.values())
+            else:
+                nodes = perft(board, args.depth)
+            elapsed = time.perf_counter() - start
+            print(f"{name}: {nodes} nodes in {elapsed:.3f}s ({nodes / max(elapsed, 1e-9):.0f} nps)")
+        return 0
+
+    mismatches = run_suite(backends, args.depth)
+    if mismatches:
+        print(f"WARNING: {mismatches} node count mismatches")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,492 @@
+#include "position.hpp"
+#include <algorithm>
+#include <cstdlib>
+#include <initializer_list>
+#include <sstream>
+#include <stdexcept>
+
+namespace {
+
+struct Tables {
+    uint64_t piece_keys[12][64];
+    uint64_t side_key;
+    uint64_t castling_keys[16];
+    uint64_t ep_keys[8];
+    uint64_t knight[64];
+    uint64_t king[64];
+    uint64_t pawn[2][64];
+    uint64_t rays[8][64];
+
+    Tables() {
+        // Same splitmix64 sequence and order as zobrist.py
+        uint64_t state = 0x2545F4914F6CDD1DULL;
+        auto next = [&state]() {
+            state += 0x9E3779B97F4A7C15ULL;
+            uint64_t z = state;
+            z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+            z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+            return z ^ (z >> 31);
+        };
+        for (int p = 0; p < 12; p++)
+            for (int sq = 0; sq < 64; sq++) piece_keys[p][sq] = next();
+        side_key = next();
+        for (int i = 0; i < 16; i++) castling_keys[i] = next();
+        for (int i = 0; i < 8; i++) ep_keys[i] = next();
+
+        static const int knight_steps[8][2] = {
+            {2, 1}, {2, -1}, {-2, 1}, {-2, -1}, {1, 2}, {1, -2}, {-1, 2}, {-1, -2}};
+        static const int king_steps[8][2] = {
+            {1, 0}, {-1, 0}, {0, 1}, {0, -1}, {1, 1}, {1, -1}, {-1, 1}, {-1, -1}};
+        // Directions 0-3 point to higher squares, 4-7 to lower squares
+        static const int ray_steps[8][2] = {
+            {1, 0}, {0, 1}, {1, 1}, {1, -1}, {-1, 0}, {0, -1}, {-1, -1}, {-1, 1}};
+        for (int sq = 0; sq < 64; sq++) {
+            int row = sq / 8, col = sq % 8;
+            knight[sq] = king[sq] = pawn[0][sq] = pawn[1][sq] = 0;
+            for (int i = 0; i < 8; i++) {
+                int r = row + knight_steps[i][0], c = col + knight_steps[i][1];
+                if (r >= 0 && r < 8 && c >= 0 && c < 8) knight[sq] |= 1ULL << (r * 8 + c);
+                r = row + king_steps[i][0];
+                c = col + king_steps[i][1];
+                if (r >= 0 && r < 8 && c >= 0 && c < 8) king[sq] |= 1ULL << (r * 8 + c);
+            }
+            for (int j : {-1, 1}) {
+                int c = col + j;
+                if (c < 0 || c >= 8) continue;
+                if (row < 7) pawn[0][sq] |= 1ULL << ((row + 1) * 8 + c);
+                if (row > 0) pawn[1][sq] |= 1ULL << ((row - 1) * 8 + c);
+            }
+            for (int d = 0; d < 8; d++) {
+                rays[d][sq] = 0;
+                int r = row + ray_steps[d][0], c = col + ray_steps[d][1];
+                while (r >= 0 && r < 8 && c >= 0 && c < 8) {
+                    rays[d][sq] |= 1ULL << (r * 8 + c);
+                    r += ray_steps[d][0];
+                    c += ray_steps[d][1];
+                }
+            }
+        }
+    }
+};
+
+const int SEE_VALUES[7] = {0, 100, 320, 330, 500, 900, 20000};  // evaluation.PIECE_VALUES
+
+int MG_SCORES[12][64];
+int EG_SCORES[12][64];
+int PHASE_WEIGHTS[12];
+int MAX_PHASE = 24;
+int MOBILITY_WEIGHT = 0;
+
+const Tables& tables() {
+    static const Tables t;
+    return t;
+}
+
+inline int lsb(uint64_t bb) { return __builtin_ctzll(bb); }
+inline int msb(uint64_t bb) { return 63 - __builtin_clzll(bb); }
+
+// Rook directions are 0, 1, 4, 5 and bishop directions 2, 3, 6, 7
+uint64_t slide(int sq, uint64_t occ, int first_dir) {
+    const Tables& t = tables();
+    uint64_t attacks = 0;
+    for (int d : {first_dir, first_dir + 1, first_dir + 4, first_dir + 5}) {
+        uint64_t ray = t.rays[d][sq];
+        uint64_t blockers = ray & occ;
+        if (blockers) {
+            int blocker = d < 4 ? lsb(blockers) : msb(blockers);
+            ray ^= t.rays[d][blocker];
+        }
+        attacks |= ray;
+    }
+    return attacks;
+}
+
+}  // namespace
+
+int piece_index(int64_t piece) {
+    return piece > 0 ? static_cast<int>(piece) - 1 : 5 - static_cast<int>(piece);
+}
+
+uint64_t knight_attacks(int sq) { return tables().knight[sq]; }
+uint64_t bishop_attacks(int sq, uint64_t occ) { return slide(sq, occ, 2); }
+uint64_t rook_attacks(int sq, uint64_t occ) { return slide(sq, occ, 0); }
+
+void set_eval_tables(const std::vector<int>& mg, const std::vector<int>& eg,
+                     const std::vector<int>& phase, int max_phase, int mobility_weight) {
+    if (mg.size() != 12 * 64 || eg.size() != 12 * 64 || phase.size() != 12)
+        throw std::invalid_argument("expected 12x64 score tables and 12 phase weights");
+    for (int p = 0; p < 12; p++) {
+        for (int sq = 0; sq < 64; sq++) {
+            MG_SCORES[p][sq] = mg[p * 64 + sq];
+            EG_SCORES[p][sq] = eg[p * 64 + sq];
+        }
+        PHASE_WEIGHTS[p] = phase[p];
+    }
+    MAX_PHASE = max_phase;
+    MOBILITY_WEIGHT = mobility_weight;
+}
+
+Position::Position() { clear(); }
+
+Position::Position(const std::string& fen) { set_fen(fen); }
+
+void Position::clear() {
+    for (int sq = 0; sq < 64; sq++) board[sq] = 0;
+    for (int p = 0; p < 12; p++) pieces[p] = 0;
+    occupancy[0] = occupancy[1] = occupancy[2] = 0;
+    side = 1;
+    castling = 0;
+    ep_square = -1;
+    halfmove = 0;
+    fullmove = 1;
+    hash = tables().castling_keys[0];
+    eval_mg = eval_eg = phase = 0;
+    history.clear();
+    prior_keys.clear();
+}
+
+void Position::set_piece(int sq, int64_t piece) {
+    const Tables& t = tables();
+    uint64_t bit = 1ULL << sq;
+    int64_t old = board[sq];
+    if (old) {
+        int index = piece_index(old);
+        pieces[index] ^= bit;
+        occupancy[old < 0] ^= bit;
+        hash ^= t.piece_keys[index][sq];
+        eval_mg -= MG_SCORES[index][sq];
+        eval_eg -= EG_SCORES[index][sq];
+        phase -= PHASE_WEIGHTS[index];
+    }
+    if (piece) {
+        int index = piece_index(piece);
+        pieces[index] |= bit;
+        occupancy[piece < 0] |= bit;
+        hash ^= t.piece_keys[index][sq];
+        eval_mg += MG_SCORES[index][sq];
+        eval_eg += EG_SCORES[index][sq];
+        phase += PHASE_WEIGHTS[index];
+    }
+    occupancy[2] = occupancy[0] | occupancy[1];
+    board[sq] = piece;
+}
+
+void Position::set_turn(int turn) {
+    if (turn != side) {
+        hash ^= tables().side_key;
+        side = turn;
+    }
+}
+
+void Position::set_castling(int bits) {
+    hash ^= tables().castling_keys[castling] ^ tables().castling_keys[bits];
+    castling = bits;
+}
+
+void Position::set_en_passant(int sq) {
+    if (ep_square >= 0) hash ^= tables().ep_keys[ep_square % 8];
+    if (sq >= 0) hash ^= tables().ep_keys[sq % 8];
+    ep_square = sq;
+}
+
+void Position::set_fen(const std::string& fen) {
+    clear();
+    std::istringstream parts(fen);
+    std::string placement, turn = "w", rights = "-", ep = "-";
+    parts >> placement >> turn >> rights >> ep >> halfmove >> fullmove;
+
+    int rank = 7, file = 0;
+    const std::string symbols = "PNBRQKpnbrqk";
+    for (char c : placement) {
+        if (c == '/') {
+            rank--;
+            file = 0;
+        } else if (c >= '1' && c <= '8') {
+            file += c - '0';
+        } else {
+            size_t index = symbols.find(c);
+            if (index == std::string::npos) throw std::invalid_argument("Invalid FEN piece: " + fen);
+            int64_t piece = index < 6 ? static_cast<int64_t>(index + 1) : -static_cast<int64_t>(index - 5);
+            if (rank >= 0 && rank < 8 && file >= 0 && file < 8) set_piece(rank * 8 + file, piece);
+            file++;
+        }
+    }
+    set_turn(turn == "b" ? -1 : 1);
+    int bits = 0;
+    if (rights.find('K') != std::string::npos) bits |= W_KING;
+    if (rights.find('Q') != std::string::npos) bits |= W_QUEEN;
+    if (rights.find('k') != std::string::npos) bits |= B_KING;
+    if (rights.find('q') != std::string::npos) bits |= B_QUEEN;
+    set_castling(bits);
+    if (ep.size() == 2) set_en_passant((ep[1] - '1') * 8 + (ep[0] - 'a'));
+}
+
+std::string Position::fen() const {
+    const std::string symbols = " PNBRQKpnbrqk";
+    std::string fen;
+    for (int rank = 7; rank >= 0; rank--) {
+        int empty = 0;
+        for (int file = 0; file < 8; file++) {
+            int64_t piece = board[rank * 8 + file];
+            if (!piece) {
+                empty++;
+                continue;
+            }
+            if (empty) fen += static_cast<char>('0' + empty);
+            empty = 0;
+            fen += symbols[piece > 0 ? piece : 6 - piece];
+        }
+        if (empty) fen += static_cast<char>('0' + empty);
+        if (rank > 0) fen += '/';
+    }
+    fen += side == 1 ? " w " : " b ";
+    std::string rights;
+    if (castling & W_KING) rights += 'K';
+    if (castling & W_QUEEN) rights += 'Q';
+    if (castling & B_KING) rights += 'k';
+    if (castling & B_QUEEN) rights += 'q';
+    fen += rights.empty() ? "-" : rights;
+    fen += ' ';
+    if (ep_square < 0) {
+        fen += '-';
+    } else {
+        fen += static_cast<char>('a' + ep_square % 8);
+        fen += static_cast<char>('1' + ep_square / 8);
+    }
+    fen += ' ' + std::to_string(halfmove) + ' ' + std::to_string(fullmove);
+    return fen;
+}
+
+bool Position::is_square_attacked(int sq, bool by_white) const {
+    const Tables& t = tables();
+    const uint64_t* p = by_white ? pieces : pieces + 6;
+    int defender = by_white ? 1 : 0;
+    uint64_t occ = occupancy[2];
+    if (t.pawn[defender][sq] & p[0]) return true;
+    if (t.knight[sq] & p[1]) return true;
+    if (t.king[sq] & p[5]) return true;
+    if ((p[2] | p[4]) && (slide(sq, occ, 2) & (p[2] | p[4]))) return true;
+    if ((p[3] | p[4]) && (slide(sq, occ, 0) & (p[3] | p[4]))) return true;
+    return false;
+}
+
+int Position::see(uint16_t move) const {
+    const Tables& t = tables();
+    int from = move & 63, to = (move >> 6) & 63, flags = move >> 12;
+    uint64_t occ = occupancy[2] ^ (1ULL << from);
+    int victim = std::abs(static_cast<int>(board[to]));
+    if (flags == EN_PASSANT) {
+        victim = 1;
+        occ ^= 1ULL << ((from & ~7) | (to & 7));
+    }
+    uint64_t diagonal = pieces[2] | pieces[4] | pieces[8] | pieces[10];
+    uint64_t straight = pieces[3] | pieces[4] | pieces[9] | pieces[10];
+    uint64_t attackers = (t.pawn[1][to] & pieces[0]) | (t.pawn[0][to] & pieces[6])
+        | (t.knight[to] & (pieces[1] | pieces[7])) | (t.king[to] & (pieces[5] | pieces[11]))
+        | (slide(to, occ, 2) & diagonal) | (slide(to, occ, 0) & straight);
+
+    // gain[d] is what the side making capture d has won if the other stops there
+    int gain[33];
+    int d = 0;
+    gain[0] = SEE_VALUES[victim];
+    int on_square = SEE_VALUES[std::abs(static_cast<int>(board[from]))];
+    int color = board[from] > 0 ? 0 : 1;  // Capturing side: 0 white, 1 black, as in occupancy
+    while (true) {
+        color ^= 1;
+        uint64_t own = attackers & occ & occupancy[color];
+        if (!own) break;
+        const uint64_t* p = color == 0 ? pieces : pieces + 6;
+        int type = 0;
+        while (!(own & p[type])) type++;
+        d++;
+        gain[d] = on_square - gain[d - 1];
+        on_square = SEE_VALUES[type + 1];
+        uint64_t bb = own & p[type];
+        occ ^= bb & (~bb + 1);
+        // Sliders behind the piece that just captured join in
+        if (type == 0 || type == 2 || type == 4) attackers |= slide(to, occ, 2) & diagonal;
+        if (type == 3 || type == 4) attackers |= slide(to, occ, 0) & straight;
+    }
+    while (d > 0) {
+        gain[d - 1] = -std::max(-gain[d - 1], gain[d]);
+        d--;
+    }
+    return gain[0];
+}
+
+bool Position::king_attacked(int color) const {
+    uint64_t king = pieces[color == 1 ? 5 : 11];
+    if (!king) return false;
+    return is_square_attacked(lsb(king), color != 1);
+}
+
+bool Position::in_check() const { return king_attacked(side); }
+
+static int mobility(const uint64_t* p, uint64_t own, uint64_t occ) {
+    // Knights, bishops, rooks and queens of one colour, as in bitboard.mobility
+    uint64_t targets = ~own;
+    int count = 0;
+    for (uint64_t bb = p[1]; bb; bb &= bb - 1) count += __builtin_popcountll(knight_attacks(lsb(bb)) & targets);
+    for (uint64_t bb = p[2] | p[4]; bb; bb &= bb - 1) count += __builtin_popcountll(bishop_attacks(lsb(bb), occ) & targets);
+    for (uint64_t bb = p[3] | p[4]; bb; bb &= bb - 1) count += __builtin_popcountll(rook_attacks(lsb(bb), occ) & targets);
+    return count;
+}
+
+int Position::evaluate() const {
+    int p = phase < MAX_PHASE ? phase : MAX_PHASE;
+    // Floor division, as evaluation.tapered does
+    int numerator = eval_mg * p + eval_eg * (MAX_PHASE - p);
+    int score = numerator / MAX_PHASE;
+    if (numerator % MAX_PHASE && numerator < 0) score--;
+    score += (mobility(pieces, occupancy[0], occupancy[2])
+              - mobility(pieces + 6, occupancy[1], occupancy[2])) * MOBILITY_WEIGHT;
+    return score;
+}
+
+void Position::push(uint16_t move) {
+    int from = move & 63, to = (move >> 6) & 63, flags = move >> 12;
+    int64_t piece = board[from];
+    int64_t captured = board[to];
+    history.push_back(UndoState{move, captured, castling, ep_square, halfmove, fullmove, side, hash});
+
+    int new_ep = -1;
+    if (flags == EN_PASSANT) {
+        // The captured pawn stands beside the start square
+        int captured_sq = (from & ~7) | (to & 7);
+        set_piece(captured_sq, 0);
+    }
+    set_piece(from, 0);
+    set_piece(to, flags & PROMOTION ? (piece > 0 ? 1 : -1) * ((flags & 3) + 2) : piece);
+
+    if (flags == KING_CASTLE) {
+        set_piece(from + 1, board[from + 3]);
+        set_piece(from + 3, 0);
+    } else if (flags == QUEEN_CASTLE) {
+        set_piece(from - 1, board[from - 4]);
+        set_piece(from - 4, 0);
+    } else if (flags == DOUBLE_PUSH) {
+        new_ep = (from + to) / 2;
+    }
+
+    int bits = castling;
+    if (piece == 6) bits &= ~(W_KING | W_QUEEN);
+    if (piece == -6) bits &= ~(B_KING | B_QUEEN);
+    for (int sq : {from, to}) {
+        if (sq == 0) bits &= ~W_QUEEN;
+        if (sq == 7) bits &= ~W_KING;
+        if (sq == 56) bits &= ~B_QUEEN;
+        if (sq == 63) bits &= ~B_KING;
+    }
+    set_castling(bits);
+    set_en_passant(new_ep);
+
+    halfmove = (piece == 1 || piece == -1 || captured) ? 0 : halfmove + 1;
+    if (side == -1) fullmove++;
+    set_turn(-side);
+}
+
+void Position::push_null() {
+    // Move 0 (a1 to a1) is never a real move, so it marks a null move
+    history.push_back(UndoState{0, 0, castling, ep_square, halfmove, fullmove, side, hash});
+    set_en_passant(-1);
+    halfmove = 0;  // No repetition is matched across the pass
+    set_turn(-side);
+}
+
+void Position::pop() {
+    if (history.empty()) throw std::out_of_range("pop from an empty move stack");
+    UndoState state = history.back();
+    history.pop_back();
+    if (!state.move) {
+        side = state.side;
+        ep_square = state.ep_square;
+        halfmove = state.halfmove;
+        hash = state.key;
+        return;
+    }
+    int from = state.move & 63, to = (state.move >> 6) & 63, flags = state.move >> 12;
+    int64_t piece = board[to];
+    if (flags & PROMOTION) piece = piece > 0 ? 1 : -1;
+
+    set_piece(to, state.captured);
+    set_piece(from, piece);
+    if (flags == EN_PASSANT) set_piece((from & ~7) | (to & 7), -piece);
+    if (flags == KING_CASTLE) {
+        set_piece(from + 3, board[from + 1]);
+        set_piece(from + 1, 0);
+    } else if (flags == QUEEN_CASTLE) {
+        set_piece(from - 4, board[from - 1]);
+        set_piece(from - 1, 0);
+    }
+    side = state.side;
+    fullmove = state.fullmove;
+    castling = state.castling;
+    ep_square = state.ep_square;
+    halfmove = state.halfmove;
+    hash = state.key;
+}
+
+bool Position::is_repetition(int count) const {
+    // Same side to move every other ply, back as far as the clock allows
+    int found = 0;
+    int pushed = static_cast<int>(history.size()), prior = static_cast<int>(prior_keys.size());
+    for (int distance = 2; distance <= halfmove; distance += 2) {
+        uint64_t earlier;
+        if (distance <= pushed) {
+            earlier = history[pushed - distance].key;
+        } else if (distance - pushed <= prior) {
+            earlier = prior_keys[prior - (distance - pushed)];
+        } else {
+            break;
+        }
+        if (earlier == hash && ++found >= count) return true;
+    }
+    return false;
+}
+
+int Position::pseudo_moves(uint16_t* out, int capacity, bool captures_only) const {
+    return generate_all_moves(board, side, castling, ep_square, out, capacity, captures_only);
+}
+
+int Position::legal_moves(uint16_t* out, int capacity, bool captures_only) {
+    // Only a position that cannot arise in a game overflows the buffer
+    uint16_t buffer[MAX_MOVES];
+    std::vector<uint16_t> overflow;
+    uint16_t* moves = buffer;
+    int count = pseudo_moves(buffer, MAX_MOVES, captures_only);
+    if (count > MAX_MOVES) {
+        overflow.resize(count);
+        moves = overflow.data();
+        pseudo_moves(moves, count, captures_only);
+    }
+    int legal = 0;
+    int mover = side;
+    bool check = in_check();
+    for (int i = 0; i < count; i++) {
+        uint16_t move = moves[i];
+        int flags = move >> 12;
+        if (flags == KING_CASTLE || flags == QUEEN_CASTLE) {
+            // Castling may not start in check or pass through an attacked square
+            int from = move & 63, to = (move >> 6) & 63;
+            if (check || is_square_attacked((from + to) / 2, mover != 1)) continue;
+        }
+        push(move);
+        if (!king_attacked(mover)) {
+            if (legal < capacity) out[legal] = move;
+            legal++;
+        }
+        pop();
+    }
+    return legal;
+}
+
+std::vector<uint16_t> Position::legal_move_list() {
+    std::vector<uint16_t> moves(MAX_MOVES);
+    int count = legal_moves(moves.data(), MAX_MOVES);
+    if (count > MAX_MOVES) {
+        moves.resize(count);
+        legal_moves(moves.data(), count);
+    }
+    moves.resize(count);
+    return moves;
+}
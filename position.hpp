@@ -0,0 +1,92 @@
+#pragma once
+#include <cstdint>
+#include <string>
+#include <vector>
+#include "rights.hpp"
+
+// What push() needs to remember so pop() can restore the position
+struct UndoState {
+    uint16_t move;
+    int64_t captured;
+    int castling;
+    int ep_square;
+    int halfmove;
+    int fullmove;
+    int side;
+    uint64_t key;
+};
+
+// A position that owns its state: a row-major mailbox (readable from NumPy
+// without copying), twelve piece bitboards, occupancy, castling bits,
+// en passant square, clocks and an incrementally updated Zobrist key that
+// matches zobrist.py. push()/pop() keep an internal undo stack.
+class Position {
+public:
+    Position();
+    explicit Position(const std::string& fen);
+
+    void set_fen(const std::string& fen);
+    std::string fen() const;
+
+    void push(uint16_t move);
+    void push_null();  // Pass the move; pop() undoes it like any other
+    void pop();
+
+    // captures_only keeps captures and promotions, for quiescence search
+    // Both write at most capacity moves and return the full count, as
+    // generate_all_moves does
+    int pseudo_moves(uint16_t* out, int capacity, bool captures_only = false) const;
+    int legal_moves(uint16_t* out, int capacity, bool captures_only = false);
+    std::vector<uint16_t> legal_move_list();
+
+    bool in_check() const;
+    // Whether the position occurred count times before since the last
+    // capture or pawn move, looking through prior_keys past the first push
+    bool is_repetition(int count = 1) const;
+    bool is_fifty_move_draw() const { return halfmove >= 100; }
+    int evaluate() const;  // evaluate_board(): White's perspective
+    bool king_attacked(int color) const;
+    bool is_square_attacked(int sq, bool by_white) const;
+    // Static exchange evaluation: material the side to move wins (or loses,
+    // if negative) when both sides keep recapturing on the target square
+    // with their least valuable piece, each free to stop when it pays
+    int see(uint16_t move) const;
+
+    uint64_t key() const { return hash; }
+    int turn() const { return side; }
+    void set_turn(int turn);
+    int castling_bits() const { return castling; }
+    void set_castling(int bits);
+    int en_passant() const { return ep_square; }
+    void set_en_passant(int sq);
+
+    int64_t board[64];
+    uint64_t pieces[12];
+    uint64_t occupancy[3];  // White, black and all pieces
+    int side;               // 1 for white, -1 for black
+    int castling;           // zobrist.CASTLING_BITS mask
+    int ep_square;          // Square a pawn skipped, -1 if none
+    int halfmove;
+    int fullmove;
+    uint64_t hash;
+    int eval_mg;            // Running evaluation.py midgame/endgame sums and phase
+    int eval_eg;
+    int phase;
+    std::vector<UndoState> history;
+    std::vector<uint64_t> prior_keys;  // Keys of the game before this position was set up, oldest first
+
+private:
+    void clear();
+    void set_piece(int sq, int64_t piece);
+};
+
+int piece_index(int64_t piece);
+uint64_t knight_attacks(int sq);
+uint64_t bishop_attacks(int sq, uint64_t occ);
+uint64_t rook_attacks(int sq, uint64_t occ);
+
+// Per-square midgame/endgame scores, phase weights for the twelve pieces and
+// the remaining evaluation.py constants, loaded once so both implementations
+// share one source
+void set_eval_tables(const std::vector<int>& mg, const std::vector<int>& eg,
+                     const std::vector<int>& phase, int max_phase, int mobility_weight);
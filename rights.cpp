@@ -229,4 +229,130 @@ std::vector<Move> king_moves(const Board& board, int turn, const CastlingRights&
         }
     }
     return moves;
-}
\ No newline at end of file
+}
+
+static inline uint16_t encode(int from, int to, int flags) {
+    return static_cast<uint16_t>(from | (to << 6) | (flags << 12));
+}
+
+int generate_all_moves(const int64_t* board, int turn, int castling_bits, int ep_square, uint16_t* out,
+                       int capacity, bool captures_only) {
+    int count = 0;
+    bool is_white = turn == 1;
+    int direction = is_white ? 1 : -1;
+    int start_row = is_white ? 1 : 6;
+    int last_row = is_white ? 7 : 0;
+    static const int knight_steps[8][2] = {
+        {2, 1}, {2, -1}, {-2, 1}, {-2, -1}, {1, 2}, {1, -2}, {-1, 2}, {-1, -2}
+    };
+    static const int king_steps[8][2] = {
+        {1, 0}, {-1, 0}, {0, 1}, {0, -1}, {1, 1}, {1, -1}, {-1, 1}, {-1, -1}
+    };
+    static const int diagonals[4][2] = {{1, 1}, {1, -1}, {-1, 1}, {-1, -1}};
+    static const int straights[4][2] = {{0, 1}, {0, -1}, {1, 0}, {-1, 0}};
+
+    // Moves past capacity are counted but not written
+    auto add = [&](uint16_t move) {
+        if (count < capacity) out[count] = move;
+        count++;
+    };
+    auto add_pawn_move = [&](int from, int to, bool capture) {
+        if (to / 8 == last_row) {
+            // Queen first, then knight, bishop and rook
+            for (int piece : {5, 2, 3, 4}) {
+                add(encode(from, to, PROMOTION + piece - 2 + (capture ? CAPTURE : 0)));
+            }
+        } else if (capture || !captures_only) {
+            add(encode(from, to, capture ? CAPTURE : QUIET));
+        }
+    };
+    auto add_slides = [&](int row, int col, const int (*dirs)[2]) {
+        for (int d = 0; d < 4; d++) {
+            for (int j = 1; j < 8; j++) {
+                int new_row = row + j * dirs[d][0];
+                int new_col = col + j * dirs[d][1];
+                if (new_row < 0 || new_row >= 8 || new_col < 0 || new_col >= 8) break;
+                int64_t target = board[new_row * 8 + new_col];
+                if ((is_white && target > 0) || (!is_white && target < 0)) break;
+                if (target == 0 && captures_only) continue;
+                add(encode(row * 8 + col, new_row * 8 + new_col, target != 0 ? CAPTURE : QUIET));
+                if (target != 0) break;
+            }
+        }
+    };
+
+    for (int sq = 0; sq < 64; sq++) {
+        int64_t piece = board[sq] * turn;
+        if (piece <= 0) continue;
+        int row = sq / 8;
+        int col = sq % 8;
+
+        switch (piece) {
+        case 1: {
+            int new_row = row + direction;
+            if (new_row < 0 || new_row >= 8) break;
+            // One and two squares forward
+            if (board[new_row * 8 + col] == 0) {
+                add_pawn_move(sq, new_row * 8 + col, false);
+                int two_row = row + 2 * direction;
+                if (row == start_row && board[two_row * 8 + col] == 0 && !captures_only) {
+                    add(encode(sq, two_row * 8 + col, DOUBLE_PUSH));
+                }
+            }
+            // Captures and en passant
+            for (int j : {-1, 1}) {
+                int new_col = col + j;
+                if (new_col < 0 || new_col >= 8) continue;
+                int to = new_row * 8 + new_col;
+                if (board[to] * turn < 0) {
+                    add_pawn_move(sq, to, true);
+                } else if (to == ep_square) {
+                    add(encode(sq, to, EN_PASSANT));
+                }
+            }
+            break;
+        }
+        case 2:
+        case 6: {
+            const int (*steps)[2] = piece == 2 ? knight_steps : king_steps;
+            for (int d = 0; d < 8; d++) {
+                int new_row = row + steps[d][0];
+                int new_col = col + steps[d][1];
+                if (new_row < 0 || new_row >= 8 || new_col < 0 || new_col >= 8) continue;
+                int64_t target = board[new_row * 8 + new_col] * turn;
+                if (target < 0 || (target == 0 && !captures_only)) {
+                    add(encode(sq, new_row * 8 + new_col, target < 0 ? CAPTURE : QUIET));
+                }
+            }
+            break;
+        }
+        case 3:
+            add_slides(row, col, diagonals);
+            break;
+        case 4:
+            add_slides(row, col, straights);
+            break;
+        case 5:
+            add_slides(row, col, diagonals);
+            add_slides(row, col, straights);
+            break;
+        }
+    }
+
+    // Castling: king and rook at home with the squares between them empty.
+    // Whether the king passes through check is left to the legality filter.
+    int home = is_white ? 0 : 56;
+    int64_t king = is_white ? 6 : -6;
+    int64_t rook = is_white ? 4 : -4;
+    if (board[home + 4] == king && !captures_only) {
+        if ((castling_bits & (is_white ? W_KING : B_KING)) && board[home + 7] == rook
+                && board[home + 5] == 0 && board[home + 6] == 0) {
+            add(encode(home + 4, home + 6, KING_CASTLE));
+        }
+        if ((castling_bits & (is_white ? W_QUEEN : B_QUEEN)) && board[home] == rook
+                && board[home + 1] == 0 && board[home + 2] == 0 && board[home + 3] == 0) {
+            add(encode(home + 4, home + 2, QUEEN_CASTLE));
+        }
+    }
+    return count;
+}
@@ -2,6 +2,8 @@
 #include <vector>
 #include <array>
 #include <map>
+#include <string>
+#include <cstdint>
 
 struct Move {
     std::pair<int, int> start;
@@ -20,4 +22,33 @@ std::vector<Move> knight_moves(const Board& board, int turn);
 std::vector<Move> bishop_moves(const Board& board, int turn, int equal = -1);
 std::vector<Move> rook_moves(const Board& board, int turn, int equal = -1);
 std::vector<Move> queen_moves(const Board& board, int turn);
-std::vector<Move> king_moves(const Board& board, int turn, const CastlingRights& castle_rights); 
\ No newline at end of file
+std::vector<Move> king_moves(const Board& board, int turn, const CastlingRights& castle_rights);
+
+// Encoded moves: from square in bits 0-5, to square in bits 6-11, flag in
+// bits 12-15, squares numbered row * 8 + col. Flags match rights.py.
+enum MoveFlag {
+    QUIET = 0,
+    DOUBLE_PUSH = 1,
+    KING_CASTLE = 2,
+    QUEEN_CASTLE = 3,
+    CAPTURE = 4,
+    EN_PASSANT = 5,
+    PROMOTION = 8
+};
+
+// Castling bits, matching zobrist.CASTLING_BITS
+enum CastlingBit {
+    W_KING = 1,
+    W_QUEEN = 2,
+    B_KING = 4,
+    B_QUEEN = 8
+};
+
+const int MAX_MOVES = 256;
+
+// Writes every pseudo-legal move for turn into out and returns the count.
+// board points at 64 row-major squares. At most capacity moves are written;
+// a count above capacity means out was too small. captures_only keeps
+// captures and promotions, for quiescence search.
+int generate_all_moves(const int64_t* board, int turn, int castling_bits, int ep_square, uint16_t* out,
+                       int capacity, bool captures_only = false);
@@ -6,6 +6,35 @@ class Move:
         self.end = end
         self.promotion = promotion
 
+# Moves can also be packed into 16 bits: from square in bits 0-5, to square
+# in bits 6-11 and a 4-bit flag on top. Squares are row * 8 + col.
+QUIET = 0
+DOUBLE_PUSH = 1
+KING_CASTLE = 2
+QUEEN_CASTLE = 3
+CAPTURE = 4
+EN_PASSANT = 5
+PROMOTION = 8  # 8-11 promote to knight, bishop, rook, queen; 12-15 the same with a capture
+
+# Promoted piece type for each flag, 0 when the move is not a promotion
+PROMOTION_PIECES = (0, 0, 0, 0, 0, 0, 0, 0, 2, 3, 4, 5, 2, 3, 4, 5)
+
+def encode_move(from_sq, to_sq, flags=QUIET):
+    return from_sq | to_sq << 6 | flags << 12
+
+def promotion_flag(piece_type, capture=False):
+    return PROMOTION + piece_type - 2 + (CAPTURE if capture else 0)
+
+def move_to_uci(code):
+    code = int(code)
+    from_sq, to_sq = code & 63, (code >> 6) & 63
+    uci = ('abcdefgh'[from_sq & 7] + str((from_sq >> 3) + 1)
+           + 'abcdefgh'[to_sq & 7] + str((to_sq >> 3) + 1))
+    promotion = PROMOTION_PIECES[code >> 12]
+    if promotion:
+        uci += ' nbrq'[promotion - 1]
+    return uci
+
 def pawn(board, turn):
     moves = []
     is_white = turn == 1
@@ -152,3 +181,67 @@ def king(board, turn, castle_rights):
                     moves.append(Move(king, (7, 2)))
     
     return moves
+
+def generate_all(board, turn, castling_bits, ep_square=-1, captures_only=False):
+    """
+    Every pseudo-legal move for turn as a uint16 NumPy array of encoded moves.
+    castling_bits uses zobrist.CASTLING_BITS; castling through check is left
+    to the caller's legality filter. captures_only keeps captures and
+    promotions, for quiescence search.
+    """
+    moves = []
+    is_white = turn == 1
+    direction = 1 if is_white else -1
+    last_row = 7 if is_white else 0
+
+    def add(start, end, flags):
+        from_sq = start[0] * 8 + start[1]
+        to_sq = end[0] * 8 + end[1]
+        if end[0] == last_row and abs(board[start]) == 1:
+            # Queen first, then knight, bishop and rook
+            capture = CAPTURE if flags == CAPTURE else 0
+            for piece in (5, 2, 3, 4):
+                moves.append(encode_move(from_sq, to_sq, promotion_flag(piece) + capture))
+        else:
+            moves.append(encode_move(from_sq, to_sq, flags))
+
+    for generator in (pawn, knight, bishop, rook, queen):
+        for move in generator(board, turn):
+            start = (int(move.start[0]), int(move.start[1]))
+            end = (int(move.end[0]), int(move.end[1]))
+            if board[end] != 0:
+                add(start, end, CAPTURE)
+            elif abs(board[start]) == 1 and abs(end[0] - start[0]) == 2:
+                add(start, end, DOUBLE_PUSH)
+            else:
+                add(start, end, QUIET)
+
+    # En passant
+    if ep_square >= 0:
+        ep_row, ep_col = ep_square >> 3, ep_square & 7
+        for j in (-1, 1):
+            row, col = ep_row - direction, ep_col + j
+            if 0 <= row < 8 and 0 <= col < 8 and board[row, col] == turn:
+                moves.append(encode_move(row * 8 + col, ep_square, EN_PASSANT))
+
+    # King moves, with castling encoded from the castling bits
+    castle_rights = {
+        'w_king': bool(castling_bits & 1),
+        'w_queen': bool(castling_bits & 2),
+        'b_king': bool(castling_bits & 4),
+        'b_queen': bool(castling_bits & 8),
+    }
+    for move in king(board, turn, castle_rights):
+        start = (int(move.start[0]), int(move.start[1]))
+        end = (int(move.end[0]), int(move.end[1]))
+        if end[1] - start[1] == 2:
+            add(start, end, KING_CASTLE)
+        elif start[1] - end[1] == 2:
+            add(start, end, QUEEN_CASTLE)
+        else:
+            add(start, end, CAPTURE if board[end] != 0 else QUIET)
+
+    if captures_only:
+        # The per-piece generators have no captures-only mode, so filter here
+        moves = [move for move in moves if move >> 12 & (CAPTURE | PROMOTION)]
+    return np.array(moves, dtype=np.uint16)
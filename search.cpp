@@ -0,0 +1,524 @@
+#include "search.hpp"
+#include <algorithm>
+#include <cstdlib>
+#include <thread>
+
+namespace {
+
+enum Bound { EXACT = 0, LOWER = 1, UPPER = 2 };
+
+const int INF = 1000000;
+const int ASPIRATION_WINDOW = 50;
+const int ASPIRATION_MIN_DEPTH = 4;
+const int NULL_MOVE_REDUCTION = 2;
+const int NULL_MOVE_MIN_DEPTH = 3;
+const int LMR_MIN_DEPTH = 3;
+const int LMR_MIN_MOVES = 3;
+const int64_t VALUE_OFFSET = 1LL << 31;
+const int DELTA_MARGIN = 200;
+const int ORDER_VALUES[7] = {0, 100, 320, 330, 500, 900, 20000};  // evaluation.PIECE_VALUES
+
+// Ordering tiers, as in ordering.py
+const int HASH_MOVE = 1 << 30;
+const int GOOD_CAPTURE = 1 << 28;
+const int KILLER = 1 << 26;
+const int BAD_CAPTURE = 1 << 25;
+const int HISTORY_LIMIT = 1 << 22;
+
+// Mate scores are stored relative to the node, not the root
+int to_table(int value, int ply) {
+    if (value > MATE_SCORE - MAX_PLY) return value + ply;
+    if (value < -MATE_SCORE + MAX_PLY) return value - ply;
+    return value;
+}
+
+int from_table(int value, int ply) {
+    if (value > MATE_SCORE - MAX_PLY) return value - ply;
+    if (value < -MATE_SCORE + MAX_PLY) return value + ply;
+    return value;
+}
+
+// Adds the time until it goes out of scope to *total, unless total is null
+class PhaseTimer {
+public:
+    explicit PhaseTimer(double* total) : total(total) {
+        if (total) start = std::chrono::steady_clock::now();
+    }
+    ~PhaseTimer() {
+        if (total) *total += std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+    }
+
+private:
+    double* total;
+    std::chrono::steady_clock::time_point start;
+};
+
+}  // namespace
+
+Searcher::Searcher(int size_mb) : bitbases(std::make_shared<Bitbases>()) {
+    resize(size_mb);
+    clear();
+}
+
+Searcher::Searcher(Searcher* main) : slots(main->slots), mask(main->mask), bitbases(main->bitbases) {
+    clear();
+}
+
+void Searcher::set_bitbases(const Bitbases& tables) {
+    bitbases = std::make_shared<Bitbases>(tables);
+    for (auto& helper : helpers) helper->bitbases = bitbases;
+}
+
+void Searcher::resize(int size_mb) {
+    uint64_t buckets = static_cast<uint64_t>(size_mb > 0 ? size_mb : 1) * 1024 * 1024 / (2 * sizeof(Slot));
+    uint64_t size = 1;
+    while (size * 2 <= buckets) size *= 2;
+    mask = size - 1;
+    table.assign(size * 2, Slot{});
+    slots = table.data();
+    generation = 0;
+    helpers.clear();  // They point at the old table
+}
+
+void Searcher::clear() {
+    std::fill(table.begin(), table.end(), Slot{});
+    generation = 0;
+    std::fill(&killers[0][0], &killers[0][0] + MAX_PLY * 2, 0);
+    std::fill(&history[0][0], &history[0][0] + 2 * 4096, 0);
+    for (auto& helper : helpers) helper->clear();
+}
+
+void Searcher::stop() {
+    stopped = true;
+    for (auto& helper : helpers) helper->stop();
+}
+
+int Searcher::hashfull() const {
+    int sample = static_cast<int>(std::min<uint64_t>(1000, table.size()));
+    if (!sample) return 0;  // A helper, which writes to the main searcher's table
+    int used = 0;
+    for (int i = 0; i < sample; i++) {
+        uint64_t data = table[i].data;
+        if (data && data >> 58 == generation) used++;
+    }
+    return used * 1000 / sample;
+}
+
+bool Searcher::probe(uint64_t key, Entry& entry) const {
+    const Slot* bucket = &slots[(key & mask) * 2];
+    for (int i = 0; i < 2; i++) {
+        uint64_t data = bucket[i].data;
+        if (data && (bucket[i].check ^ data) == key) {
+            entry.move = data & 0xFFFF;
+            entry.value = static_cast<int>(static_cast<int64_t>((data >> 16) & 0xFFFFFFFF) - VALUE_OFFSET);
+            entry.depth = (data >> 48) & 0xFF;
+            entry.flag = (data >> 56) & 3;
+            entry.generation = data >> 58;
+            return true;
+        }
+    }
+    return false;
+}
+
+void Searcher::store(uint64_t key, int depth, int flag, int value, uint16_t move, int ply) {
+    // Same packing and replacement scheme as transposition.TranspositionTable
+    Slot* bucket = &slots[(key & mask) * 2];
+    uint64_t old = bucket[0].data;
+    bool same = old && (bucket[0].check ^ old) == key;
+    if (!move && same) move = old & 0xFFFF;
+    uint64_t data = move
+        | static_cast<uint64_t>(static_cast<int64_t>(to_table(value, ply)) + VALUE_OFFSET) << 16
+        | static_cast<uint64_t>(std::min(depth, 255)) << 48
+        | static_cast<uint64_t>(flag) << 56
+        | static_cast<uint64_t>(generation) << 58;
+    if (!old || same || depth >= static_cast<int>((old >> 48) & 0xFF) || old >> 58 != generation) {
+        // Depth-preferred slot: the displaced entry drops to the always-replace slot
+        if (old && !same) bucket[1] = Slot{bucket[0].check, old};
+        bucket[0] = Slot{key ^ data, data};
+    } else {
+        bucket[1] = Slot{key ^ data, data};
+    }
+}
+
+bool Searcher::out_of_budget() {
+    // Depth 1 always completes so there is a move to return
+    if (aborted || root_depth <= 1) return aborted;
+    aborted = stopped
+        || (node_limit && nodes >= node_limit)
+        || (timed && !(nodes & 1023) && std::chrono::steady_clock::now() >= deadline);
+    return aborted;
+}
+
+bool Searcher::make_legal(uint16_t move, bool in_check) {
+    PhaseTimer timer(timing ? &stats.make_time : nullptr);
+    int flags = move >> 12;
+    if (flags == KING_CASTLE || flags == QUEEN_CASTLE) {
+        // Castling may not start in check or pass through an attacked square
+        int from = move & 63, to = (move >> 6) & 63;
+        if (in_check || pos.is_square_attacked((from + to) / 2, pos.side != 1)) return false;
+    }
+    int mover = pos.side;
+    pos.push(move);
+    if (pos.king_attacked(mover)) {
+        pos.pop();
+        return false;
+    }
+    return true;
+}
+
+void Searcher::unmake() {
+    PhaseTimer timer(timing ? &stats.make_time : nullptr);
+    pos.pop();
+}
+
+int Searcher::generate(uint16_t* moves, bool captures_only) {
+    PhaseTimer timer(timing ? &stats.movegen_time : nullptr);
+    // Moves beyond the buffer, possible only in positions no game reaches, are dropped
+    return std::min(pos.pseudo_moves(moves, MAX_MOVES, captures_only), MAX_MOVES);
+}
+
+int Searcher::evaluate() {
+    PhaseTimer timer(timing ? &stats.eval_time : nullptr);
+    return pos.evaluate();
+}
+
+void Searcher::order(uint16_t* moves, int* scores, int count, uint16_t tt_move, int ply) const {
+    int side = pos.side == 1 ? 0 : 1;
+    for (int i = 0; i < count; i++) {
+        uint16_t move = moves[i];
+        int flags = move >> 12;
+        if (move == tt_move) {
+            scores[i] = HASH_MOVE;
+        } else if (flags & PROMOTION) {
+            scores[i] = GOOD_CAPTURE + ORDER_VALUES[(flags & 3) + 2];
+        } else if (flags & CAPTURE) {
+            int from = move & 63, to = (move >> 6) & 63;
+            int attacker = std::abs(static_cast<int>(pos.board[from]));
+            int victim = flags == EN_PASSANT ? 1 : std::abs(static_cast<int>(pos.board[to]));
+            // Taking a dearer piece never loses material, anything else is checked with SEE
+            bool winning = ORDER_VALUES[victim] >= ORDER_VALUES[attacker] || pos.see(move) >= 0;
+            scores[i] = (winning ? GOOD_CAPTURE : BAD_CAPTURE) + 10 * ORDER_VALUES[victim] - ORDER_VALUES[attacker];
+        } else if (move == killers[ply][0]) {
+            scores[i] = KILLER;
+        } else if (move == killers[ply][1]) {
+            scores[i] = KILLER - 1;
+        } else {
+            // History, with a centre bonus to break ties while it is still empty
+            int to = (move >> 6) & 63, row = to / 8, col = to % 8;
+            bool centre = row >= 2 && row <= 5 && col >= 2 && col <= 5;
+            scores[i] = history[side][move & 0xFFF] * 2 + centre;
+        }
+    }
+}
+
+void Searcher::cutoff(uint16_t move, int depth, int ply) {
+    // Quiet moves that refute a position are tried early in its siblings
+    if (move >> 12 & (CAPTURE | PROMOTION)) return;
+    if (killers[ply][0] != move) {
+        killers[ply][1] = killers[ply][0];
+        killers[ply][0] = move;
+    }
+    int& entry = history[pos.side == 1 ? 0 : 1][move & 0xFFF];
+    entry += depth * depth;
+    if (entry > HISTORY_LIMIT) {
+        for (int* value = &history[0][0]; value != &history[0][0] + 2 * 4096; value++) *value >>= 1;
+    }
+}
+
+// Moves are tried best first by swapping the highest remaining score forward
+static uint16_t pick(uint16_t* moves, int* scores, int count, int i) {
+    int best = i;
+    for (int j = i + 1; j < count; j++) {
+        if (scores[j] > scores[best]) best = j;
+    }
+    std::swap(moves[i], moves[best]);
+    std::swap(scores[i], scores[best]);
+    return moves[i];
+}
+
+int Searcher::quiescence(int alpha, int beta, int qdepth, int ply) {
+    nodes++;
+    stats.qnodes++;
+    pv_length[ply] = 0;
+    int known = bitbases->score(pos);
+    if (known == 0) return 0;
+    bool check = pos.in_check();
+    int stand_pat = 0;
+    int best;
+    if (check) {
+        // No standing pat in check: every evasion is searched, and none is mate
+        if (ply >= MAX_PLY - 1) return evaluate() * pos.side;
+        best = -MATE_SCORE + ply;
+    } else {
+        stand_pat = evaluate() * pos.side;
+        if (known != BITBASE_NONE) stand_pat += known;
+        if (stand_pat >= beta || qdepth >= quiescence_depth || ply >= MAX_PLY - 1) return stand_pat;
+        best = stand_pat;
+        if (stand_pat > alpha) alpha = stand_pat;
+    }
+
+    uint16_t moves[MAX_MOVES];
+    int scores[MAX_MOVES];
+    int count = generate(moves, !check);
+    order(moves, scores, count, 0, ply);
+
+    for (int i = 0; i < count; i++) {
+        uint16_t move = pick(moves, scores, count, i);
+        int flags = move >> 12;
+        if (flags & PROMOTION) {
+            // Under-promotions almost never matter at the horizon
+            if ((flags & 3) != 3) continue;
+        } else if (!check) {
+            // Delta pruning: even winning the victim for free cannot reach alpha
+            int victim = flags == EN_PASSANT ? 1 : std::abs(static_cast<int>(pos.board[(move >> 6) & 63]));
+            if (stand_pat + ORDER_VALUES[victim] + DELTA_MARGIN <= alpha) continue;
+            // order() put captures that lose material by SEE in the BAD_CAPTURE tier,
+            // below KILLER; winning ones sit just under GOOD_CAPTURE at worst (king takes)
+            if (scores[i] < KILLER) continue;
+        }
+        if (!make_legal(move, check)) continue;
+        int score = -quiescence(-beta, -alpha, qdepth + 1, ply + 1);
+        unmake();
+        if (aborted) return 0;
+        if (score > best) {
+            best = score;
+            if (score >= beta) return score;
+            if (score > alpha) alpha = score;
+        }
+    }
+    return best;
+}
+
+bool Searcher::has_non_pawn_material(int color) const {
+    const uint64_t* p = color == 1 ? pos.pieces : pos.pieces + 6;
+    return p[1] | p[2] | p[3] | p[4];
+}
+
+int Searcher::negamax(int depth, int alpha, int beta, int ply, bool allow_null) {
+    if (out_of_budget()) return 0;
+    if (depth <= 0 || ply >= MAX_PLY - 1) return quiescence(alpha, beta, 0, ply);
+    // Wins are still searched so mates are found, draws need nothing more
+    if (ply > 0 && bitbases->probe(pos) == BITBASE_DRAW) return 0;
+    if (ply > 0 && (pos.is_repetition() || pos.is_fifty_move_draw())) return 0;
+    nodes++;
+    pv_length[ply] = 0;
+    bool pv_node = beta - alpha > 1;
+
+    uint64_t key = pos.key();
+    int alpha_orig = alpha;
+    uint16_t tt_move = 0;
+    Entry entry;
+    stats.tt_probes++;
+    if (probe(key, entry)) {
+        stats.tt_hits++;
+        tt_move = entry.move;
+        if (ply > 0 && entry.depth >= depth) {
+            int value = from_table(entry.value, ply);
+            if (entry.flag == EXACT || (entry.flag == LOWER && value >= beta)
+                    || (entry.flag == UPPER && value <= alpha)) {
+                stats.tt_cutoffs++;
+                return value;
+            }
+        }
+    }
+
+    bool check = pos.in_check();
+
+    // Null move, with the same zugzwang guards as search.py
+    if (null_move && allow_null && !pv_node && !check && depth >= NULL_MOVE_MIN_DEPTH
+            && has_non_pawn_material(pos.side)) {
+        {
+            PhaseTimer timer(timing ? &stats.make_time : nullptr);
+            pos.push_null();
+        }
+        int score = -negamax(depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1, ply + 1, false);
+        unmake();
+        if (aborted) return 0;
+        if (score >= beta) return score >= MATE_SCORE - MAX_PLY ? beta : score;
+    }
+
+    uint16_t moves[MAX_MOVES];
+    int scores[MAX_MOVES];
+    int count = generate(moves, false);
+    order(moves, scores, count, tt_move, ply);
+
+    int best = -INF;
+    uint16_t best_move = 0;
+    int legal = 0;
+    for (int i = 0; i < count; i++) {
+        uint16_t move = pick(moves, scores, count, i);
+        if (!make_legal(move, check)) continue;
+        int score;
+        if (legal++ == 0) {
+            score = -negamax(depth - 1, -beta, -alpha, ply + 1);
+        } else {
+            // Late quiet moves that give no check are searched shallower first
+            int reduction = 0;
+            if (lmr && depth >= LMR_MIN_DEPTH && legal > LMR_MIN_MOVES && !check
+                    && !(move >> 12 & (CAPTURE | PROMOTION)) && !pos.in_check()) {
+                reduction = depth >= 6 && legal > 2 * LMR_MIN_MOVES ? 2 : 1;
+            }
+            // PVS: later moves only have to prove they are no better than alpha
+            int scout = pvs ? alpha + 1 : beta;
+            score = -negamax(depth - 1 - reduction, -scout, -alpha, ply + 1);
+            if (score > alpha && reduction && !aborted) score = -negamax(depth - 1, -scout, -alpha, ply + 1);
+            if (pvs && score > alpha && score < beta && !aborted) score = -negamax(depth - 1, -beta, -alpha, ply + 1);
+        }
+        unmake();
+        if (aborted) return 0;
+
+        if (score > best) {
+            best = score;
+            best_move = move;
+            if (score > alpha) {
+                alpha = score;
+                pv[ply][0] = move;
+                for (int j = 0; j < pv_length[ply + 1]; j++) pv[ply][j + 1] = pv[ply + 1][j];
+                pv_length[ply] = pv_length[ply + 1] + 1;
+            }
+        }
+        if (alpha >= beta) {
+            stats.cutoffs[std::min(legal - 1, CUTOFF_SLOTS - 1)]++;
+            cutoff(move, depth, ply);
+            break;
+        }
+    }
+
+    if (!legal) return check ? -MATE_SCORE + ply : 0;
+
+    int flag = best <= alpha_orig ? UPPER : best >= beta ? LOWER : EXACT;
+    store(key, depth, flag, best, best_move, ply);
+    return best;
+}
+
+int Searcher::aspiration_search(int depth, int previous) {
+    // A narrow window around the previous score, widened on failure
+    if (!aspiration || depth < ASPIRATION_MIN_DEPTH) return negamax(depth, -INF, INF, 0);
+    int delta = ASPIRATION_WINDOW;
+    int alpha = previous - delta, beta = previous + delta;
+    while (true) {
+        int score = negamax(depth, alpha, beta, 0);
+        if (aborted) return 0;
+        if (score <= alpha) {
+            alpha = std::max(score - delta, -INF);
+        } else if (score >= beta) {
+            beta = std::min(score + delta, INF);
+        } else {
+            return score;
+        }
+        delta *= 2;
+    }
+}
+
+SearchResult Searcher::search(const Position& root, int depth, int movetime_ms, uint64_t max_nodes) {
+    if (depth <= 0) depth = MAX_PLY - 1;
+    generation = (generation + 1) & 63;
+    while (static_cast<int>(helpers.size()) < threads - 1) helpers.emplace_back(new Searcher(this));
+    if (static_cast<int>(helpers.size()) > std::max(threads - 1, 0)) helpers.resize(std::max(threads - 1, 0));
+
+    // Everything is set before any thread starts, so a stop() that comes
+    // early still reaches them all
+    std::vector<SearchResult> results(helpers.size() + 1);
+    // max_nodes is the budget of all threads together, shared out evenly as in smp.py
+    uint64_t budget = max_nodes ? std::max<uint64_t>(1, max_nodes / results.size()) : 0;
+    auto prepare = [&](Searcher& s) {
+        s.pos = root;
+        s.stopped = false;
+        s.aborted = false;
+        s.nodes = 0;
+        s.node_limit = budget;
+        s.timed = movetime_ms > 0;
+        s.deadline = std::chrono::steady_clock::now() + std::chrono::milliseconds(movetime_ms);
+        s.generation = generation;
+        s.quiescence_depth = quiescence_depth;
+        s.pvs = pvs;
+        s.aspiration = aspiration;
+        s.null_move = null_move;
+        s.lmr = lmr;
+        s.timing = timing;
+        s.stats = SearchStats();
+        s.stats.cutoffs.assign(CUTOFF_SLOTS, 0);
+    };
+    prepare(*this);
+    for (auto& helper : helpers) prepare(*helper);
+
+    std::vector<std::thread> workers;
+    for (size_t i = 0; i < helpers.size(); i++) {
+        // Every other helper starts a ply deeper so the threads drift apart
+        int start_depth = i % 2 ? 1 : 2;
+        workers.emplace_back([this, i, depth, start_depth, &results] {
+            results[i + 1] = helpers[i]->iterate(depth, start_depth);
+        });
+    }
+    results[0] = iterate(depth, 1);
+    for (auto& helper : helpers) helper->stopped = true;
+    for (auto& worker : workers) worker.join();
+
+    SearchResult result = results[0];
+    uint64_t total = 0;
+    for (const SearchResult& r : results) {
+        total += r.nodes;
+        if (r.best_move && r.depth > result.depth) result = r;
+    }
+    result.nodes = total;
+    for (auto& helper : helpers) {
+        const SearchStats& other = helper->stats;
+        stats.qnodes += other.qnodes;
+        stats.tt_probes += other.tt_probes;
+        stats.tt_hits += other.tt_hits;
+        stats.tt_cutoffs += other.tt_cutoffs;
+        for (int i = 0; i < CUTOFF_SLOTS; i++) stats.cutoffs[i] += other.cutoffs[i];
+        stats.movegen_time += other.movegen_time;
+        stats.make_time += other.make_time;
+        stats.eval_time += other.eval_time;
+    }
+    stats.nodes = total;
+    return result;
+}
+
+void Searcher::extend_pv(std::vector<uint16_t>& line, int depth) {
+    // A cutoff on a stored score ends the PV array early; the table has the rest
+    for (uint16_t move : line) pos.push(move);
+    uint16_t moves[MAX_MOVES];
+    Entry entry;
+    while (static_cast<int>(line.size()) < depth && probe(pos.key(), entry) && entry.move) {
+        int count = std::min(pos.legal_moves(moves, MAX_MOVES), MAX_MOVES);
+        if (std::find(moves, moves + count, entry.move) == moves + count) break;
+        pos.push(entry.move);
+        line.push_back(entry.move);
+    }
+    for (size_t i = 0; i < line.size(); i++) pos.pop();
+}
+
+SearchResult Searcher::iterate(int depth, int start_depth) {
+    // Killers belong to plies of the last search; history only loses weight
+    std::fill(&killers[0][0], &killers[0][0] + MAX_PLY * 2, 0);
+    for (int* value = &history[0][0]; value != &history[0][0] + 2 * 4096; value++) *value >>= 1;
+
+    SearchResult result;
+    int score = 0;
+    auto start = std::chrono::steady_clock::now();
+    for (root_depth = start_depth; root_depth <= depth && root_depth < MAX_PLY; root_depth++) {
+        uint64_t iteration_start = nodes;
+        score = aspiration_search(root_depth, score);
+        if (aborted) break;
+        result.depth = root_depth;
+        result.score = score;
+        result.pv.assign(pv[0], pv[0] + pv_length[0]);
+        extend_pv(result.pv, root_depth);
+        result.best_move = pv_length[0] ? pv[0][0] : 0;
+        stats.depth = root_depth;
+        stats.score = score;
+        stats.pv = result.pv;
+        stats.depth_nodes.push_back(nodes - iteration_start);
+        stats.nodes = nodes;
+        stats.elapsed = std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+        if (on_iteration) on_iteration(stats);
+        // A mate is proven once the search reaches it, not when a table hit reports it
+        if (stopped || MATE_SCORE - std::abs(score) <= root_depth) break;
+    }
+    result.nodes = nodes;
+    stats.nodes = nodes;
+    stats.elapsed = std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+    return result;
+}
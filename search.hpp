@@ -0,0 +1,135 @@
+#pragma once
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+#include <functional>
+#include <memory>
+#include <vector>
+#include "bitbase.hpp"
+#include "position.hpp"
+
+const int MAX_PLY = 64;
+const int MATE_SCORE = 20000;  // Mate in n plies scores MATE_SCORE - n
+const int CUTOFF_SLOTS = 8;    // Beta cutoffs by move number, the last slot for all later moves
+
+struct SearchResult {
+    uint16_t best_move = 0;
+    int score = 0;  // From the side to move's perspective
+    int depth = 0;  // Last fully searched depth
+    uint64_t nodes = 0;
+    std::vector<uint16_t> pv;
+};
+
+// Counters of one search, as search.SearchStats. Times are in seconds; the
+// movegen, make and eval times stay 0 unless Searcher::timing is set.
+struct SearchStats {
+    int depth = 0;
+    int score = 0;  // Score and PV of the last completed iteration
+    std::vector<uint16_t> pv;
+    uint64_t nodes = 0;
+    uint64_t qnodes = 0;
+    uint64_t tt_probes = 0;
+    uint64_t tt_hits = 0;
+    uint64_t tt_cutoffs = 0;
+    std::vector<uint64_t> cutoffs;
+    std::vector<uint64_t> depth_nodes;  // Nodes of each completed iteration
+    double elapsed = 0;
+    double movegen_time = 0;
+    double make_time = 0;
+    double eval_time = 0;
+};
+
+// Iterative-deepening negamax principal variation search with aspiration
+// windows, null-move pruning, late move reductions, quiescence, a
+// transposition table and TT-move/MVV-LVA/SEE ordering over a private copy of
+// the root position. Moves are ordered as in ordering.py: hash move,
+// winning captures, killers, history, losing captures. Each Searcher owns
+// its tables, which persist between searches until clear(), so separate
+// sessions never share state. The selective parts mirror search.py and
+// have the same switches.
+//
+// With threads > 1 the search is Lazy SMP: helper threads search the same
+// root, every other one a ply deeper, sharing the transposition table and
+// nothing else. The deepest completed result wins, the main thread's on a tie.
+class Searcher {
+public:
+    explicit Searcher(int size_mb = 16);
+
+    // Stops at depth, after movetime_ms milliseconds or max_nodes nodes,
+    // whichever comes first (0 means no limit); an interrupted iteration
+    // is discarded in favour of the last completed one. max_nodes counts
+    // the nodes of all threads together.
+    SearchResult search(const Position& root, int depth, int movetime_ms = 0, uint64_t max_nodes = 0);
+    void stop();
+    void clear();
+    void resize(int size_mb);
+    int hashfull() const;  // Permille of sampled slots used by the current search
+    // Drawn positions score 0 and won ones get a bonus at the leaves
+    void set_bitbases(const Bitbases& tables);
+
+    int threads = 1;
+    int quiescence_depth = 4;
+    bool pvs = true;
+    bool aspiration = true;
+    bool null_move = true;
+    bool lmr = true;
+    bool timing = false;  // Time move generation, make/undo and evaluation
+    // Called by the main thread after each completed iteration
+    std::function<void(const SearchStats&)> on_iteration;
+    SearchStats stats;  // Of the last search, helpers' counters included
+
+private:
+    // data is packed as in transposition.py and check is key ^ data, so a
+    // slot half-written by another thread fails the key test instead of
+    // needing a lock
+    struct Slot {
+        uint64_t check;
+        uint64_t data;
+    };
+
+    struct Entry {
+        uint16_t move;
+        int value;
+        int depth;
+        int flag;  // transposition.EXACT/LOWER/UPPER
+        int generation;
+    };
+
+    explicit Searcher(Searcher* main);  // Helper sharing main's table
+
+    std::vector<Slot> table;  // Buckets of a depth-preferred and an always-replace slot
+    Slot* slots = nullptr;    // table, or the main searcher's for a helper
+    uint64_t mask = 0;
+    uint8_t generation = 0;
+    std::vector<std::unique_ptr<Searcher>> helpers;
+    std::shared_ptr<const Bitbases> bitbases;  // Shared with the helpers
+
+    Position pos;
+    std::atomic<bool> stopped{false};
+    bool aborted = false;
+    int root_depth = 0;
+    uint64_t nodes = 0;
+    uint64_t node_limit = 0;
+    bool timed = false;
+    std::chrono::steady_clock::time_point deadline;
+    uint16_t killers[MAX_PLY][2];
+    int history[2][4096];  // [side][from | to << 6], White first
+    uint16_t pv[MAX_PLY][MAX_PLY];
+    int pv_length[MAX_PLY];
+
+    SearchResult iterate(int depth, int start_depth);
+    void extend_pv(std::vector<uint16_t>& line, int depth);
+    int aspiration_search(int depth, int previous);
+    int negamax(int depth, int alpha, int beta, int ply, bool allow_null = true);
+    bool has_non_pawn_material(int color) const;
+    int quiescence(int alpha, int beta, int qdepth, int ply);
+    bool out_of_budget();
+    bool make_legal(uint16_t move, bool in_check);
+    void unmake();
+    int generate(uint16_t* moves, bool captures_only);
+    int evaluate();
+    void order(uint16_t* moves, int* scores, int count, uint16_t tt_move, int ply) const;
+    void cutoff(uint16_t move, int depth, int ply);
+    bool probe(uint64_t key, Entry& entry) const;
+    void store(uint64_t key, int depth, int flag, int value, uint16_t move, int ply);
+};
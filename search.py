@@ -0,0 +1,504 @@
+"""
+Iterative-deepening driver for the Python search.
+
+Each iteration searches one ply deeper with the transposition table and
+the killer and history tables kept from the previous ones, so stored best
+moves are tried first and the root moves are re-sorted by the scores they
+got last time. A movetime (in
+milliseconds) or node budget aborts the running iteration, and the result
+of the last completed depth is returned.
+
+Every search keeps a SearchStats: node counts, transposition table use,
+where in the move list beta cutoffs happen, nodes per iteration and,
+with timing=True, the time spent generating, making and evaluating
+moves. on_iteration, if given, is called with it after each depth;
+json_lines_hook writes those snapshots out as JSON lines.
+"""
+import json
+import sys
+import time
+from collections import namedtuple
+
+from bitbase import DRAW
+from bitboard import SQUARES
+from evaluation import PIECE_VALUES
+from ordering import GOOD_CAPTURE, MoveOrderer, capture_value
+from rights import CAPTURE, EN_PASSANT, PROMOTION, PROMOTION_PIECES
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+# Same fields as the native rights_cpp.SearchResult; score is from the side
+# to move's point of view
+SearchResult = namedtuple('SearchResult', 'best_move score depth nodes pv')
+
+MAX_DEPTH = 64
+MATE_SCORE = 20000  # Mate in n plies scores MATE_SCORE - n
+INFINITY = 1000000
+CHECK_INTERVAL = 256  # Nodes between clock checks
+
+ASPIRATION_WINDOW = 50   # Half-width of the first window around the last score
+ASPIRATION_MIN_DEPTH = 4
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3        # Moves searched at full depth before reducing
+QUIESCENCE_DEPTH = 4     # Default cap on plies of captures past the horizon
+DELTA_MARGIN = 200       # Positional slack allowed on top of the captured piece
+CUTOFF_SLOTS = 8         # Beta cutoffs by move number, the last slot for all later moves
+
+# Board methods timed with timing=True and the SearchStats field each adds to
+TIMED_METHODS = (
+    ('generate_legal_moves', 'movegen_time'),
+    ('make_move', 'make_time'),
+    ('undo_move', 'make_time'),
+    ('make_null_move', 'make_time'),
+    ('undo_null_move', 'make_time'),
+    ('evaluate_board', 'eval_time'),
+)
+
+
+def to_table(value, ply):
+    """Table score of a search score at ply: mate scores count from the node, not the root."""
+    if value >= MATE_SCORE - MAX_DEPTH:
+        return value + ply
+    if value <= -MATE_SCORE + MAX_DEPTH:
+        return value - ply
+    return value
+
+
+def from_table(value, ply):
+    """Search score at ply of a table score."""
+    if value >= MATE_SCORE - MAX_DEPTH:
+        return value - ply
+    if value <= -MATE_SCORE + MAX_DEPTH:
+        return value + ply
+    return value
+
+
+class SearchAborted(Exception):
+    """Raised inside the tree when the search runs out of time or nodes."""
+
+
+class SearchStats:
+    """
+    Counters of one search, with the same fields as the native
+    rights_cpp.SearchStats. Times are in seconds; the movegen, make and
+    eval times stay 0 unless the search was timed.
+    """
+
+    FIELDS = ('depth', 'score', 'pv', 'nodes', 'qnodes', 'tt_probes', 'tt_hits', 'tt_cutoffs',
+              'cutoffs', 'depth_nodes', 'elapsed', 'movegen_time', 'make_time', 'eval_time')
+
+    def __init__(self):
+        self.depth = 0
+        self.score = 0  # Score and PV of the last completed iteration
+        self.pv = []
+        self.nodes = 0
+        self.qnodes = 0  # Of nodes, those in quiescence search
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0  # Hits whose stored score settled the node
+        self.cutoffs = [0] * CUTOFF_SLOTS
+        self.depth_nodes = []  # Nodes of each completed iteration
+        self.elapsed = 0.0
+        self.movegen_time = 0.0
+        self.make_time = 0.0
+        self.eval_time = 0.0
+
+    @classmethod
+    def copy_of(cls, stats):
+        """A SearchStats with the fields of stats, e.g. a native one."""
+        copy = cls()
+        for field in cls.FIELDS:
+            value = getattr(stats, field)
+            setattr(copy, field, list(value) if isinstance(value, list) else value)
+        return copy
+
+    def merge(self, other):
+        """Add the counters of another thread's search of the same position."""
+        for field in ('nodes', 'qnodes', 'tt_probes', 'tt_hits', 'tt_cutoffs',
+                      'movegen_time', 'make_time', 'eval_time'):
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        self.cutoffs = [mine + theirs for mine, theirs in zip(self.cutoffs, other.cutoffs)]
+
+    @property
+    def nps(self):
+        return int(self.nodes / self.elapsed) if self.elapsed else 0
+
+    @property
+    def branching_factors(self):
+        """Effective branching factor of each iteration after the first."""
+        return [later / earlier if earlier else None
+                for earlier, later in zip(self.depth_nodes, self.depth_nodes[1:])]
+
+    def as_dict(self):
+        stats = {field: getattr(self, field) for field in self.FIELDS}
+        stats['nps'] = self.nps
+        stats['branching_factors'] = [round(factor, 2) if factor else factor
+                                      for factor in self.branching_factors]
+        return stats
+
+
+def json_lines_hook(stream=sys.stderr):
+    """An on_iteration hook that writes each snapshot to stream as one JSON line."""
+    def write(stats):
+        stream.write(json.dumps(SearchStats.copy_of(stats).as_dict()) + '\n')
+        stream.flush()
+    return write
+
+
+def has_non_pawn_material(board, white):
+    """Whether the side has a knight, bishop, rook or queen; without one, zugzwang is likely."""
+    bitboards, _ = board._bitboards()
+    first = 1 if white else 7
+    return any(bitboards[first:first + 4])
+
+
+class Search:
+    """
+    One negamax principal variation search over a Board, which is restored
+    to its starting position whether the search completes or is aborted.
+
+    pvs, aspiration, null_move and lmr switch the selective parts on and
+    off so each can be measured on its own; quiescence_depth caps the
+    captures searched past the horizon. timing and on_iteration are
+    described at the top of the module.
+    """
+
+    def __init__(self, board, pvs=True, aspiration=True, null_move=True, lmr=True,
+                 quiescence_depth=QUIESCENCE_DEPTH, timing=False, on_iteration=None):
+        self.board = board
+        self.timing = timing
+        self.on_iteration = on_iteration
+        self.stats = SearchStats()
+        self.quiescence_depth = quiescence_depth
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.null_move = null_move
+        self.lmr = lmr
+        if board.transposition_table is None:
+            board.transposition_table = TranspositionTable(board.hash_size_mb)
+        self.tt = board.transposition_table
+        if board.move_orderer is None:
+            board.move_orderer = MoveOrderer()
+        self.orderer = board.move_orderer
+        self.bitbases = board.bitbases
+        self.nodes = 0
+        self.node_limit = None
+        self.deadline = None
+        self.stopped = False
+        self.helper = False
+        self.root_scores = {}
+        self.root_best = None
+
+    def stop(self):
+        """Abort from another thread; the last completed depth is kept."""
+        self.stopped = True
+
+    def run(self, depth=None, movetime=None, nodes=None, start_depth=1, helper=False):
+        """
+        Search until depth, movetime (ms) or nodes is reached, whichever is
+        first. Lazy SMP helpers pass a later start_depth to stagger their
+        iterations, and helper=True so that even their first iteration
+        stops when asked; they need not return a move.
+        """
+        board = self.board
+        self.helper = helper
+        max_depth = min(depth or MAX_DEPTH, MAX_DEPTH)
+        self.node_limit = nodes
+        self.deadline = time.perf_counter() + movetime / 1000 if movetime else None
+        self.tt.new_search()
+        self.orderer.new_search()
+        self.stats = stats = SearchStats()
+        start = time.perf_counter()
+        board_class = type(board)
+        if self.timing:
+            self._install_timers()
+
+        result = SearchResult(None, 0, 0, 0, [])
+        score = 0
+        try:
+            for iteration in range(start_depth, max_depth + 1):
+                iteration_start = self.nodes
+                try:
+                    score = self.aspiration_search(iteration, score)
+                except SearchAborted:
+                    # Moves already made in the tree were undone on the way out
+                    break
+                result = SearchResult(self.root_best, score, iteration, self.nodes,
+                                      self.principal_variation(iteration))
+                stats.depth = iteration
+                stats.score = score
+                stats.pv = result.pv
+                stats.depth_nodes.append(self.nodes - iteration_start)
+                stats.nodes = self.nodes
+                stats.elapsed = time.perf_counter() - start
+                if self.on_iteration is not None:
+                    self.on_iteration(stats)
+                # A mate is proven once the search reaches it, not when a table hit reports it
+                if self.root_best is None or MATE_SCORE - abs(score) <= iteration:
+                    break
+        finally:
+            if self.timing:
+                board.__class__ = board_class
+        stats.nodes = self.nodes
+        stats.elapsed = time.perf_counter() - start
+        return result._replace(nodes=self.nodes)
+
+    def _install_timers(self):
+        """
+        Give the board a subclass of its class whose timed methods add up
+        their time; boards have __slots__, so the methods cannot be shadowed
+        on the instance. A call made from inside another timed call, like
+        the make/undo that legality checks do, counts towards the outer one.
+        """
+        board, stats = self.board, self.stats
+        base = type(board)
+        active = [False]
+
+        def timed(method, field):
+            def wrapper(*args, **kwargs):
+                if active[0]:
+                    return method(*args, **kwargs)
+                active[0] = True
+                start = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    setattr(stats, field, getattr(stats, field) + time.perf_counter() - start)
+                    active[0] = False
+            return wrapper
+
+        methods = {name: timed(getattr(base, name), field) for name, field in TIMED_METHODS}
+        board.__class__ = type(base.__name__, (base,), dict(methods, __slots__=()))
+
+    def aspiration_search(self, depth, previous):
+        """Search a narrow window around the previous score, widening it on failure."""
+        if not self.aspiration or depth < ASPIRATION_MIN_DEPTH:
+            return self.negamax(depth, -INFINITY, INFINITY, 0)
+        delta = ASPIRATION_WINDOW
+        alpha, beta = previous - delta, previous + delta
+        while True:
+            score = self.negamax(depth, alpha, beta, 0)
+            if score <= alpha:
+                alpha = max(score - delta, -INFINITY)
+            elif score >= beta:
+                beta = min(score + delta, INFINITY)
+            else:
+                return score
+            delta *= 2
+
+    def count_node(self):
+        # The first iteration is never aborted, so there is always a move to return
+        self.nodes += 1
+        if not self.root_scores and not self.helper:
+            return
+        if self.stopped or (self.node_limit and self.nodes >= self.node_limit):
+            raise SearchAborted
+        if self.deadline and not self.nodes % CHECK_INTERVAL and time.perf_counter() >= self.deadline:
+            raise SearchAborted
+
+    def principal_variation(self, depth):
+        """Follow the stored best moves from the root."""
+        board = self.board
+        pv = []
+        while len(pv) < depth:
+            entry = self.tt.probe(board.zobrist_key)
+            if entry is None or entry[3] not in board.generate_legal_moves(encoded=True):
+                break
+            pv.append(entry[3])
+            board.make_move(entry[3])
+            board.turn *= -1
+        for move in reversed(pv):
+            board.turn *= -1
+            board.undo_move(move)
+        return pv
+
+    def order_moves(self, moves, tt_move, ply):
+        if ply == 0 and self.root_scores:
+            # Root moves in the order the previous iteration ranked them
+            moves = sorted(moves, key=lambda move: self.root_scores.get(move, -INFINITY),
+                           reverse=True)
+            if tt_move in moves:
+                moves.remove(tt_move)
+                moves.insert(0, tt_move)
+            return moves
+        return self.orderer.order(self.board, moves, tt_move, ply)
+
+    def quiescence_search(self, alpha, beta, depth=0, ply=0):
+        """
+        Search captures and queen promotions to avoid the horizon effect.
+        In check there is no standing pat: every evasion is searched, so a
+        mate at the horizon is scored as one. Fail-soft, like negamax.
+        """
+        board = self.board
+        self.count_node()
+        self.stats.qnodes += 1
+        known = self.bitbases.score(board) if self.bitbases is not None else None
+        if known == 0:
+            return 0
+
+        if board.in_check(board.turn == 1):
+            # Chains of checks end at the ply limit, as do the mate scores
+            if ply >= MAX_DEPTH - 1:
+                return board.evaluate_board() * board.turn
+            best = -MATE_SCORE + ply
+            candidates = [move for move in board.generate_legal_moves(encoded=True)
+                          if not move >> 12 & PROMOTION or PROMOTION_PIECES[move >> 12] == 5]
+            candidates = self.order_moves(candidates, None, ply)
+        else:
+            # Negamax: scores here are from the side to move's point of view
+            stand_pat = board.evaluate_board() * board.turn
+            if known is not None:
+                stand_pat += known
+            if stand_pat >= beta or depth >= self.quiescence_depth or ply >= MAX_DEPTH - 1:
+                return stand_pat
+            best = stand_pat
+            alpha = max(alpha, stand_pat)
+
+            candidates = []
+            for move in board.generate_legal_moves(encoded=True, captures_only=True):
+                flags = move >> 12
+                if flags & PROMOTION:
+                    # Under-promotions almost never matter at the horizon
+                    if PROMOTION_PIECES[flags] == 5:
+                        candidates.append((GOOD_CAPTURE, move))
+                    continue
+                # Delta pruning: even winning the victim for free cannot reach alpha
+                victim = 1 if flags == EN_PASSANT else abs(board.piece_at(*SQUARES[(move >> 6) & 63]))
+                if stand_pat + PIECE_VALUES[victim] + DELTA_MARGIN <= alpha:
+                    continue
+                value, winning = capture_value(board, move)
+                # Captures that lose material by SEE are left to the main search
+                if winning:
+                    candidates.append((value, move))
+            candidates.sort(reverse=True)
+            candidates = [move for _, move in candidates]
+
+        for move in candidates:
+            board.make_move(move)
+            board.turn *= -1
+            try:
+                score = -self.quiescence_search(-beta, -alpha, depth + 1, ply + 1)
+            finally:
+                board.turn *= -1
+                board.undo_move(move)
+
+            if score > best:
+                best = score
+                if score >= beta:
+                    return score
+                alpha = max(alpha, score)
+
+        return best
+
+    def store(self, board_hash, depth, value, move, alpha_orig, beta_orig, ply):
+        # Scores outside the original window are only bounds on the true value
+        if value <= alpha_orig:
+            flag = UPPER
+        elif value >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(board_hash, depth, flag, to_table(value, ply), move)
+
+    def negamax(self, depth, alpha, beta, ply, allow_null=True):
+        board = self.board
+        # The same order as the native search, so both count the same nodes
+        if depth <= 0 or ply >= MAX_DEPTH - 1:
+            return self.quiescence_search(alpha, beta, 0, ply)
+        # Wins are still searched so mates are found, draws need nothing more
+        if ply and self.bitbases is not None and self.bitbases.probe(board) == DRAW:
+            return 0
+        if ply and (board.is_repetition() or board.is_fifty_move_draw()):
+            return 0
+        self.count_node()
+        pv_node = beta - alpha > 1
+
+        # Check transposition table
+        board_hash = board.zobrist_key
+        alpha_orig, beta_orig = alpha, beta
+        entry = self.tt.probe(board_hash)
+        self.stats.tt_probes += 1
+        tt_move = None
+        if entry is not None:
+            self.stats.tt_hits += 1
+            stored_depth, stored_flag, stored_value, tt_move = entry
+            stored_value = from_table(stored_value, ply)
+            # A bound is returned only when it already decides the node, as in the native search
+            if stored_depth >= depth and ply > 0 and (
+                    stored_flag == EXACT
+                    or (stored_flag == LOWER and stored_value >= beta)
+                    or (stored_flag == UPPER and stored_value <= alpha)):
+                self.stats.tt_cutoffs += 1
+                return stored_value
+
+        white = board.turn == 1
+        in_check = board.in_check(white)
+
+        # Null move: if passing still fails high, a real move would too. Not
+        # in check, not twice in a row and not with only pawns left, where
+        # zugzwang makes passing better than any move
+        if (self.null_move and allow_null and not pv_node and not in_check
+                and depth >= NULL_MOVE_MIN_DEPTH and has_non_pawn_material(board, white)):
+            board.make_null_move()
+            board.turn *= -1
+            try:
+                score = -self.negamax(depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1,
+                                      ply + 1, allow_null=False)
+            finally:
+                board.turn *= -1
+                board.undo_null_move()
+            if score >= beta:
+                # A mate found after passing is not proven
+                return beta if score >= MATE_SCORE - MAX_DEPTH else score
+
+        legal_moves = board.generate_legal_moves(encoded=True)
+        if not legal_moves:
+            return -MATE_SCORE + ply if in_check else 0
+
+        # Hash move, winning captures, killers, history, losing captures
+        legal_moves = self.order_moves(legal_moves, tt_move, ply)
+
+        best_move = None
+        best_eval = -INFINITY
+        root_scores = {}
+        for index, move in enumerate(legal_moves):
+            board.make_move(move)
+            board.turn *= -1
+            try:
+                if index == 0:
+                    score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+                else:
+                    # Late quiet moves that give no check are searched shallower first
+                    reduction = 0
+                    if (self.lmr and depth >= LMR_MIN_DEPTH and index >= LMR_MIN_MOVES
+                            and not in_check and not move >> 12 & (CAPTURE | PROMOTION)
+                            and not board.in_check(not white)):
+                        reduction = 2 if depth >= 6 and index >= 2 * LMR_MIN_MOVES else 1
+                    # PVS: later moves only have to prove they are no better than alpha
+                    scout = alpha + 1 if self.pvs else beta
+                    score = -self.negamax(depth - 1 - reduction, -scout, -alpha, ply + 1)
+                    if score > alpha and reduction:
+                        score = -self.negamax(depth - 1, -scout, -alpha, ply + 1)
+                    if self.pvs and alpha < score < beta:
+                        score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.turn *= -1
+                board.undo_move(move)
+            root_scores[move] = score
+
+            if score > best_eval:
+                best_eval = score
+                best_move = move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                self.stats.cutoffs[min(index, CUTOFF_SLOTS - 1)] += 1
+                self.orderer.cutoff(board, move, depth, ply)
+                break
+
+        if ply == 0:
+            self.root_scores = root_scores
+            self.root_best = best_move
+        # Store in transposition table
+        self.store(board_hash, depth, best_eval, best_move, alpha_orig, beta_orig, ply)
+        return best_eval
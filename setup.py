@@ -15,7 +15,7 @@ class BuildExt(build_ext):
 ext_modules = [
     Extension(
         "rights_cpp",
-        ["bindings.cpp", "rights.cpp"],
+        ["bindings.cpp", "rights.cpp", "position.cpp", "search.cpp", "bitbase.cpp"],
         include_dirs=[pybind11.get_include()],
         language='c++',
         extra_compile_args=['-std=c++11'] if sys.platform == 'darwin' else []
@@ -0,0 +1,198 @@
+"""
+Lazy SMP for the Python search.
+
+Worker processes search the same root independently, every other one
+starting a ply deeper, and meet only in a transposition table kept in
+shared memory. Each worker is its own process and gets exactly one task
+per search, so no two ever queue up on one process. When the main worker
+finishes or the budget runs out the others are stopped and the deepest
+completed result is returned. The native Searcher does the same with
+threads (Searcher.threads).
+
+Extra workers only pay off with a core each: on one core they share its
+time and the search gets slower.
+
+    python smp.py --depth 6 --threads 1 2 4 8     # speedup over one thread
+    python smp.py --backend python --depth 3
+"""
+import argparse
+import multiprocessing
+import sys
+import threading
+import time
+import weakref
+
+from ordering import MoveOrderer
+from search import Search, SearchStats
+from transposition import SharedTranspositionTable
+
+# Workers are spawned, not forked: a fork from uci.py's search thread while
+# the main thread reads stdin leaves the child stuck on the stdin lock
+_context = multiprocessing.get_context('spawn')
+SHUTDOWN_TIMEOUT = 1.0  # Seconds a worker gets to exit before it is terminated
+
+# Per-process state of a worker, set up once by _run_worker
+_worker = {}
+
+
+def _run_worker(table_name, size_mb, stop_event, tasks, messages):
+    """Worker process: search each task from tasks until None arrives."""
+    _worker['table'] = SharedTranspositionTable(size_mb, name=table_name)
+    _worker['orderer'] = MoveOrderer()
+    _worker['stop'] = stop_event
+    _worker['messages'] = messages
+    try:
+        for index, task in iter(tasks.get, None):
+            try:
+                outcome = _search(*task)
+            except Exception as error:  # Raised again in the master
+                outcome = error
+            messages.put((index, 'done', outcome))
+    finally:
+        _worker['table'].close()
+
+
+def _watch(search, stop_event):
+    stop_event.wait()
+    search.stop()
+
+
+def _report_iteration(stats):
+    _worker['messages'].put((0, 'iteration', SearchStats.copy_of(stats)))
+
+
+def _search(board_class, fen, prior_keys, options, generation, start_depth, depth, movetime, nodes,
+            helper, report):
+    board = board_class()
+    board.from_fen(fen)
+    # The FEN carries the halfmove clock but not the positions before it
+    board.set_prior_keys(prior_keys)
+    table = _worker['table']
+    # Search.run moves the generation on by one, to the master's
+    table.generation = (generation - 1) & 63
+    board.transposition_table = table
+    board.move_orderer = _worker['orderer']
+    if report:
+        options = dict(options, on_iteration=_report_iteration)
+    search = Search(board, **options)
+    threading.Thread(target=_watch, args=(search, _worker['stop']), daemon=True).start()
+    return search.run(depth, movetime, nodes, start_depth, helper), search.stats
+
+
+class LazySMP:
+    """Search processes, one per thread, sharing one transposition table."""
+
+    def __init__(self, threads, size_mb=16):
+        self.threads = threads
+        self.table = SharedTranspositionTable(size_mb)
+        self.stop_event = _context.Event()
+        self.stats = None  # SearchStats of the last search, every worker's counters added up
+        # (worker index, 'iteration', SearchStats) or (worker index, 'done', result or exception)
+        self.messages = _context.Queue()
+        self.tasks = [_context.Queue() for _ in range(threads)]
+        self.processes = [_context.Process(target=_run_worker, daemon=True,
+                                           args=(self.table.name, size_mb, self.stop_event,
+                                                 tasks, self.messages))
+                          for tasks in self.tasks]
+        for process in self.processes:
+            process.start()
+        # The shared block outlives the process unless it is unlinked
+        self._finalizer = weakref.finalize(self, self._shutdown, self.processes, self.tasks, self.table)
+
+    def search(self, board, depth=None, movetime=None, nodes=None, options=None):
+        """
+        SearchResult for board's position; nodes is the budget of all
+        workers together. An on_iteration option is called here with the
+        main worker's SearchStats, which come back through the queue.
+        """
+        self.table.new_search()
+        self.stop_event.clear()
+        fen = board.to_fen()
+        prior_keys = board.prior_keys()
+        budget = max(1, nodes // self.threads) if nodes else None
+        options = dict(options or {})
+        hook = options.pop('on_iteration', None)
+        for index, tasks in enumerate(self.tasks):
+            tasks.put((index, (type(board), fen, prior_keys, options, self.table.generation,
+                               1 + index % 2, depth, movetime, budget, index > 0,
+                               index == 0 and hook is not None)))
+        outcomes = [None] * self.threads
+        finished = 0
+        while finished < self.threads:
+            index, kind, outcome = self.messages.get()
+            if kind == 'iteration':
+                hook(outcome)
+                continue
+            finished += 1
+            if index == 0:
+                self.stop_event.set()  # The helpers stop when the main worker is done
+            outcomes[index] = outcome
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                raise outcome
+        results, stats = zip(*outcomes)
+        self.stats = stats[0]
+        for other in stats[1:]:
+            self.stats.merge(other)
+
+        best = results[0]
+        for result in results[1:]:
+            if result.best_move is not None and result.depth > best.depth:
+                best = result
+        return best._replace(nodes=sum(result.nodes for result in results))
+
+    def stop(self):
+        """Stop a running search from another thread."""
+        self.stop_event.set()
+
+    def clear(self):
+        self.table.clear()
+
+    def close(self):
+        self._finalizer()
+
+    @staticmethod
+    def _shutdown(processes, tasks, table):
+        for queue in tasks:
+            queue.put(None)
+        for process in processes:
+            process.join(SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        table.close(unlink=True)
+
+
+def main(argv=None):
+    import chess_eng
+    from perft import SUITE
+
+    parser = argparse.ArgumentParser(description="Measure Lazy SMP time-to-depth speedup")
+    parser.add_argument('--depth', type=int, default=6, help="depth searched per position (default 6)")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="thread counts to compare, the first is the baseline")
+    parser.add_argument('--backend', choices=['native', 'python'], default='native')
+    args = parser.parse_args(argv)
+    chess_eng.USE_NATIVE_SEARCH = args.backend == 'native'
+    if chess_eng.USE_NATIVE_SEARCH and chess_eng.Searcher is None:
+        parser.error("the native search needs the rights_cpp extension")
+
+    print(f"{multiprocessing.cpu_count()} cores, {args.backend} search to depth {args.depth}")
+    print(f"{'Threads':>7} {'Time':>8} {'Nodes':>10} {'NPS':>10} {'Speedup':>8}")
+    baseline = None
+    for threads in args.threads:
+        board = chess_eng.BitBoard()
+        elapsed = nodes = 0
+        for _, fen, _ in SUITE:
+            board.from_fen(fen)
+            board.new_game()
+            start = time.perf_counter()
+            board.find_best_move(args.depth, threads=threads)
+            elapsed += time.perf_counter() - start
+            nodes += board.search_result.nodes
+        baseline = baseline or elapsed
+        print(f"{threads:>7} {elapsed:>7.2f}s {nodes:>10} {nodes / elapsed:>10.0f} {baseline / elapsed:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+"""Perft to depth 3 on the standard positions, for every board backend."""
+import pytest
+
+from perft import BACKENDS, SUITE, perft
+
+DEPTH = 3
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+@pytest.mark.parametrize('name, fen, counts', SUITE, ids=[name for name, _, _ in SUITE])
+def test_perft(backend, name, fen, counts):
+    board = BACKENDS[backend]()
+    board.from_fen(fen)
+    key = board.zobrist_key
+    assert perft(board, DEPTH) == counts[DEPTH - 1]
+    # Every make_move was undone, so the position is as it started; Board
+    # keeps no fullmove number, so that field is left out
+    assert board.to_fen().rsplit(' ', 1)[0] == fen.rsplit(' ', 1)[0]
+    assert board.zobrist_key == key
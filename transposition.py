@@ -0,0 +1,128 @@
+from array import array
+from multiprocessing import shared_memory
+
+# Bound types stored with each value
+EXACT = 0
+LOWER = 1  # Search failed high, the true value is at least this
+UPPER = 2  # Search failed low, the true value is at most this
+
+ENTRY_BYTES = 16  # 64-bit key plus 64-bit packed data
+BUCKET_SIZE = 2   # Depth-preferred slot followed by an always-replace slot
+
+VALUE_OFFSET = 1 << 31
+
+
+def bucket_count(size_mb):
+    buckets = max(1, size_mb * 1024 * 1024 // (ENTRY_BYTES * BUCKET_SIZE))
+    # Round down to a power of two so the index is a mask
+    return 1 << (buckets.bit_length() - 1)
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table sized in megabytes.
+
+    Each bucket holds a depth-preferred slot and an always-replace slot.
+    Entries pack the 16-bit encoded move, value, depth, bound type and search
+    generation into one 64-bit word next to the full key, so the footprint
+    never grows. The key is stored XORed with that word: an entry another
+    process wrote half of reads back as a miss, so sharing needs no lock.
+    """
+
+    def __init__(self, size_mb=16):
+        buckets = bucket_count(size_mb)
+        self.size_mb = size_mb
+        self.mask = buckets - 1
+        self.keys = array('Q', bytes(8 * buckets * BUCKET_SIZE))
+        self.data = array('Q', bytes(8 * buckets * BUCKET_SIZE))
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys = array('Q', bytes(8 * len(self.keys)))
+        self.data = array('Q', bytes(8 * len(self.data)))
+        self.generation = 0
+
+    def new_search(self):
+        # Entries from older searches become the first to be replaced
+        self.generation = (self.generation + 1) & 63
+
+    def probe(self, key):
+        """Return (depth, flag, value, move) for key, or None on a miss."""
+        index = (key & self.mask) * BUCKET_SIZE
+        for slot in (index, index + 1):
+            data = self.data[slot]
+            if data and self.keys[slot] ^ data == key:
+                return ((data >> 48) & 0xFF, (data >> 56) & 3,
+                        ((data >> 16) & 0xFFFFFFFF) - VALUE_OFFSET,
+                        data & 0xFFFF or None)
+        return None
+
+    def store(self, key, depth, flag, value, move=None):
+        index = (key & self.mask) * BUCKET_SIZE
+        keys, table = self.keys, self.data
+        code = move or 0  # 16-bit encoded move, 0 for none
+        old = table[index]
+        same = old and keys[index] ^ old == key
+
+        # Keep the previous best move when re-storing a position without one
+        if not code and same:
+            code = old & 0xFFFF
+
+        data = (code
+                | (int(value) + VALUE_OFFSET) << 16
+                | min(depth, 255) << 48
+                | flag << 56
+                | self.generation << 58)
+
+        if (not old or same or depth >= (old >> 48) & 0xFF
+                or old >> 58 != self.generation):
+            # Depth-preferred slot: the displaced entry drops to the always-replace slot
+            if old and not same:
+                keys[index + 1] = keys[index]
+                table[index + 1] = old
+            table[index] = data
+            keys[index] = key ^ data
+        else:
+            table[index + 1] = data
+            keys[index + 1] = key ^ data
+
+    def hashfull(self):
+        """Permille of sampled slots used by the current search."""
+        sample = min(1000, len(self.data))
+        used = sum(1 for data in self.data[:sample] if data and data >> 58 == self.generation)
+        return used * 1000 // sample
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    TranspositionTable kept in a multiprocessing.shared_memory block so
+    worker processes can search with one table. Created without a name it
+    allocates the block; given the name of an existing one it attaches.
+    The creator unlinks it with close(unlink=True).
+    """
+
+    def __init__(self, size_mb=16, name=None):
+        buckets = bucket_count(size_mb)
+        slots = buckets * BUCKET_SIZE
+        self.size_mb = size_mb
+        self.mask = buckets - 1
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=ENTRY_BYTES * slots)
+        self.name = self.shm.name
+        self.keys = self.shm.buf[:8 * slots].cast('Q')
+        self.data = self.shm.buf[8 * slots:16 * slots].cast('Q')
+        self.generation = 0
+
+    def clear(self):
+        self.shm.buf[:ENTRY_BYTES * len(self.keys)] = bytes(ENTRY_BYTES * len(self.keys))
+        self.generation = 0
+
+    def close(self, unlink=False):
+        # The views have to go before the mapping can be closed
+        self.keys.release()
+        self.data.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
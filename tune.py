@@ -0,0 +1,229 @@
+"""
+Texel tuning of the piece values and the pawn and knight tables.
+
+Fits the weights in evaluation.py to game results: the evaluation of each
+labelled position, squashed by a sigmoid, should predict the result. The
+corpus is read in chunks on every pass, so its size is limited only by
+time. Lines are EPD or FEN with the result, from White's side, either as a
+c9 opcode or in brackets:
+
+    <fen> c9 "1/2-1/2";
+    <fen> [1.0]
+
+    python tune.py quiet-labeled.epd --epochs 20 > tuned.txt
+
+The tuned weights are printed in the layout of evaluation.py.
+"""
+import argparse
+import math
+import re
+import sys
+import time
+from itertools import islice
+
+import numpy as np
+
+from evaluation import KNIGHT_TABLE, PAWN_TABLE, PIECE_VALUES, evaluate_batch
+
+CHUNK_SIZE = 65536
+TUNED_PIECES = (1, 2, 3, 4, 5)  # The king's value cancels out
+SCALES = np.linspace(0.2, 2.0, 91)  # Candidate sigmoid scales, searched in one pass
+
+# Adam steps, in centipawns
+LEARNING_RATE = 1.0
+BETA1 = 0.9
+BETA2 = 0.999
+EPSILON = 1e-8
+
+PIECE_CODES = {'P': 1, 'N': 2, 'B': 3, 'R': 4, 'Q': 5, 'K': 6,
+               'p': -1, 'n': -2, 'b': -3, 'r': -4, 'q': -5, 'k': -6}
+RESULTS = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}
+BRACKET_RESULT = re.compile(r'\[([01](?:\.\d*)?)\]')
+
+# Square of a white piece for each table cell, the tables being written
+# from White's side with rank 8 first; a black piece uses the cell's own square
+_WHITE_SQUARES = np.array([(7 - cell // 8) * 8 + cell % 8 for cell in range(64)])
+
+
+def parse_labelled(line):
+    """
+    (board array, result for White) of a labelled line, or None if it has
+    no result; ValueError if its piece placement is malformed.
+    """
+    fields = line.split()
+    if len(fields) < 2:
+        return None
+    match = BRACKET_RESULT.search(line)
+    if match:
+        result = float(match.group(1))
+    else:
+        code = re.search(r'c9\s+"([^"]+)"', line)
+        if code is None or code.group(1) not in RESULTS:
+            return None
+        result = RESULTS[code.group(1)]
+    return board_array(fields[0]), result
+
+
+def board_array(placement):
+    """8x8 int8 array, laid out like Board.board, of a FEN piece placement."""
+    ranks = placement.split('/')
+    if len(ranks) != 8:
+        raise ValueError(f"{len(ranks)} ranks in {placement!r}")
+    board = np.zeros((8, 8), dtype=np.int8)
+    for rank, text in enumerate(ranks):
+        col = 0
+        for char in text:
+            if char.isdigit():
+                col += int(char)
+            elif char not in PIECE_CODES:
+                raise ValueError(f"unknown piece {char!r} in {placement!r}")
+            elif col >= 8:
+                raise ValueError(f"rank {8 - rank} has over 8 squares in {placement!r}")
+            else:
+                board[7 - rank, col] = PIECE_CODES[char]
+                col += 1
+        if col != 8:
+            raise ValueError(f"rank {8 - rank} has {col} squares in {placement!r}")
+    return board
+
+
+def read_chunks(path, size=CHUNK_SIZE, log=None):
+    """
+    Yield (boards, results) arrays of up to size labelled positions from
+    path. Lines with a malformed placement are skipped, and reported with
+    their line number to log if one is given.
+    """
+    with open(path) as lines:
+        numbered = enumerate(lines, 1)
+        while True:
+            chunk = list(islice(numbered, size))
+            if not chunk:
+                return
+            parsed = []
+            for number, line in chunk:
+                try:
+                    entry = parse_labelled(line)
+                except ValueError as error:
+                    if log is not None:
+                        print(f"{path}:{number}: skipped, {error}", file=log)
+                    continue
+                if entry:
+                    parsed.append(entry)
+            if parsed:
+                boards, results = zip(*parsed)
+                yield np.stack(boards), np.array(results)
+
+
+def initial_weights():
+    """Current piece values, pawn table and knight table as one vector."""
+    return np.concatenate([[PIECE_VALUES[piece] for piece in TUNED_PIECES],
+                           PAWN_TABLE.ravel(), KNIGHT_TABLE.ravel()]).astype(np.float64)
+
+
+def features(boards):
+    """
+    Count of each tuned weight in each position, White's minus Black's.
+    Every weight enters the midgame and endgame sums alike, so the
+    evaluation changes by features @ (weights - initial_weights()).
+    """
+    squares = boards.reshape(len(boards), 64)
+    columns = []
+    tables = []
+    for piece in (1, 2):
+        table = (squares[:, _WHITE_SQUARES] == piece).astype(np.float64) - (squares == -piece)
+        tables.append(table)
+    for piece in TUNED_PIECES:
+        columns.append((squares == piece).sum(axis=1) - (squares == -piece).sum(axis=1))
+    return np.hstack([np.array(columns, dtype=np.float64).T] + tables)
+
+
+def win_probability(scores, scale):
+    return 1 / (1 + 10 ** (-scale * scores / 400))
+
+
+def fit_scale(path, chunk_size=CHUNK_SIZE):
+    """The sigmoid scale that best fits the current evaluation to the results."""
+    errors = np.zeros(len(SCALES))
+    count = 0
+    for boards, results in read_chunks(path, chunk_size):
+        scores = evaluate_batch(boards).astype(np.float64)
+        predicted = win_probability(scores[:, None], SCALES[None, :])
+        errors += ((results[:, None] - predicted) ** 2).sum(axis=0)
+        count += len(results)
+    if not count:
+        raise ValueError(f"{path} has no labelled positions")
+    return float(SCALES[np.argmin(errors)]), errors.min() / count
+
+
+def tune(path, epochs, scale, chunk_size=CHUNK_SIZE, learning_rate=LEARNING_RATE, log=sys.stderr):
+    """Weights after epochs passes of Adam over the corpus, one step per chunk."""
+    start_weights = initial_weights()
+    weights = start_weights.copy()
+    moment = np.zeros_like(weights)
+    velocity = np.zeros_like(weights)
+    steps = 0
+    for epoch in range(1, epochs + 1):
+        start = time.perf_counter()
+        total_error = count = 0
+        # Bad lines are the same on every pass, so only the first reports them
+        for boards, results in read_chunks(path, chunk_size, log if epoch == 1 else None):
+            x = features(boards)
+            scores = evaluate_batch(boards) + x @ (weights - start_weights)
+            predicted = win_probability(scores, scale)
+            total_error += ((results - predicted) ** 2).sum()
+            count += len(results)
+            # d/dw of the mean squared error through the sigmoid
+            slope = (predicted - results) * predicted * (1 - predicted) * scale * math.log(10) / 400
+            gradient = 2 * x.T @ slope / len(results)
+
+            steps += 1
+            moment = BETA1 * moment + (1 - BETA1) * gradient
+            velocity = BETA2 * velocity + (1 - BETA2) * gradient ** 2
+            corrected = moment / (1 - BETA1 ** steps)
+            weights -= learning_rate * corrected / (np.sqrt(velocity / (1 - BETA2 ** steps)) + EPSILON)
+        if not count:
+            raise ValueError(f"{path} has no labelled positions")
+        print(f"epoch {epoch}: error {total_error / count:.6f} ({count} positions, "
+              f"{time.perf_counter() - start:.1f}s)", file=log)
+    return weights
+
+
+def format_weights(weights):
+    """Python source for PIECE_VALUES, PAWN_TABLE and KNIGHT_TABLE."""
+    weights = np.rint(weights).astype(int)
+    lines = ["PIECE_VALUES = {"]
+    for piece, name, value in zip(TUNED_PIECES, ('Pawn', 'Knight', 'Bishop', 'Rook', 'Queen'), weights):
+        lines.append(f"    {piece}: {value},  # {name}")
+    lines.append(f"    6: {PIECE_VALUES[6]}  # King")
+    lines.append("}")
+    for name, table in (('PAWN_TABLE', weights[5:69]), ('KNIGHT_TABLE', weights[69:133])):
+        lines.append("")
+        lines.append(f"{name} = np.array([")
+        rows = [", ".join(f"{value:3d}" for value in table[row * 8:row * 8 + 8]) for row in range(8)]
+        lines.append(",\n".join(f"    [{row}]" for row in rows))
+        lines.append("])")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune piece values and pawn/knight tables on labelled positions")
+    parser.add_argument('corpus', help="EPD/FEN file with game results")
+    parser.add_argument('--epochs', type=int, default=10, help="passes over the corpus (default 10)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f"positions per chunk and Adam step (default {CHUNK_SIZE})")
+    parser.add_argument('--learning-rate', type=float, default=LEARNING_RATE,
+                        help=f"Adam step in centipawns (default {LEARNING_RATE})")
+    parser.add_argument('--scale', type=float, help="sigmoid scale (default: fitted to the current weights)")
+    args = parser.parse_args(argv)
+
+    scale = args.scale
+    if scale is None:
+        scale, error = fit_scale(args.corpus, args.chunk_size)
+        print(f"scale {scale:.2f}: error {error:.6f}", file=sys.stderr)
+    weights = tune(args.corpus, args.epochs, scale, args.chunk_size, args.learning_rate)
+    print(format_weights(weights))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
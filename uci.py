@@ -0,0 +1,258 @@
+"""
+UCI front-end, for chess GUIs and match harnesses:
+
+    python uci.py
+
+The search runs on a worker thread, so stop, ponderhit and isready are
+answered while it thinks. The transposition table and the killer and
+history tables are kept from move to move and cleared by ucinewgame.
+go ponder searches the expected position on the opponent's time; ponderhit
+turns that into a normal timed search, with everything found so far kept
+in the tables. The clock starts at ponderhit, while depth and nodes limits
+hold from the start. With the Ponder option on, each move also gets a
+larger share of the clock, as the opponent's time is used too. An info
+line is sent after every completed iteration; with Threads > 1 it counts
+the nodes of the main thread or worker only.
+"""
+import os
+import sys
+import threading
+
+import chess_eng
+from rights import move_to_uci
+from search import MATE_SCORE, MAX_DEPTH
+
+ENGINE_NAME = "chess_eng"
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+MOVES_TO_GO = 30  # Moves the remaining time is shared between when movestogo is not given
+MOVE_OVERHEAD = 50  # Milliseconds left on the clock for communication
+MIN_MOVETIME = 10
+PONDER_BONUS = 1.25  # Longer thinking when the opponent's time is used for pondering too
+STOP_POLL = 0.01  # Seconds between stop requests while a search is starting
+
+# (type, default, min, max) of each option
+OPTIONS = {
+    'Hash': ('spin', 16, 1, 4096),
+    'Threads': ('spin', 1, 1, os.cpu_count() or 1),
+    'Ponder': ('check', False, None, None),
+}
+
+
+def allocate_time(time_left, increment=0, moves_to_go=None, ponder=False):
+    """Milliseconds to think about this move with time_left on the clock."""
+    budget = time_left / (moves_to_go or MOVES_TO_GO) + increment * 3 // 4
+    if ponder:
+        budget *= PONDER_BONUS
+    return max(MIN_MOVETIME, min(int(budget), time_left - MOVE_OVERHEAD))
+
+
+def format_score(score):
+    """UCI score of a search score from the side to move's point of view."""
+    if abs(score) >= MATE_SCORE - MAX_DEPTH:
+        moves = (MATE_SCORE - abs(score) + 1) // 2
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+def parse_go(tokens):
+    """Dict of the go parameters; flags map to True, the rest to ints."""
+    params = {}
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token in ('ponder', 'infinite'):
+            params[token] = True
+        elif token == 'searchmoves':
+            break  # Not supported; the moves run to the end of the line
+        elif index + 1 < len(tokens):
+            try:
+                params[token] = int(tokens[index + 1])
+            except ValueError:
+                pass
+            index += 1
+        index += 1
+    return params
+
+
+class UCIEngine:
+    """Reads UCI commands with handle() and writes replies to output."""
+
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.output_lock = threading.Lock()
+        self.board = chess_eng.BitBoard()
+        self.board.from_fen(START_FEN)
+        self.board.search_options['on_iteration'] = self.report
+        self.threads = 1
+        self.ponder = OPTIONS['Ponder'][1]
+        self.worker = None
+        self.timer = None
+        # Set when bestmove may be sent: at once for a timed search, only
+        # after stop or ponderhit for go infinite and go ponder
+        self.release = threading.Event()
+        self.ponder_movetime = None
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def handle(self, line):
+        """Carry out one command line; False after quit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send("id author the chess_eng authors")
+            for name, (kind, default, low, high) in OPTIONS.items():
+                if kind == 'spin':
+                    self.send(f"option name {name} type spin default {default} min {low} max {high}")
+                else:
+                    self.send(f"option name {name} type check default {str(default).lower()}")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'setoption':
+            self.wait()
+            self.set_option(args)
+        elif command == 'ucinewgame':
+            self.wait()
+            self.board.new_game()
+        elif command == 'position':
+            self.wait()
+            self.set_position(args)
+        elif command == 'go':
+            self.wait()
+            self.go(parse_go(args))
+        elif command == 'stop':
+            self.stop()
+        elif command == 'ponderhit':
+            self.ponderhit()
+        elif command == 'quit':
+            self.stop()
+            return False
+        return True
+
+    def set_option(self, args):
+        text = ' '.join(args)
+        name, _, value = text.partition(' value ')
+        name = name.replace('name', '', 1).strip()
+        if name == 'Hash':
+            self.board.set_hash_size(int(value))
+        elif name == 'Threads':
+            self.threads = max(1, int(value))
+        elif name == 'Ponder':
+            self.ponder = value.strip().lower() == 'true'
+
+    def set_position(self, args):
+        """Set up the position, or report why not and keep the last good one."""
+        if 'moves' in args:
+            split = args.index('moves')
+            setup, moves = args[:split], args[split + 1:]
+        else:
+            setup, moves = args, []
+        fen = START_FEN if setup[:1] == ['startpos'] else ' '.join(setup[1:])
+        # Play the moves on a copy first; the board keeps its tables
+        scratch = self.board.copy()
+        codes = []
+        try:
+            scratch.from_fen(fen)
+            for uci in moves:
+                codes.append(scratch.move_from_uci(uci))
+                scratch.make_move(codes[-1])
+                scratch.turn *= -1
+        except (ValueError, IndexError) as error:
+            self.send(f"info string bad position: {error}")
+            return
+        self.board.from_fen(fen)
+        for code in codes:
+            self.board.make_move(code)
+            self.board.turn *= -1
+
+    def go(self, params):
+        white = self.board.turn == 1
+        movetime = params.get('movetime')
+        time_left = params.get('wtime' if white else 'btime')
+        if movetime is None and time_left is not None:
+            movetime = allocate_time(time_left, params.get('winc' if white else 'binc', 0),
+                                     params.get('movestogo'), self.ponder)
+        depth = params.get('depth')
+        nodes = params.get('nodes')
+
+        self.ponder_movetime = None
+        if params.get('ponder') or params.get('infinite'):
+            # No clock until ponderhit; a search that reaches depth or nodes
+            # first holds its bestmove until ponderhit or stop
+            self.ponder_movetime = movetime
+            movetime = None
+            self.release.clear()
+        else:
+            self.release.set()
+        self.worker = threading.Thread(target=self.search, args=(depth, movetime, nodes), daemon=True)
+        self.worker.start()
+
+    def search(self, depth, movetime, nodes):
+        result = None
+        try:
+            result = self.board.search(depth, movetime, nodes, self.threads)
+        finally:
+            # The GUI waits for bestmove whatever became of the search
+            self.release.wait()
+            self._cancel_timer()
+            pv = [move_to_uci(move) for move in result.pv] if result else []
+            best = move_to_uci(result.best_move) if result and result.best_move else '0000'
+            self.send(f"bestmove {best} ponder {pv[1]}" if len(pv) > 1 else f"bestmove {best}")
+
+    def report(self, stats):
+        """on_iteration hook: the info line of a completed iteration."""
+        elapsed = max(stats.elapsed, 1e-9)
+        pv = ' '.join(move_to_uci(move) for move in stats.pv)
+        self.send(f"info depth {stats.depth} score {format_score(stats.score)} "
+                  f"nodes {stats.nodes} nps {int(stats.nodes / elapsed)} "
+                  f"hashfull {self.board.hashfull()} time {int(stats.elapsed * 1000)} pv {pv}")
+
+    def ponderhit(self):
+        """The expected move was played: the ponder search goes on against the clock."""
+        if self.ponder_movetime is not None:
+            self.timer = threading.Timer(self.ponder_movetime / 1000, self.board.stop_search)
+            self.timer.daemon = True
+            self.timer.start()
+        self.release.set()
+
+    def stop(self):
+        self._cancel_timer()
+        self.release.set()
+        # A search that has not started yet would miss a single request
+        while self.worker is not None and self.worker.is_alive():
+            self.board.stop_search()
+            self.worker.join(STOP_POLL)
+        self.worker = None
+
+    def wait(self):
+        """Let a running search finish before the position or options change."""
+        if self.worker is not None:
+            if not self.release.is_set():
+                self.stop()  # A new command ends go infinite and go ponder
+            else:
+                self.worker.join()
+            self.worker = None
+
+    def _cancel_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+
+def main(argv=None):
+    engine = UCIEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
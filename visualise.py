@@ -1,6 +1,7 @@
 import pygame
 import os
 from chess_eng import Board
+from polyglot import Book
 from rights import Move
 
 class ChessGUI:
@@ -8,12 +9,16 @@ class ChessGUI:
         pygame.init()
         self.SQUARE_SIZE = 80
         self.BOARD_SIZE = self.SQUARE_SIZE * 8
+        self.MOVE_TIME = 1000  # Milliseconds the engine may think per move
+        self.BOOK_PATH = 'book.bin'  # Polyglot opening book, used when present
         self.screen = pygame.display.set_mode((self.BOARD_SIZE, self.BOARD_SIZE))
         pygame.display.set_caption("Chess")
         
         # Initialize chess board
         self.board = Board()
         self.board.from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        if os.path.exists(self.BOOK_PATH):
+            self.board.book = Book(self.BOOK_PATH)
         
         # Load pieces
         self.pieces = {}
@@ -84,7 +89,7 @@ class ChessGUI:
                     move_made = True
                     
                     # After white's move, make black's move automatically
-                    black_move = self.board.find_best_move()
+                    black_move = self.board.find_best_move(depth=None, movetime=self.MOVE_TIME)
                     if black_move:
                         captured_piece, rights = self.board.make_move(black_move)
                         self.board.turn *= -1
@@ -0,0 +1,67 @@
+"""
+Zobrist keys for hashing positions.
+
+Keys come from a fixed splitmix64 sequence rather than Python's random
+module so the same table can be rebuilt in native code.
+"""
+
+MASK64 = (1 << 64) - 1
+
+# Bit of each castling right in a castling mask
+CASTLING_BITS = {
+    'w_king': 1,
+    'w_queen': 2,
+    'b_king': 4,
+    'b_queen': 8,
+}
+
+
+def _splitmix64(state):
+    state = (state + 0x9E3779B97F4A7C15) & MASK64
+    z = state
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return state, z ^ (z >> 31)
+
+
+def _generate_keys(count, seed=0x2545F4914F6CDD1D):
+    keys = []
+    state = seed
+    for _ in range(count):
+        state, key = _splitmix64(state)
+        keys.append(key)
+    return keys
+
+
+# 12 * 64 piece keys, then side to move, 16 castling masks and 8 en passant files
+_KEYS = _generate_keys(12 * 64 + 1 + 16 + 8)
+
+# PIECE_KEYS[piece][square]; the empty square hashes to zero so updates need no branch
+PIECE_KEYS = {0: [0] * 64}
+for _i, _piece in enumerate((1, 2, 3, 4, 5, 6, -1, -2, -3, -4, -5, -6)):
+    PIECE_KEYS[_piece] = _KEYS[_i * 64:(_i + 1) * 64]
+
+SIDE_KEY = _KEYS[12 * 64]
+CASTLING_KEYS = _KEYS[12 * 64 + 1:12 * 64 + 17]
+EN_PASSANT_KEYS = _KEYS[12 * 64 + 17:12 * 64 + 25]
+
+
+def castling_mask(castling_rights):
+    mask = 0
+    for right, flag in CASTLING_BITS.items():
+        if castling_rights[right]:
+            mask |= flag
+    return mask
+
+
+def en_passant_key(en_passant):
+    return 0 if en_passant is None else EN_PASSANT_KEYS[en_passant[1]]
+
+
+def position_key(board, castling_rights, en_passant):
+    """Key of a position, an 8x8 NumPy board, from scratch, without the side to move."""
+    key = CASTLING_KEYS[castling_mask(castling_rights)] ^ en_passant_key(en_passant)
+    for sq, piece in enumerate(board.ravel().tolist()):
+        if piece:
+            key ^= PIECE_KEYS[piece][sq]
+    return key